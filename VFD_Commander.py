@@ -4,23 +4,63 @@
 # - P186 [Setting pressure ] Water pressure setting for constant pressure VFD mode
 # - P187 [Feedback pressure] Water pressure feedback for constant pressure VFD mode
 #
+# GUI entry point. The Modbus/VFD logic lives in the modules next to this file
+# and can be used without Tk, see vfd.py for the command line interface.
+# Theme and serial packages are imported when first needed.
+#
 
 import tkinter as tk
-from tkinter import ttk, scrolledtext, messagebox, Scale
-import serial.tools.list_ports
-from pymodbus.client.serial import ModbusSerialClient
-from pymodbus.pdu import ExceptionResponse
+from tkinter import ttk, scrolledtext, messagebox, filedialog, simpledialog, Scale
 import struct
-import datetime
-import ttkthemes
-import sv_ttk #dark theme
-import pywinstyles, sys #for windows dark title bar NOT working
+import queue
+import sys
+import threading
+import time
+from modbus_rtu import (crc16, build_request, build_write_multiple_request, build_read_write_multiple_request, format_frame,
+                        ModbusRTU, ModbusError, FunctionSupport, write_values, read_write_values)
+from bus_worker import BusWorker, WorkerLink, PRIORITY_STOP, PRIORITY_COMMAND, PRIORITY_READ
+import drive
+import register_map
+from telemetry import TelemetryStore, TelemetryPoller
+from drive_registry import DriveRegistry
+from fault_monitor import FaultMonitor
+from drive_dashboard import DriveDashboard
+from log_view import LogView
+from telemetry_recorder import TelemetryRecorder, TelemetryRecording
+import param_backup
+from write_coalescer import CoalescingWriter
+from register_cache import RegisterCache
+from bus_metrics import BusMetrics, MetricsExporter
+from bus_stats_panel import BusStatsPanel
+from live_plot import LivePlotPanel
+from bus_supervisor import BusSupervisor
+from bus_supervisor_panel import BusSupervisorPanel
+from session_config import ConnectionProfile, ProfileStore, SnapshotCache, PROFILE_TURNAROUND
+from watchdog import Watchdog
 
 # define INT16_MAX
 INT16_MAX = 2**16 - 1
 
+# Interval at which results from the bus worker are picked up by the Tk thread (~60 fps)
+UI_POLL_INTERVAL_MS = 16
+# Interval at which the status labels are refreshed from the telemetry store
+STATUS_REFRESH_INTERVAL_MS = 100
+# Maximum number of setpoint writes per second while dragging the speed slider
+SETPOINT_WRITE_RATE_HZ = 5
+# Number of lines kept in the log window
+LOG_MAX_LINES = 2000
+# Interval at which the last known drive state is written to the snapshot cache
+SNAPSHOT_SAVE_INTERVAL_MS = 30000
+# Profile used when none has been saved yet
+DEFAULT_PROFILE_NAME = "default"
+
 
 def apply_theme_to_titlebar(root):
+    if sys.platform != "win32":
+        return  # title bar styling only exists on Windows
+    import sv_ttk
+    import pywinstyles  #for windows dark title bar NOT working
+
     version = sys.getwindowsversion()
 
     if version.major == 10 and version.build >= 22000:
@@ -50,6 +90,8 @@ class SerialTool:
         # root.tk.call("source", "./Forest-ttk-theme/forest-light.tcl")
         # ttk.Style(root).theme_use("forest-light")
         
+        import sv_ttk #dark theme
+
         sv_ttk.set_theme("dark") # WORKAROUND run before and after setting title bar
         apply_theme_to_titlebar(root)
         sv_ttk.set_theme("dark")
@@ -57,9 +99,50 @@ class SerialTool:
         # Serial connection variables
         self.client = None
         self.connected = False
+        self.worker = None  # BusWorker owning the serial port while connected
+        self.turnaround = PROFILE_TURNAROUND  # reply delay allowed by the link, from the profile
+        self.last_snapshot = None  # most recent drive.StatusSnapshot
+        self.telemetry = TelemetryStore()  # latest polled values of the drive at slave_var, read by the UI
+        self.telemetry.on_listener_error = self._telemetry_listener_failed
+        self._failed_listeners = set()  # reported once each, they fail on every update
+        self.registry = DriveRegistry()  # all drives polled on this bus
+        self.poller = None
+        self._primary = None  # (Drive polled into self.telemetry, its own store or None if start_polling added it)
+        self.dashboard = None
+        self.metrics = BusMetrics()  # transaction statistics of the serial link
+        self.metrics_exporter = None  # MetricsExporter once an export file is chosen
+        self.stats_panel = None
+        self.plot_panel = None
+        self._supervisor = None  # BusSupervisor for further adapters, created on first use
+        self.buses_panel = None
+        self.recorder = None  # TelemetryRecorder while recording
+        self._replay_stop = None  # threading.Event while replaying
+        self.setpoint_writer = None  # CoalescingWriter for registers written from continuous controls
+        self.profile_runner = None  # motion_profile.ProfileRunner while a profile runs
+        self.function_support = FunctionSupport()  # 0x10/0x17 rejected by a drive, sent as 0x06/0x03 instead
+        self.watchdog = None  # Watchdog stopping the drives if this program stops responding, while connected
+        self._slave_address = None  # plain int copy of slave_var, readable from the watchdog thread
+        self._shown_telemetry_version = 0
+        self.profiles = ProfileStore()  # saved connection profiles, small JSON file
+        self.snapshots = SnapshotCache()  # last known P180-P189 per profile and drive
+        self._saved_telemetry_version = None
+        
+        # Callables queued by other threads to be run on the Tk thread
+        self._ui_calls = queue.SimpleQueue()
         
         # Initialize UI components
         self.setup_ui()
+        autoconnect = self.load_session()
+
+        # Created after the cached state was restored, so only real samples raise fault events
+        self.fault_monitor = FaultMonitor(self.telemetry)  # fault transitions of the polled drive
+        self.fault_monitor.add_callback(lambda event: self.call_in_ui(self._fault_event, event))
+        if autoconnect:
+            self.root.after(100, self.connect_disconnect)  # after the window has been drawn once
+        self.root.after(SNAPSHOT_SAVE_INTERVAL_MS, self._save_snapshots_periodically)
+        self.root.after(UI_POLL_INTERVAL_MS, self._drain_ui_calls)
+        self.root.after(STATUS_REFRESH_INTERVAL_MS, self._refresh_status_from_telemetry)
+        self.root.protocol("WM_DELETE_WINDOW", self.close)
 
     def setup_ui(self):
         ### COM Port Section ###
@@ -93,6 +176,34 @@ class SerialTool:
         self.stop_bits_dropdown = ttk.Combobox(self.com_frame, textvariable=self.stop_bits_var, values=["1", "1.5", "2"], width=5)
         self.stop_bits_dropdown.grid(row=1, column=3, padx=5, pady=5)
 
+        self.dashboard_button = ttk.Button(self.com_frame, text="Drives...", command=self.open_dashboard)
+        self.dashboard_button.grid(row=1, column=4, padx=5, pady=5)
+
+        self.stats_button = ttk.Button(self.com_frame, text="Bus stats...", command=self.open_stats_panel)
+        self.stats_button.grid(row=0, column=4, padx=5, pady=5)
+
+        self.discover_button = ttk.Button(self.com_frame, text="Discover", command=self.discover_callback)
+        self.discover_button.grid(row=0, column=5, padx=5, pady=5)
+
+        self.plot_button = ttk.Button(self.com_frame, text="Plot...", command=self.open_plot_panel)
+        self.plot_button.grid(row=1, column=5, padx=5, pady=5)
+
+        self.buses_button = ttk.Button(self.com_frame, text="Buses...", command=self.open_buses_panel)
+        self.buses_button.grid(row=0, column=6, padx=5, pady=5)
+
+        # Connection profiles
+        ttk.Label(self.com_frame, text="Profile:").grid(row=2, column=0, padx=5, pady=5)
+        self.profile_var = tk.StringVar(value=DEFAULT_PROFILE_NAME)
+        self.profile_dropdown = ttk.Combobox(self.com_frame, textvariable=self.profile_var, width=10, state="readonly")
+        self.profile_dropdown.grid(row=2, column=1, padx=5, pady=5)
+        self.profile_dropdown.bind("<<ComboboxSelected>>", self.profile_selected_callback)
+        ttk.Button(self.com_frame, text="Save", command=self.save_profile_callback).grid(row=2, column=2, padx=5, pady=5)
+        ttk.Button(self.com_frame, text="Delete", command=self.delete_profile_callback).grid(row=2, column=3, padx=5, pady=5)
+        self.autoconnect_var = tk.BooleanVar(value=False)
+        self.autoconnect_checkbox = ttk.Checkbutton(self.com_frame, text="Auto-connect", variable=self.autoconnect_var)
+        self.autoconnect_checkbox.state(['!alternate'])
+        self.autoconnect_checkbox.grid(row=2, column=4, columnspan=2, padx=5, pady=5, sticky="w")
+
         ### Modbus Parameters ###
         self.modbus_frame = ttk.LabelFrame(self.root, text="Modbus Settings: ▼")
         self.modbus_frame.grid(row=1, column=0, padx=10, pady=10, sticky="ew")
@@ -102,6 +213,8 @@ class SerialTool:
         self.slave_label.grid(row=0, column=0, padx=5, pady=5)
         
         self.slave_var = tk.StringVar(value="8")
+        self.slave_var.trace_add("write", self._slave_changed)
+        self._slave_changed()
         self.slave_entry = ttk.Entry(self.modbus_frame, textvariable=self.slave_var, width=16)
         self.slave_entry.grid(row=0, column=1, padx=5, pady=5)
         
@@ -111,7 +224,7 @@ class SerialTool:
         
         # Function code with description
         self.func_var = tk.StringVar(value="0x06")
-        self.func_dropdown = ttk.Combobox(self.modbus_frame, textvariable=self.func_var, values=["0x03 Read Registers","0x06 Write Register"], width=16)
+        self.func_dropdown = ttk.Combobox(self.modbus_frame, textvariable=self.func_var, values=["0x03 Read Registers","0x06 Write Register","0x10 Write Registers","0x17 Write+Read Registers"], width=16)
         self.func_dropdown.grid(row=0, column=3, padx=5, pady=5)
         
         self.start_address_label = ttk.Label(self.modbus_frame, text="Parameter Pxx:")
@@ -122,7 +235,7 @@ class SerialTool:
         self.start_address_spinbox.grid(row=1, column=1, padx=5, pady=5)
 
         # Data to Send
-        self.data_label = ttk.Label(self.modbus_frame, text="Data (decimal):")
+        self.data_label = ttk.Label(self.modbus_frame, text="Data (decimal, list for 0x10/0x17):")
         self.data_label.grid(row=2, column=0, padx=5, pady=5, sticky="w")
         
         self.data_var = tk.StringVar(value="10000")
@@ -132,6 +245,14 @@ class SerialTool:
         # Send Button
         self.send_button = ttk.Button(self.modbus_frame, text="Send", command=self.send_modbus_packet)
         self.send_button.grid(row=3, column=0, columnspan=4, padx=10, pady=10, sticky="ew")
+
+        # Full parameter set backup / restore
+        self.backup_button = ttk.Button(self.modbus_frame, text="Backup P000-P189...", command=self.backup_callback)
+        self.backup_button.grid(row=4, column=0, columnspan=2, padx=10, pady=5, sticky="ew")
+        self.restore_button = ttk.Button(self.modbus_frame, text="Restore parameters...", command=self.restore_callback)
+        self.restore_button.grid(row=4, column=2, columnspan=2, padx=10, pady=5, sticky="ew")
+        self.param_progress = ttk.Progressbar(self.modbus_frame, mode="determinate")
+        self.param_progress.grid(row=5, column=0, columnspan=4, padx=10, pady=5, sticky="ew")
         
         # Show Modbus TX checkbox
         self.log_modbusTX_checkbox_var = tk.BooleanVar(value=False)
@@ -145,6 +266,10 @@ class SerialTool:
         self.log_modbusRX_checkbox.state(['!alternate'])  # Disable alternate state
         self.log_modbusRX_checkbox.grid(row=2, column=2, padx=5, pady=5, columnspan=2, sticky="w")
 
+        self._log_tx = self._log_rx = False
+        self.log_modbusTX_checkbox_var.trace_add("write", self._log_checkbox_changed)
+        self.log_modbusRX_checkbox_var.trace_add("write", self._log_checkbox_changed)
+
         ### Log frame ###
         self.log_frame = ttk.LabelFrame(self.root, text="Log: ▼")
         self.log_frame.grid(row=2, column=0, padx=10, pady=10, sticky="ew")      
@@ -153,6 +278,7 @@ class SerialTool:
         # Log Window with reduced height
         self.logwindow = scrolledtext.ScrolledText(self.log_frame, state="disabled", height=5, width=60)  # Adjust height to reduce it
         self.logwindow.grid(row=1, column=0, padx=10, pady=5, sticky="ew")
+        self.log_view = LogView(self.logwindow, max_lines=LOG_MAX_LINES)
 
         # Clear log button aligned to the middle
         self.clearlog_button = ttk.Button(self.log_frame, text="Clear Log", command=self.clearlog_callback)
@@ -174,6 +300,14 @@ class SerialTool:
         self.stop_button = ttk.Button(self.vfd_frame, text="STOP", command=self.stop_button_callback)
         self.stop_button.grid(row=0, column=2, padx=5, pady=5)
 
+        # Motion profile
+        self.profile_button = ttk.Button(self.vfd_frame, text="Run profile...", command=self.profile_callback)
+        self.profile_button.grid(row=0, column=3, padx=5, pady=5)
+
+        # Watchdog
+        self.watchdog_label = ttk.Label(self.vfd_frame, text="Watchdog: off")
+        self.watchdog_label.grid(row=0, column=4, padx=5, pady=5)
+
         # Speed slider
         self.speed_label = ttk.Label(self.vfd_frame, text="Speed")
         self.speed_label.grid(row=1, column=0, padx=5, pady=5)
@@ -221,18 +355,236 @@ class SerialTool:
         self.get_fault_alarms_button = ttk.Button(self.sensor_frame, text="Get fault alarms", width=20, command=self.get_fault_alarms_callback)
         self.get_fault_alarms_button.grid(row=7, column=0, padx=5, pady=5)
 
+        # Get all of the above in one request
+        self.get_status_snapshot_button = ttk.Button(self.sensor_frame, text="Get full status", width=20, command=self.get_status_snapshot_callback)
+        self.get_status_snapshot_button.grid(row=8, column=0, padx=5, pady=5)
+
+        # Latest value next to each button, all fed from the same P180-P189 snapshot
+        self.status_labels = {}
+        for row, field in enumerate(("running", "set_frequency", "actual_frequency", "current", "voltage", "temperature", "inputs", "fault")):
+            self.status_labels[field] = ttk.Label(self.sensor_frame, text="-", width=24)
+            self.status_labels[field].grid(row=row, column=1, padx=5, pady=5, sticky="w")
+
+        # Continuous background polling
+        self.polling_var = tk.BooleanVar(value=False)
+        self.polling_checkbox = ttk.Checkbutton(self.sensor_frame, text="Poll continuously (Hz):", variable=self.polling_var, command=self.polling_toggle_callback)
+        self.polling_checkbox.state(['!alternate'])
+        self.polling_checkbox.grid(row=9, column=0, padx=5, pady=5, sticky="w")
+
+        self.poll_rate_var = tk.StringVar(value="10")
+        self.poll_rate_spinbox = ttk.Spinbox(self.sensor_frame, textvariable=self.poll_rate_var, values=("1", "2", "5", "10", "20"), width=6, command=self.poll_rate_callback)
+        self.poll_rate_spinbox.grid(row=9, column=1, padx=5, pady=5, sticky="w")
+
+        self.poll_stats_label = ttk.Label(self.sensor_frame, text="")
+        self.poll_stats_label.grid(row=10, column=0, columnspan=2, padx=5, pady=5, sticky="w")
+
+        # Binary recording of P182-P185 and replay into the status displays
+        self.record_frame = ttk.Frame(self.sensor_frame)
+        self.record_frame.grid(row=11, column=0, columnspan=2, sticky="w")
+        self.record_button = ttk.Button(self.record_frame, text="Record...", command=self.record_callback)
+        self.record_button.grid(row=0, column=0, padx=5, pady=5)
+        self.replay_button = ttk.Button(self.record_frame, text="Replay...", command=self.replay_callback)
+        self.replay_button.grid(row=0, column=1, padx=5, pady=5)
+        self.export_button = ttk.Button(self.record_frame, text="Export CSV...", command=self.export_csv_callback)
+        self.export_button.grid(row=0, column=2, padx=5, pady=5)
+
     def refresh_com_ports(self):
-        ports = serial.tools.list_ports.comports()
-        self.com_dropdown['values'] = [port.device for port in ports]
+        # Enumerating ports can take a while on Windows, keep it off the Tk thread
+        def enumerate_ports():
+            from discovery import list_port_names
+
+            devices = list_port_names()
+            self.call_in_ui(lambda: self.com_dropdown.configure(values=devices))
+
+        threading.Thread(target=enumerate_ports, name="list-ports", daemon=True).start()
+
+    def current_profile(self):
+        # ConnectionProfile from the connection fields
+        profile = ConnectionProfile(self.profile_var.get() or DEFAULT_PROFILE_NAME)
+        profile.port = self.com_var.get()
+        profile.baudrate = int(self.baud_var.get())
+        profile.stop_bits = self.stop_bits_var.get()
+        profile.slave_address = int(self.slave_var.get(), 16)
+        profile.parameter = int(self.start_address_var.get())
+        profile.drives = sorted(vfd.slave_address for vfd in self.registry.drives() if vfd.slave_address != profile.slave_address)
+        profile.autoconnect = self.autoconnect_var.get()
+        profile.poll = self.polling_var.get()
+        profile.turnaround = self.turnaround
+        return profile
+
+    def apply_profile(self, profile):
+        self.profile_var.set(profile.name)
+        self.com_var.set(profile.port)
+        self.baud_var.set(str(profile.baudrate))
+        self.stop_bits_var.set(profile.stop_bits)
+        self.slave_var.set(f"{profile.slave_address:X}")
+        self.start_address_var.set(profile.parameter)
+        self.autoconnect_var.set(profile.autoconnect)
+        self.polling_var.set(profile.poll)
+        self.turnaround = profile.turnaround
+        for vfd in self.registry.drives():
+            if vfd.slave_address not in profile.drives:
+                self.registry.remove(vfd.slave_address)
+        for address in profile.drives:
+            vfd = self.registry.add(address)
+            self.snapshots.restore(profile.name, address, vfd.store)
+
+    def load_session(self):
+        # Fill in the last used profile and its last known drive state; returns
+        # True when the profile asks to connect right away
+        self.profile_dropdown["values"] = self.profiles.names()
+        profile = self.profiles.last_profile()
+        if profile is None:
+            return False
+        self.apply_profile(profile)
+        timestamp = self.snapshots.restore(profile.name, profile.slave_address, self.telemetry)
+        if timestamp is not None:
+            self.log_message(f"Showing last known state from {time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(timestamp))}", color="blue")
+        self._saved_telemetry_version = self.telemetry.version
+        return profile.autoconnect
+
+    def save_snapshots(self):
+        # Only for saved profiles, when new samples came in, and never the
+        # values of a replayed recording
+        profile_name = self.profile_var.get()
+        if profile_name not in self.profiles.profiles or self._replay_stop is not None:
+            return
+        if self.telemetry.version == self._saved_telemetry_version:
+            return
+        try:
+            primary_address = int(self.slave_var.get(), 16)
+        except ValueError:
+            return
+        # self.telemetry holds the drive at slave_var only; never file it under another address
+        stores = {vfd.slave_address: vfd.store for vfd in self.registry.drives() if vfd.store is not self.telemetry}
+        stores[primary_address] = self.telemetry
+        for slave_address, store in stores.items():
+            words = {param: word for param, word in store.snapshot().items() if param in drive.STATUS_PARAMS}
+            if words:
+                timestamp = max(store.get_with_time(param)[1] for param in words)
+                self.snapshots.put(profile_name, slave_address, words, timestamp)
+        try:
+            self.snapshots.save()
+        except OSError as e:
+            self.log_message(f"Could not save the drive state: {e}", color="red")
+        self._saved_telemetry_version = self.telemetry.version
+
+    def _save_snapshots_periodically(self):
+        self.save_snapshots()
+        self.root.after(SNAPSHOT_SAVE_INTERVAL_MS, self._save_snapshots_periodically)
+
+    def profile_selected_callback(self, event=None):
+        profile = self.profiles.get(self.profile_var.get())
+        if profile is None:
+            return
+        if self.connected:
+            self.connect_disconnect()
+        self.stop_replay()
+        self.apply_profile(profile)
+        self.profiles.use(profile.name)
+        self.snapshots.restore(profile.name, profile.slave_address, self.telemetry)
+        self.log_message(f"Profile {profile.name}: {profile.port} {profile.baudrate} baud, slave 0x{profile.slave_address:02X}")
+        if profile.autoconnect:
+            self.connect_disconnect()
+
+    def save_profile_callback(self):
+        name = simpledialog.askstring("Save profile", "Profile name (site or drive group):",
+                                      initialvalue=self.profile_var.get(), parent=self.root)
+        if not name:
+            return
+        self.profile_var.set(name.strip())
+        try:
+            profile = self.current_profile()
+            self.profiles.put(profile)
+        except ValueError:
+            messagebox.showerror("Error", "Invalid connection settings.")
+            return
+        except OSError as e:
+            messagebox.showerror("Error", f"Could not save the profile: {e}")
+            return
+        self.profile_dropdown["values"] = self.profiles.names()
+        self.log_message(f"Profile {profile.name} saved to {self.profiles.path}", color="green")
+
+    def delete_profile_callback(self):
+        name = self.profile_var.get()
+        if name not in self.profiles.profiles:
+            return
+        if not messagebox.askyesno("Delete profile", f"Delete profile {name}?"):
+            return
+        self.profiles.delete(name)
+        self.profile_dropdown["values"] = self.profiles.names()
+        self.log_message(f"Profile {name} deleted")
+
+    def discover_callback(self):
+        # Scan every listed port (in parallel) for drives at the common baud rates
+        if self.connected:
+            messagebox.showerror("Error", "Disconnect first, discovery needs the serial ports.")
+            return
+        import discovery
+
+        scanning = {}
+
+        def progress(port, baudrate, address):
+            if scanning.get(port) != baudrate:
+                scanning[port] = baudrate
+                self.log_message(f"Scanning {port} at {baudrate} baud...")
+
+        def found(result):
+            self.log_message(f"Found {result.describe()}", color="green")
+
+        def failed(port, error):
+            self.log_message(f"{port}: {error}", color="red")
+
+        def run():
+            # Ports are listed here, not from the dropdown, which refresh_com_ports() fills in later
+            try:
+                ports = discovery.list_port_names()
+            except Exception as e:
+                self.log_message(f"Could not list the serial ports: {e}", color="red")
+                ports = []
+            self.call_in_ui(lambda: self.com_dropdown.configure(values=ports))
+            if not ports:
+                self.log_message("No serial ports found.", color="red")
+            drives = discovery.discover(ports, progress=progress, on_found=found, on_error=failed)
+            self.call_in_ui(self._discovery_finished, drives)
+
+        self.discover_button.state(["disabled"])
+        self.connect_button.state(["disabled"])
+        threading.Thread(target=run, name="discovery", daemon=True).start()
+
+    def _discovery_finished(self, drives):
+        self.discover_button.state(["!disabled"])
+        self.connect_button.state(["!disabled"])
+        if not drives:
+            self.log_message("Discovery finished, no drives found.", color="red")
+            return
+        self.log_message(f"Discovery finished, {len(drives)} drive(s) found.", color="green")
+        first = drives[0]
+        self.com_var.set(first.port)
+        self.baud_var.set(str(first.baudrate))
+        self.slave_var.set(f"{first.slave_address:X}")
+        for result in drives:
+            if result.port == first.port and result.exception_code is None:
+                self.registry.add(result.slave_address)
 
     def connect_disconnect(self):
         if self.connected:
+            self.stop_watchdog()  # first, the Tk thread blocks while the threads below are joined
+            if self.profile_runner:
+                self.profile_runner.stop(timeout=2)  # sends STOP while the worker still runs
+            self.stop_polling()
+            self.setpoint_writer.stop(timeout=2)  # still sends the last setpoint
+            self.setpoint_writer = None
+            self.worker.stop(timeout=2)
+            self.worker = None
             self.client.close()
             self.connected = False
             self.connect_button.config(text="Connect")
             self.log_message("Disconnected from serial port.")
         else:
             try:
+                from pymodbus.client.serial import ModbusSerialClient
+
                 self.client = ModbusSerialClient(
                     port=self.com_var.get(),
                     baudrate=int(self.baud_var.get()),
@@ -241,6 +593,24 @@ class SerialTool:
                 )
                 self.connected = self.client.connect()
                 if self.connected:
+                    # Baud derived timeouts and silent interval, resync and read retries
+                    link = ModbusRTU(self.client.socket, baudrate=int(self.baud_var.get()), robust=True, turnaround=self.turnaround)
+                    link.on_frame = self._log_modbus_frame
+                    link.on_transaction = self.metrics.record
+                    link.on_retry = self.metrics.record_retry
+                    self.metrics.baudrate = link.baudrate
+                    self.worker = BusWorker(RegisterCache(link))  # reads within a register's ttl skip the bus
+                    self.function_support.clear()
+                    self.worker.start()
+                    self.setpoint_writer = CoalescingWriter(
+                        self.worker, SETPOINT_WRITE_RATE_HZ,
+                        on_written=lambda *args: self.call_in_ui(self._setpoint_written, *args),
+                        on_retry=lambda slave_address, address, attempt: self.metrics.record_retry(slave_address, 0x06),
+                    )
+                    self.setpoint_writer.start()
+                    self.start_watchdog(link)
+                    if self.polling_var.get():
+                        self.start_polling()
                     self.connect_button.config(text="Disconnect")
                     self.log_message("Connected to serial port.")
                 else:
@@ -249,18 +619,12 @@ class SerialTool:
                 messagebox.showerror("Error", str(e))
 
     def compute_crc16(self, data):
-        crc = 0xFFFF
-        for pos in data:
-            crc ^= pos
-            for _ in range(8):
-                if (crc & 1) != 0:
-                    crc >>= 1
-                    crc ^= 0xA001
-                else:
-                    crc >>= 1
-        return crc
+        # Table driven implementation, see modbus_rtu.py
+        return crc16(data)
 
-    def send_modbus_packet(self):
+    def send_modbus_packet(self, on_response=None, priority=PRIORITY_READ):
+        # Queue the packet described by the Modbus settings fields on the bus worker.
+        # on_response is called on the Tk thread with the parsed response, or None on failure.
         if not self.connected:
             messagebox.showerror("Error", "Not connected to any COM port.")
             return None
@@ -270,91 +634,166 @@ class SerialTool:
             slave_address = int(self.slave_var.get(), 16)  # Convert hex string to integer
             function_code = int(self.func_var.get().split()[0], 16)  # Get function code integer from dropdown
             start_address = int(self.start_address_var.get()) + 40000  # Parameter address offset
-            data = int(self.data_var.get())
-
-            # Create Modbus packet without CRC
-            packet = struct.pack('>BBHH', slave_address, function_code, start_address, data)
-            crc = self.compute_crc16(packet)
-            packet += struct.pack('<H', crc)
-
-            # Send packet via serial client
-            self.client.socket.write(packet)
-            
-            if self.log_modbusTX_checkbox_var.get():
-                self.log_message(f"Sent    : {' '.join(format(x, '02X') for x in packet)}")
-
-            # Determine expected response length based on function code
-            if function_code == 0x06:
-                expected_length = 8  # Fixed length for function 0x06
-            elif function_code == 0x03:
-                # Read the first 3 bytes of the response to determine byte count
-                header = self.client.socket.read(3)  # Slave address, function code, byte count
-                if len(header) < 3:
-                    self.log_message("Error: Incomplete response header received.")
-                    return None
-
-                # Unpack the header to get the byte count
-                slave_address, function_code, byte_count = struct.unpack('>BBB', header)
-                expected_length = 3 + byte_count + 2  # Header (3 bytes) + data bytes + CRC (2 bytes)
-
-                # Read the remaining response bytes based on the expected length
-                response_body = self.client.socket.read(expected_length - 3)
-                if len(response_body) != (expected_length - 3):
-                    self.log_message("Error: Incomplete response body received.")
-                    return None
-
-                # Combine header and body
-                response = header + response_body
-            else:
-                self.log_message("Unsupported function code or not implemented.")
-                return None
-
-            # For function 0x06, directly read the full expected length
-            if function_code == 0x06:
-                response = self.client.socket.read(expected_length)
-                if len(response) != expected_length:
-                    self.log_message("Error: Incomplete response body received.")
-                    return None
-
-            # Separate CRC for validation
-            response_without_crc = response[:-2]  # All except CRC bytes
-            received_crc = struct.unpack('<H', response[-2:])[0]
-            calculated_crc = self.compute_crc16(response_without_crc)
-
-            # Check CRC validity
-            if received_crc != calculated_crc:
-                self.log_message("CRC error: Invalid checksum in received packet.")
-                return None
-
-            # Parse response if CRC is correct
-            response_structure = {
-                "slave_address": slave_address,
-                "function_code": function_code
-            }
-
-            if function_code == 0x06:
-                # Unpack response fields for function code 0x06
-                response_structure["register_address"], response_structure["data"] = struct.unpack('>HH', response[2:6])
-            elif function_code == 0x03:
-                # For function 0x03, parse the data bytes based on byte count
-                response_structure["byte_count"] = byte_count
-                data_bytes = response[3:3 + byte_count]
-                response_structure["data"] = [struct.unpack('>H', data_bytes[i:i+2])[0] for i in range(0, len(data_bytes), 2)]
-
-            # Log the structured response
-            response_hex = ' '.join(format(x, '02X') for x in response)
-            
-            if self.log_modbusRX_checkbox_var.get():
-                self.log_message(f"Received: {response_hex}")
-            
-            return response_structure
-
-        except ValueError:
+            values = [int(value) for value in self.data_var.get().replace(",", " ").split()]
+            if function_code in (0x10, 0x17):
+                # validate field ranges
+                if function_code == 0x10:
+                    build_write_multiple_request(slave_address, start_address, values)
+                else:
+                    build_read_write_multiple_request(slave_address, start_address, len(values), start_address, values)
+                return self._send_multiple(slave_address, function_code, start_address, values, on_response, priority)
+            data, = values  # 0x03: register count, 0x06: value
+            build_request(slave_address, function_code, start_address, data)  # validate field ranges
+        except (ValueError, struct.error):
             messagebox.showerror("Error", "Invalid input data.")
             return None
+
+        return self.submit_to_bus(
+            lambda link: link.execute(slave_address, function_code, start_address, data),
+            on_response=on_response or self._log_cached_response, priority=priority
+        )
+
+    def _send_multiple(self, slave_address, function_code, address, values, on_response, priority):
+        # 0x10 writes the values to consecutive parameters, 0x17 also reads
+        # them back in the same transaction. Drives without the function get
+        # the fewest 0x06 writes (and a 0x03 read) instead.
+        def job(link):
+            if function_code == 0x17:
+                words, sent = read_write_values(link, slave_address, address, len(values), address, values, self.function_support)
+            else:
+                words, sent = None, write_values(link, slave_address, address, values, self.function_support)
+            return {"slave_address": slave_address, "function_code": function_code, "data": words, "sent": sent}
+
+        def log_result(response):
+            if response:
+                first = address - drive.PARAMETER_OFFSET
+                params = f"P{first:03d}" + (f"-P{first + len(values) - 1:03d}" if len(values) > 1 else "")
+                single_requests = len(values) + (function_code == 0x17)  # one 0x06 per value, one 0x03
+                sent = response["sent"]
+                requests = ", ".join(f"{sent.count(fc)}x 0x{fc:02X}" for fc in sorted(set(sent), key=sent.index))
+                self.log_message(f"{params} written with {requests}, {single_requests - len(sent)} round trips saved", color="green")
+                if function_code not in sent and (function_code == 0x17 or len(values) > 1):
+                    self.log_message(f"Drive {slave_address:02X} does not support 0x{function_code:02X}, used the fallback")
+                if response["data"] is not None:
+                    self.log_message(f"Read back: {response['data']}", color="blue")
+            if on_response:
+                on_response(response)
+
+        return self.submit_to_bus(job, on_response=log_result, priority=priority)
+
+    def _log_cached_response(self, response):
+        # Responses from the register cache never appear in the RX log
+        if response and response.get("cached"):
+            self.log_message(f"Cached  : {response['data']}")
+
+    def _handle_response(self, future, on_response):
+        try:
+            response = future.result()
+        except ModbusError as e:
+            self.log_message(f"Error: {e}")
+            response = None
         except Exception as e:
             messagebox.showerror("Error", str(e))
+            response = None
+
+        if on_response:
+            on_response(response)
+
+    def submit_to_bus(self, function, *args, on_response=None, priority=PRIORITY_READ):
+        # Run function(link, *args) on the bus worker, result handled like send_modbus_packet
+        if not self.connected:
+            messagebox.showerror("Error", "Not connected to any COM port.")
             return None
+        future = self.worker.submit(function, *args, priority=priority)
+        if self.watchdog and priority <= PRIORITY_COMMAND:
+            self.watchdog.track(future)
+        future.add_done_callback(lambda f: self.call_in_ui(self._handle_response, f, on_response))
+        return future
+
+    def _log_modbus_frame(self, direction, frame):
+        # Called on the bus worker thread; hex formatting is deferred until the log is flushed
+        if direction == "TX" and self._log_tx:
+            self.log_message(lambda: f"Sent    : {format_frame(frame)}")
+        elif direction == "RX" and self._log_rx:
+            self.log_message(lambda: f"Received: {format_frame(frame)}")
+
+    def _log_checkbox_changed(self, *args):
+        # Plain bools, readable from the bus worker thread
+        self._log_tx = self.log_modbusTX_checkbox_var.get()
+        self._log_rx = self.log_modbusRX_checkbox_var.get()
+
+    def _telemetry_listener_failed(self, listener, error):
+        name = getattr(listener, "__qualname__", repr(listener))
+        if name not in self._failed_listeners:
+            self._failed_listeners.add(name)
+            self.log_message(f"Telemetry consumer {name} failed: {error}", color="red")
+
+    def _slave_changed(self, *args):
+        try:
+            self._slave_address = int(self.slave_var.get(), 16)
+        except ValueError:
+            pass
+
+    def start_watchdog(self, link):
+        # The raw link is the watchdog's own path for the STOP when the worker is blocked
+        self.watchdog = Watchdog(self.worker, self._watched_addresses, link=link)
+        self.watchdog.on_trip = self._watchdog_tripped
+        self.watchdog.on_recover = lambda: self.log_message("Watchdog: responding again", color="green")
+        self.watchdog.start()
+
+    def stop_watchdog(self):
+        if self.watchdog:
+            self.watchdog.stop(timeout=1)
+            report = self.watchdog.report()
+            self.log_message(
+                f"Watchdog: worst command latency {report['worst_command_latency'] * 1000:.0f} ms, "
+                f"{report['heartbeats']} heartbeats, {report['trips']} trips"
+            )
+            self.watchdog = None
+            self.watchdog_label["text"] = "Watchdog: off"
+
+    def _watched_addresses(self):
+        # Called on the watchdog thread: the drive in use and every polled drive
+        addresses = {vfd.slave_address for vfd in self.registry.drives()}
+        if self._slave_address is not None:
+            addresses.add(self._slave_address)
+        return sorted(addresses)
+
+    def _watchdog_tripped(self, reason, latency):
+        # Called on the watchdog thread, the Tk thread may be the one that hangs
+        profile_runner = self.profile_runner
+        if profile_runner:
+            profile_runner.stop(timeout=0)  # no further profile commands after the STOP
+        self.log_message(f"Watchdog: {reason}, STOP sent in {latency * 1000:.0f} ms", color="red")
+
+    def call_in_ui(self, function, *args):
+        # Thread safe: schedule function(*args) on the Tk thread
+        self._ui_calls.put((function, args))
+
+    def _drain_ui_calls(self):
+        if self.watchdog:
+            self.watchdog.feed()  # the Tk loop is alive
+        try:
+            while True:
+                function, args = self._ui_calls.get_nowait()
+                function(*args)
+        except queue.Empty:
+            pass
+        finally:
+            self.root.after(UI_POLL_INTERVAL_MS, self._drain_ui_calls)
+
+    def close(self):
+        self.save_snapshots()
+        if self.connected:
+            self.connect_disconnect()
+        self.stop_replay()
+        if self.recorder:
+            self.recorder.close()
+        if self.metrics_exporter:
+            self.metrics_exporter.stop(timeout=1)
+        if self._supervisor:
+            self._supervisor.stop(timeout=1)
+        self.root.destroy()
 
     @staticmethod
     def binarystring_to_decimalstring(binary_str):
@@ -388,6 +827,9 @@ class SerialTool:
             self.data_label.grid_remove()
             self.data_entry.grid_remove()
             self.send_button.grid_remove()
+            self.backup_button.grid_remove()
+            self.restore_button.grid_remove()
+            self.param_progress.grid_remove()
             self.log_modbusTX_checkbox.grid_remove()
             self.log_modbusRX_checkbox.grid_remove()
             self.modbus_frame.config(height=25)
@@ -402,6 +844,9 @@ class SerialTool:
             self.data_label.grid()
             self.data_entry.grid()
             self.send_button.grid()
+            self.backup_button.grid()
+            self.restore_button.grid()
+            self.param_progress.grid()
             self.log_modbusTX_checkbox.grid()
             self.log_modbusRX_checkbox.grid()
             self.modbus_frame.config(text="Modbus Settings: ▼")     
@@ -413,7 +858,7 @@ class SerialTool:
         self.start_address_var.set("103")        # Set Parameter Pxx
         self.data_var.set(self.binarystring_to_decimalstring("0b0001")) # Set Data (decimal)
         self.log_message("Start drive in Forward (FWD) direction", color="green")
-        self.send_modbus_packet()
+        self.send_modbus_packet(priority=PRIORITY_COMMAND)
     
     def rev_button_callback(self):
         # [P103] - REV action.
@@ -421,180 +866,480 @@ class SerialTool:
         self.start_address_var.set("103")
         self.data_var.set(self.binarystring_to_decimalstring("0b0011"))
         self.log_message("Start drive in Reverse (REV) direction", color="green")
-        self.send_modbus_packet()
+        self.send_modbus_packet(priority=PRIORITY_COMMAND)
     
     def stop_button_callback(self):
         # [P103] - STOP action.
+        if self.profile_runner:
+            self.profile_runner.stop(timeout=0.5)  # the runner sends its own STOP as well
         self.func_var.set("0x06")
         self.start_address_var.set("103")
         self.data_var.set(self.binarystring_to_decimalstring("0b0000"))
         self.log_message("Stop drive", color="green")
-        self.send_modbus_packet()
+        self.send_modbus_packet(priority=PRIORITY_STOP)
     
+    def profile_callback(self):
+        import motion_profile
+
+        if self.profile_runner:
+            self.profile_runner.stop(timeout=0.5)
+            return
+        if not self.connected:
+            messagebox.showerror("Error", "Not connected to any COM port.")
+            return
+        path = filedialog.askopenfilename(title="Run motion profile", filetypes=[("Motion profile", "*.json")])
+        if not path:
+            return
+        try:
+            slave_address = int(self.slave_var.get(), 16)
+            commands, duration = motion_profile.compile_timeline(motion_profile.load_profile(path))
+        except (ValueError, KeyError, TypeError, OSError) as e:
+            messagebox.showerror("Error", f"Invalid profile: {e}")
+            return
+
+        def on_command(record):
+            late = f" (+{record.jitter * 1000:.1f} ms)" if record.jitter > 0.001 else ""
+            if record.error:
+                self.log_message(f"Profile {record.command.offset:.2f} s {record.command.label}: {record.error}", color="red")
+            else:
+                self.log_message(f"Profile {record.command.offset:.2f} s {record.command.label}{late}", color="green")
+
+        # Samples the status block itself unless the poller already does
+        self.profile_runner = motion_profile.ProfileRunner(
+            WorkerLink(self.worker, PRIORITY_COMMAND), slave_address, commands,
+            store=None if self.poller else self.telemetry,
+            on_command=on_command,
+            on_finished=lambda runner: self.call_in_ui(self._profile_finished, runner),
+            duration=duration,
+        )
+        self.log_message(f"Running profile {path}: {len(commands)} commands over {self.profile_runner.duration:.1f} s", color="green")
+        self.profile_button.config(text="Abort profile")
+        self.profile_runner.start()
+
+    def _profile_finished(self, runner):
+        self.profile_runner = None
+        self.profile_button.config(text="Run profile...")
+        summary = runner.jitter_summary()
+        if runner.aborted:
+            self.log_message(f"Profile aborted, drive stopped. {runner.error or ''}", color="red")
+        if summary["commands"]:
+            self.log_message(
+                f"Profile timing: jitter mean {summary['mean'] * 1000:.2f} ms, p99 {summary['p99'] * 1000:.2f} ms, "
+                f"max {summary['max'] * 1000:.2f} ms; {summary['errors']} failed writes", color="blue")
+
     def frequency_slider_callback(self, event=None):
-        # [P102] - SPEED.
-        frequency = str(int(self.frequency_slider.get()))
+        # [P102] - SPEED. Fires for every slider step; writes are coalesced and rate limited.
+        frequency = int(self.frequency_slider.get())
+        self.speedvalue_label["text"] = f"{frequency} Hz"
+        if not self.connected:
+            return
+        try:
+            slave_address = int(self.slave_var.get(), 16)
+        except ValueError:
+            messagebox.showerror("Error", "Invalid input data.")
+            return
+        self.setpoint_writer.write(slave_address, drive.param_address(drive.P_SET_FREQUENCY), frequency * 100)
 
-        self.func_var.set("0x06")
-        self.start_address_var.set("102")
-        self.data_var.set(str(int(self.frequency_slider.get())*100))
-        self.log_message(f"Set Setpoint-frequency: {frequency} Hz", color="green")
-        self.speedvalue_label["text"] = frequency + " Hz"
-        self.send_modbus_packet()
+    def _setpoint_written(self, slave_address, address, value, error):
+        if error:
+            self.log_message(f"Error: setpoint write failed: {error}", color="red")
+        elif address == drive.param_address(drive.P_SET_FREQUENCY):
+            self.log_message(f"Set Setpoint-frequency: {value // 100} Hz", color="green")
         
-    def get_running_status_button_callback(self):
-        # [P180] - Get running status
-        self.func_var.set("0x03")  # Set Function Code
-        self.start_address_var.set("180")        # Set Parameter Pxx
-        self.data_var.set("1") # read single register
-        
-        response = self.send_modbus_packet()
-        if response:
-            data = response.get("data")[0]
-            
-            # self.log_message(data >> 0 & 1) #BIT0
-            # self.log_message(data >> 1 & 1) #BIT1
-            # self.log_message(data >> 2 & 1) #BIT2
-            # self.log_message(data >> 3 & 1) #BIT3
-            # self.log_message(data >> 4 & 1) #BIT4
-            # self.log_message(data >> 5 & 1) #BIT5
-            # self.log_message(data >> 6 & 1) #BIT6
-            # self.log_message(data >> 7 & 1) #BIT7
-            
-            if data & 0b111 == 0b111: # BIT0, BIT1 and BIT2 are HIGH (running)
-                self.log_message("Status   : Running", color="blue")
-            else:
-                self.log_message("Status   : Not running (Stopped)", color="blue")
-            
-            if data & (1 << 4) == (1 << 4): #Bit4 = HIGH; NOTE: manual sastates bit4-bit7 for direction status but only bit4 is used!
-                self.log_message("Direction: Reverse", color="blue")
+    def request_status_snapshot(self, on_snapshot):
+        # [P180]-[P189] - one block read feeds every status display
+        try:
+            slave_address = int(self.slave_var.get(), 16)
+        except ValueError:
+            messagebox.showerror("Error", "Invalid input data.")
+            return
+
+        def show_response(snapshot):
+            if snapshot:
+                self.last_snapshot = snapshot
+                self.show_status_snapshot(snapshot)
+                on_snapshot(snapshot)
             else:
-                self.log_message("Direction: Forward", color="blue")
-            
+                self.log_message("invalid response", color="red")
+
+        self.submit_to_bus(drive.read_status_snapshot, slave_address, on_response=show_response)
+
+    def show_status_snapshot(self, snapshot):
+        self.status_labels["running"]["text"] = ("Running" if snapshot.running else "Stopped") + (" REV" if snapshot.reverse else " FWD")
+        self.status_labels["set_frequency"]["text"] = f"{snapshot.set_frequency:.2f} Hz"
+        self.status_labels["actual_frequency"]["text"] = f"{snapshot.actual_frequency:.2f} Hz"
+        for field, param in (("current", drive.P_CURRENT), ("voltage", drive.P_VOLTAGE), ("temperature", drive.P_TEMPERATURE),
+                             ("inputs", drive.P_INPUT_TERMINALS), ("fault", drive.P_FAULT)):
+            self.status_labels[field]["text"] = register_map.REGISTERS[param].format(snapshot.word(param))
+
+    def log_running_status(self, snapshot):
+        if snapshot.running:
+            self.log_message("Status   : Running", color="blue")
         else:
-            self.log_message("invalid response", color="red")
-        
-    def get_set_frequency_button_callback(self):
-        # [P103] - Get setpoint frequency
-        self.func_var.set("0x03")  # Set Function Code
-        self.start_address_var.set("181")        # Set Parameter Pxx
-        self.data_var.set("1") # read single register
-        
-        response = self.send_modbus_packet()
-        if response:
-            data = int(response.get("data")[0])
-            self.log_message(f"Get Setpoint-frequency: {int(data/100)} Hz", color="blue")
+            self.log_message("Status   : Not running (Stopped)", color="blue")
+
+        if snapshot.reverse:
+            self.log_message("Direction: Reverse", color="blue")
         else:
-            self.log_message("invalid response", color="red")
-    
+            self.log_message("Direction: Forward", color="blue")
+
+    def log_set_frequency(self, snapshot):
+        self.log_message(f"Get Setpoint-frequency: {int(snapshot.set_frequency)} Hz", color="blue")
+
+    def log_actual_frequency(self, snapshot):
+        self.log_message(f"Get Actual-frequency: {int(snapshot.actual_frequency)} Hz", color="blue")
+
+    def log_running_current(self, snapshot):
+        self.log_message(f"Get Running-current: {snapshot.current:.1f} A", color="blue")
+
+    def log_running_voltage(self, snapshot):
+        self.log_message(f"Get Running-voltage: {snapshot.voltage:.1f} V", color="blue")
+
+    def log_temperature_vfd(self, snapshot):
+        self.log_message(f"Get Temperature-VFD: {snapshot.temperature} °C", color="blue")
+
+    def log_input_terminal_status(self, snapshot):
+        x = snapshot.inputs
+        self.log_message(f"X0={x[0]} X1={x[1]} X2={x[2]} X3={x[3]} (0=Open 1=GND)", color="blue")
+
+    def _fault_event(self, event):
+        self.log_message(event.describe(), color="red" if event.tripped else "green")
+
+    def log_fault_alarms(self, snapshot):
+        fault = snapshot.fault_info
+        if fault is None:
+            self.log_message(f"{bin(snapshot.fault)}", color="blue")
+        else:
+            self.log_message(f"{bin(snapshot.fault)} {fault.code}: {fault.description}", color="blue")
+
+    def get_running_status_button_callback(self):
+        # [P180] - Get running status
+        self.request_status_snapshot(self.log_running_status)
+
+    def get_set_frequency_button_callback(self):
+        # [P181] - Get setpoint frequency
+        self.request_status_snapshot(self.log_set_frequency)
+
     def get_actual_frequency_button_callback(self):
         # [P182] - Get actual running frequency
-        self.func_var.set("0x03")
-        self.start_address_var.set("182")
-        self.data_var.set("1")
-        response = self.send_modbus_packet()
-        
-        if response:
-            data = int(response.get("data")[0])
-            self.log_message(f"Get Actual-frequency: {int(data/100)} Hz", color="blue")
-        else:
-            self.log_message("invalid response", color="red")
-            
+        self.request_status_snapshot(self.log_actual_frequency)
+
     def get_running_current_button_callback(self):
         # [P183] - Get VFD output running current
-        self.func_var.set("0x03")
-        self.start_address_var.set("183")
-        self.data_var.set("1")
-        response = self.send_modbus_packet()
-        
-        if response:
-            data = float(response.get("data")[0])
-            self.log_message(f"Get Running-current: {data/10} A", color="blue")
-        else:
-            self.log_message("invalid response", color="red")
-    
+        self.request_status_snapshot(self.log_running_current)
+
     def get_running_voltage_button_callback(self):
         # [P184] - Get VFD output running voltage
-        self.func_var.set("0x03")
-        self.start_address_var.set("184")
-        self.data_var.set("1")
-        response = self.send_modbus_packet()
-        
-        if response:
-            data = float(response.get("data")[0])
-            self.log_message(f"Get Running-voltage: {data/10} V", color="blue")
-        else:
-            self.log_message("invalid response", color="red")
-            
+        self.request_status_snapshot(self.log_running_voltage)
+
     def get_temperature_vfd_button_callback(self):
         # [P185] - Get VFD internal temperature
-        self.func_var.set("0x03")
-        self.start_address_var.set("185")
-        self.data_var.set("1")
-        response = self.send_modbus_packet()
-        
-        if response:
-            data = float(response.get("data")[0])
-            self.log_message(f"Get Temperature-VFD: {data} °C", color="blue")
-        else:
-            self.log_message("invalid response", color="red")
-    
-    # [P185], [P186], [P187] - special VFD mode, not implemented
-        
+        self.request_status_snapshot(self.log_temperature_vfd)
+
+    # [P186], [P187] - special VFD mode, not implemented
+
     def get_input_terminal_status_callback(self):
         # [P188] - Feedback external terminal input status
-        self.func_var.set("0x03")
-        self.start_address_var.set("188")
-        self.data_var.set("1")
-        response = self.send_modbus_packet()
-        
-        if response:
-            x = response.get("data")[0]
-            self.log_message(f"X0={x >> 0 & 1} X1={x >> 1 & 1} X2={x >> 2 & 1} X3={x >> 3 & 1} (0=Open 1=GND)", color="blue")                
-        else:
-            self.log_message("invalid response", color="red")
+        self.request_status_snapshot(self.log_input_terminal_status)
 
     def get_fault_alarms_callback(self):
-        # [P188] - Feedback external terminal input status
-        self.func_var.set("0x03")
-        self.start_address_var.set("189")
-        self.data_var.set("1")
-        response = self.send_modbus_packet()
-        
-        if response:
-            x = response.get("data")[0]
-            self.log_message(f"{bin(x)}", color="blue")                
+        # [P189] - Fault alarms
+        self.request_status_snapshot(self.log_fault_alarms)
+
+    def get_status_snapshot_callback(self):
+        def log_all(snapshot):
+            self.log_running_status(snapshot)
+            self.log_set_frequency(snapshot)
+            self.log_actual_frequency(snapshot)
+            self.log_running_current(snapshot)
+            self.log_running_voltage(snapshot)
+            self.log_temperature_vfd(snapshot)
+            self.log_input_terminal_status(snapshot)
+            self.log_fault_alarms(snapshot)
+
+        self.request_status_snapshot(log_all)
+
+    def start_polling(self):
+        try:
+            slave_address = int(self.slave_var.get(), 16)
+            rate = float(self.poll_rate_var.get())
+        except ValueError:
+            messagebox.showerror("Error", "Invalid input data.")
+            self.polling_var.set(False)
+            return
+        self.stop_replay()
+        self._release_primary()
+        existing = self.registry.get(slave_address)
+        primary_drive = self.registry.add(slave_address)
+        self._primary = (primary_drive, existing.store if existing else None)
+        primary_drive.store = self.telemetry  # the status labels and the recorder follow this store
+        primary_drive.set_rate(0, rate)
+        self.poller = TelemetryPoller(self.worker, self.registry)
+        self.poller.start()
+
+    def primary_drive(self):
+        try:
+            return self.registry.get(int(self.slave_var.get(), 16))
+        except ValueError:
+            return None
+
+    def open_stats_panel(self):
+        if self.stats_panel is None or not self.stats_panel.winfo_exists():
+            self.stats_panel = BusStatsPanel(self.root, self)
+        self.stats_panel.lift()
+
+    def start_metrics_export(self, path, interval=5.0):
+        # Keep rewriting path (JSON for *.json, Prometheus text otherwise) until the app closes
+        if self.metrics_exporter:
+            self.metrics_exporter.stop(timeout=1)
+        self.metrics_exporter = MetricsExporter(self.metrics, path, interval)
+        self.metrics_exporter.on_error = lambda error: self.log_message(f"Could not export the bus metrics: {error}", color="red")
+        self.metrics_exporter.start()
+
+    def open_plot_panel(self):
+        if self.plot_panel is None or not self.plot_panel.winfo_exists():
+            self.plot_panel = LivePlotPanel(self.root, self)
+        self.plot_panel.lift()
+
+    def bus_supervisor(self):
+        # Further adapters, each polled by its own worker; see bus_supervisor.py
+        if self._supervisor is None:
+            self._supervisor = BusSupervisor()
+            self._supervisor.on_error = lambda port_name, error: self.log_message(f"{port_name}: {error}", color="red")
+        return self._supervisor
+
+    def open_buses_panel(self):
+        if self.buses_panel is None or not self.buses_panel.winfo_exists():
+            self.buses_panel = BusSupervisorPanel(self.root, self)
+        self.buses_panel.lift()
+
+    def open_dashboard(self):
+        if self.dashboard is None or not self.dashboard.winfo_exists():
+            self.dashboard = DriveDashboard(self.root, self)
+        self.dashboard.lift()
+
+    def stop_polling(self):
+        if self.poller:
+            self.poller.stop(timeout=2)
+            self.poller = None
+        self._release_primary()
+        self.poll_stats_label["text"] = ""
+
+    def _release_primary(self):
+        # Only the drive at slave_var may feed self.telemetry: a drive added just
+        # for polling leaves the registry, a drive added before gets its store back
+        if self._primary is None:
+            return
+        primary_drive, own_store = self._primary
+        self._primary = None
+        if own_store is None:
+            self.registry.remove(primary_drive.slave_address)
+        else:
+            primary_drive.store = own_store
+
+    def polling_toggle_callback(self):
+        if not self.connected:
+            return  # polling starts on connect
+        if self.polling_var.get():
+            self.start_polling()
         else:
-            self.log_message("invalid response", color="red")
+            self.stop_polling()
+
+    def poll_rate_callback(self):
+        primary_drive = self.primary_drive()
+        if primary_drive:
+            try:
+                primary_drive.set_rate(0, float(self.poll_rate_var.get()))
+            except ValueError:
+                pass
+
+    def _refresh_status_from_telemetry(self):
+        # The UI only reads the store; all bus traffic comes from the poller
+        try:
+            if self.telemetry.version != self._shown_telemetry_version:
+                self._shown_telemetry_version = self.telemetry.version
+                snapshot = self.telemetry.status_snapshot()
+                if snapshot:
+                    self.last_snapshot = snapshot
+                    self.show_status_snapshot(snapshot)
+            primary_drive = self.primary_drive()
+            if self.poller and primary_drive:
+                latency = primary_drive.last_latency
+                self.poll_stats_label["text"] = (
+                    f"polls {primary_drive.polls}  errors {primary_drive.errors}  "
+                    f"latency {latency * 1000:.0f} ms  back-off x{primary_drive.backoff:g}" if latency is not None else "waiting for first poll"
+                )
+            if self.watchdog:
+                report = self.watchdog.report()
+                self.watchdog_label["text"] = (
+                    f"Watchdog: {'TRIPPED' if report['tripped'] else 'ok'}  "
+                    f"worst command {report['worst_command_latency'] * 1000:.0f} ms"
+                )
+        finally:
+            self.root.after(STATUS_REFRESH_INTERVAL_MS, self._refresh_status_from_telemetry)
+
+    def record_callback(self):
+        if self.recorder:
+            self.recorder.close()
+            self.log_message(f"Recording stopped, {self.recorder.records_written} samples written to {self.recorder.path}")
+            self.recorder = None
+            self.record_button.config(text="Record...")
+            return
+        path = filedialog.asksaveasfilename(title="Record telemetry", defaultextension=".vfdrec", filetypes=[("Telemetry recording", "*.vfdrec")])
+        if not path:
+            return
+        try:
+            self.recorder = TelemetryRecorder(path)
+        except OSError as e:
+            messagebox.showerror("Error", str(e))
+            return
+        self.recorder.attach(self.telemetry)
+        self.record_button.config(text="Stop recording")
+        self.log_message(f"Recording P182-P185 to {path} (enable polling to sample)")
+
+    def replay_callback(self):
+        if self._replay_stop:
+            self.stop_replay()
+            return
+        if self.poller:
+            messagebox.showerror("Error", "Stop polling before replaying a recording.")
+            return
+        path = filedialog.askopenfilename(title="Replay telemetry", filetypes=[("Telemetry recording", "*.vfdrec"), ("All files", "*")])
+        if not path:
+            return
+        try:
+            recording = TelemetryRecording(path)
+        except (OSError, ValueError) as e:
+            messagebox.showerror("Error", str(e))
+            return
+
+        stop_event = self._replay_stop = threading.Event()
+
+        def replay():
+            recording.replay(self.telemetry, stop_event=stop_event)
+            self.call_in_ui(self._replay_finished, stop_event)
+
+        threading.Thread(target=replay, name="telemetry-replay", daemon=True).start()
+        self.replay_button.config(text="Stop replay")
+        self.log_message(f"Replaying {path}")
+
+    def stop_replay(self):
+        if self._replay_stop:
+            self._replay_stop.set()
+            self._replay_finished(self._replay_stop)
+
+    def _replay_finished(self, stop_event):
+        if self._replay_stop is stop_event:
+            self._replay_stop = None
+            self._saved_telemetry_version = self.telemetry.version  # replayed values are not the drive's state
+            self.replay_button.config(text="Replay...")
+            self.log_message("Replay finished")
+
+    def export_csv_callback(self):
+        path = filedialog.askopenfilename(title="Export recording", filetypes=[("Telemetry recording", "*.vfdrec"), ("All files", "*")])
+        if not path:
+            return
+        csv_path = filedialog.asksaveasfilename(title="Export to CSV", defaultextension=".csv", filetypes=[("CSV", "*.csv")])
+        if not csv_path:
+            return
+
+        def export():
+            try:
+                rows = TelemetryRecording(path).export_csv(csv_path)
+                self.log_message(f"Exported {rows} samples to {csv_path}")
+            except (OSError, ValueError) as e:
+                self.log_message(f"Error: export failed: {e}", color="red")
+
+        threading.Thread(target=export, name="telemetry-export", daemon=True).start()
+
+    def _param_progress(self, done, total, message):
+        self.param_progress["maximum"] = max(total, 1)
+        self.param_progress["value"] = done
+        self.log_message(message)
+
+    def _run_parameter_job(self, job):
+        # Runs job(link, slave_address, progress) on its own thread; its
+        # transactions are queued one by one so STOP still gets through.
+        if not self.connected:
+            messagebox.showerror("Error", "Not connected to any COM port.")
+            return
+        try:
+            slave_address = int(self.slave_var.get(), 16)
+        except ValueError:
+            messagebox.showerror("Error", "Invalid input data.")
+            return
+        link = WorkerLink(self.worker, PRIORITY_READ)
+
+        def progress(done, total, message):
+            self.call_in_ui(self._param_progress, done, total, message)
+
+        def run():
+            try:
+                job(link, slave_address, progress)
+            except Exception as e:
+                self.log_message(f"Error: {e}", color="red")
+            finally:
+                self.call_in_ui(self._parameter_job_finished)
+
+        self.backup_button.state(["disabled"])
+        self.restore_button.state(["disabled"])
+        threading.Thread(target=run, name="parameter-job", daemon=True).start()
+
+    def _parameter_job_finished(self):
+        self.backup_button.state(["!disabled"])
+        self.restore_button.state(["!disabled"])
+
+    def backup_callback(self):
+        path = filedialog.asksaveasfilename(title="Backup parameters", defaultextension=".json", filetypes=[("Parameter backup", "*.json")])
+        if not path:
+            return
+
+        def job(link, slave_address, progress):
+            values, missing = param_backup.backup(link, slave_address, path, progress=progress)
+            self.log_message(f"Saved {len(values)} parameters to {path}", color="green")
+            if missing:
+                self.log_message(f"Not readable: {', '.join(f'P{p:03d}' for p in missing)}", color="red")
+
+        self._run_parameter_job(job)
+
+    def restore_callback(self):
+        path = filedialog.askopenfilename(title="Restore parameters", filetypes=[("Parameter backup", "*.json"), ("All files", "*")])
+        if not path:
+            return
+        try:
+            wanted = param_backup.load_backup(path)
+        except (OSError, ValueError, KeyError) as e:
+            messagebox.showerror("Error", str(e))
+            return
+
+        def job(link, slave_address, progress):
+            result = param_backup.restore(link, slave_address, wanted, progress=progress, support=self.function_support)
+            for param, (old, new) in result.changes.items():
+                self.log_message(f"P{param:03d}: {old} -> {new}")
+            mode = "0x10" if result.multi_write else "0x06"
+            self.log_message(f"{len(result.changes)} parameters changed, {result.requests} write requests ({mode})", color="green")
+            for param, error in result.failed.items():
+                self.log_message(f"P{param:03d} write failed: {error}", color="red")
+            for param, (read_back, wanted_value) in result.mismatches.items():
+                self.log_message(f"P{param:03d} verify failed: read {read_back}, expected {wanted_value}", color="red")
+
+        self._run_parameter_job(job)
 
     def log_message(self, message, color="black"):
-        # Get the current date and time
-        now = datetime.datetime.now()
-        # Format the timestamp as a string
-        timestamp = now.strftime("%H:%M:%S")
-        
-        # Insert the timestamp in black
-        self.logwindow.config(state="normal")
-        self.logwindow.insert(tk.END, f"[{timestamp}] ", "black")
-        
-        # Create a unique tag name for each message
-        tag_name = f"color_{timestamp}_{color}"
-        self.logwindow.tag_configure(tag_name, foreground=color)
-        
-        # Insert the message with the unique color tag
-        self.logwindow.insert(tk.END, f"{message}\n", tag_name)
-        
-        self.logwindow.config(state="disabled")
-        self.logwindow.see(tk.END)
+        # Thread safe; message may be a callable that is formatted when the log is flushed
+        self.log_view.append(message, color)
 
-    
     def clearlog_callback(self):
         # Clear the contents of the log widget.
-        self.logwindow.config(state="normal")  # enable editing
-        self.logwindow.delete('1.0', 'end')   # delete all text in the widget
-        self.logwindow.config(state="disabled")  # disable editing
+        self.log_view.clear()
+
+
+def main():
+    root = tk.Tk()
+    app = SerialTool(root)
+    root.mainloop()
+
 
+if __name__ == "__main__":
+    main()
 
-root = tk.Tk()
-app = SerialTool(root)
-root.mainloop()
@@ -0,0 +1,74 @@
+#
+# Throughput and latency of modbus_async.AsyncModbusRTU against the simulated
+# VFD served on a pseudo terminal (POSIX only, no hardware needed).
+#
+# Run from the repository root:
+#   python -m benchmarks.bench_async_transport [--baud 9600] [--requests 200]
+#
+
+import argparse
+import asyncio
+import os
+import statistics
+import time
+
+import drive
+from modbus_async import AsyncModbusRTU
+from modbus_rtu import ModbusTimeoutError, ModbusExceptionError
+from vfd_sim import SimulatedBus, SimulatedVFD, PtyServer
+
+
+async def run(device, baudrate, requests, concurrency):
+    fd = os.open(device, os.O_RDWR | os.O_NOCTTY)
+    link = AsyncModbusRTU(fd, baudrate, close_fd=lambda: os.close(fd))
+    latencies = []
+
+    async def client(count):
+        for _ in range(count):
+            start = time.perf_counter()
+            await link.read_holding_registers(8, drive.param_address(drive.STATUS_FIRST), 10)
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(client(requests // concurrency) for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+
+    # Deadline and exception handling
+    timeout_start = time.perf_counter()
+    try:
+        await link.read_holding_registers(99, drive.param_address(180), 1)
+    except ModbusTimeoutError:
+        pass
+    timeout_elapsed = time.perf_counter() - timeout_start
+    try:
+        await link.read_holding_registers(8, drive.param_address(500), 1)
+    except ModbusExceptionError as e:
+        exception = str(e)
+    link.close()
+
+    latencies.sort()
+    print(f"baud {baudrate}: {len(latencies)} block reads in {elapsed:.2f} s = {len(latencies) / elapsed:.1f} transactions/s")
+    print(f"  latency incl. queueing: p50 {statistics.median(latencies) * 1000:.1f} ms  "
+          f"p99 {latencies[int(len(latencies) * 0.99) - 1] * 1000:.1f} ms")
+    print(f"  missing slave timed out after {timeout_elapsed * 1000:.0f} ms (baud derived deadline)")
+    print(f"  exception response: {exception}")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--baud", type=int, action="append", help="baud rate(s) to emulate")
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=4, help="number of tasks issuing requests")
+    args = parser.parse_args()
+
+    for baudrate in args.baud or [9600, 38400, 115200]:
+        server = PtyServer(SimulatedBus([SimulatedVFD(8)]), baudrate=baudrate)
+        server.start()
+        try:
+            asyncio.run(run(server.device_name, baudrate, args.requests, args.concurrency))
+        finally:
+            server.stop(timeout=1)
+
+
+if __name__ == "__main__":
+    main()
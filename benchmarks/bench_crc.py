@@ -0,0 +1,60 @@
+#
+# Compare the table-driven CRC16 in modbus_rtu with the original bit-by-bit
+# SerialTool.compute_crc16 and verify both produce identical checksums.
+#
+# Run from the repository root:
+#   python -m benchmarks.bench_crc
+#
+
+import os
+import random
+import timeit
+
+from modbus_rtu import crc16, crc16_batch, check_crc_batch, append_crc
+
+
+def compute_crc16_reference(data):
+    # Copy of the original SerialTool.compute_crc16
+    crc = 0xFFFF
+    for pos in data:
+        crc ^= pos
+        for _ in range(8):
+            if (crc & 1) != 0:
+                crc >>= 1
+                crc ^= 0xA001
+            else:
+                crc >>= 1
+    return crc
+
+
+def verify(frames):
+    for frame in frames:
+        expected = compute_crc16_reference(frame)
+        assert crc16(frame) == expected, frame.hex()
+        assert crc16(memoryview(frame)) == expected, frame.hex()
+    assert crc16_batch(frames) == [compute_crc16_reference(f) for f in frames]
+    assert all(check_crc_batch([append_crc(f) for f in frames if len(f) >= 2]))
+
+
+def main():
+    rng = random.Random(1234)
+    # Typical frame sizes: 6 byte requests, 3..25 byte responses, full 0x03 reads
+    frames = [os.urandom(rng.choice((6, 6, 3, 5, 23, 253))) for _ in range(2000)]
+    frames.append(b"")
+    frames.append(bytes(range(256)))
+    verify(frames)
+    print(f"verified {len(frames)} frames: outputs identical")
+
+    request = bytes.fromhex("0803 9CF4 000A")  # read P180..P189 from slave 8
+    number = 20000
+    for label, func in (("reference", compute_crc16_reference), ("table", crc16)):
+        seconds = timeit.timeit(lambda: func(request), number=number)
+        print(f"{label:10s}: {seconds / number * 1e6:7.2f} us per 6 byte frame")
+
+    batch = [append_crc(f) for f in frames[:500]]
+    seconds = timeit.timeit(lambda: check_crc_batch(batch), number=20)
+    print(f"batch     : {seconds / 20 / len(batch) * 1e6:7.2f} us per frame ({len(batch)} frames per call)")
+
+
+if __name__ == "__main__":
+    main()
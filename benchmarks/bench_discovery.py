@@ -0,0 +1,53 @@
+#
+# Duration of a discovery scan (addresses 1-247, common baud rates) over
+# simulated lines, compared with probing sequentially with a 1 s timeout.
+#
+# Three simulated ports are scanned in parallel: drives 0x01 and 0x08 at
+# 19200 baud on the first (found through the likely addresses, one sweep),
+# drive 0x20 at 9600 baud on the second (first rate, one sweep) and no drive
+# on the third (every rate swept, the worst case).
+#
+# Run from the repository root:
+#   python -m benchmarks.bench_discovery
+#
+
+import time
+
+import discovery
+from vfd_sim import SimulatedBus, SimulatedVFD, LoopbackPort
+
+BUSES = {
+    "sim0": SimulatedBus([SimulatedVFD(0x01), SimulatedVFD(0x08)], response_delay=0.002, baudrate=19200),
+    "sim1": SimulatedBus([SimulatedVFD(0x20)], response_delay=0.002, baudrate=9600),
+    "sim2": SimulatedBus([], baudrate=9600),
+}
+
+
+def open_port(port_name, baudrate, timeout):
+    return LoopbackPort(BUSES[port_name], baudrate=baudrate, timeout=timeout)
+
+
+def main():
+    probes = []
+    start = time.perf_counter()
+    last_open = {}  # port name -> start of its last sweep
+
+    def timed_open_port(port_name, baudrate, timeout):
+        last_open[port_name] = time.perf_counter() - start
+        return open_port(port_name, baudrate, timeout)
+
+    found = discovery.discover(BUSES, timed_open_port, progress=lambda *args: probes.append(args),
+                               on_found=lambda d: print(f"  {time.perf_counter() - start:5.1f} s  {d.describe()}"))
+    elapsed = time.perf_counter() - start
+
+    assert [(d.port, d.baudrate, d.slave_address) for d in found] == [("sim0", 19200, 1), ("sim0", 19200, 8), ("sim1", 9600, 0x20)]
+    print(f"{len(found)} drives on {len(BUSES)} ports in {elapsed:.1f} s, {len(probes)} probes")
+    for port_name in BUSES:
+        print(f"  {port_name}: {sum(1 for p in probes if p[0] == port_name)} probes, last sweep started at {last_open[port_name]:.1f} s")
+    print(f"  probe timeout {discovery.probe_timeout(9600) * 1000:.0f} ms at 9600 baud, "
+          f"{discovery.probe_timeout(115200) * 1000:.0f} ms at 115200 baud")
+    print(f"  the same probes one after another with 1 s timeouts: about {len(probes) / 60:.0f} minutes")
+
+
+if __name__ == "__main__":
+    main()
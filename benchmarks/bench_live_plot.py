@@ -0,0 +1,59 @@
+#
+# Cost of preparing one live plot redraw (window lookup + min/max
+# decimation of every series) as the history fills up, and the cost the
+# polling thread pays per telemetry update. Needs no display.
+#
+# Run from the repository root:
+#   python -m benchmarks.bench_live_plot [--width 660]
+#
+
+import argparse
+import time
+
+from live_plot import TelemetryHistory, STRIPS, WINDOWS, decimate_minmax
+from telemetry import TelemetryStore
+
+POLL_RATE_HZ = 10
+
+
+def prepare(history, start, end, columns):
+    points = 0
+    for _, params, _ in STRIPS:
+        for param in params:
+            times, values = history.window(param, start, end, columns)
+            points += len(decimate_minmax(times, values, start, end, columns)[0])
+    return points
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--width", type=int, default=660, help="plot width in pixels")
+    args = parser.parse_args()
+
+    store = TelemetryStore()
+    history = TelemetryHistory()
+    history.attach(store)
+    t = 0.0
+    polled = 0
+    print(f"{POLL_RATE_HZ} Hz polling, {args.width} px wide plot, capacity {history.series[181].capacity} samples per series")
+    for minutes in (1, 10, 30, 120, 600):
+        samples = minutes * 60 * POLL_RATE_HZ
+        start = time.perf_counter()
+        while polled < samples:
+            store.update({181: 5000, 182: 4000 + polled % 1000, 183: 52, 184: 2300, 185: 41}, t)
+            t += 1.0 / POLL_RATE_HZ
+            polled += 1
+        for label, window in WINDOWS.items():
+            start = time.perf_counter()
+            points = prepare(history, t - window, t, args.width)
+            elapsed = time.perf_counter() - start
+            print(f"after {minutes:3d} min, window {label:>6}: {elapsed * 1000:6.2f} ms per redraw, {points:5d} points drawn")
+
+    start = time.perf_counter()
+    for i in range(10000):
+        history.on_update({181: 5000, 182: 4000, 183: 52, 184: 2300, 185: 41}, t + i)
+    print(f"listener cost on the polling thread: {(time.perf_counter() - start) / 10000 * 1e6:.1f} us per update")
+
+
+if __name__ == "__main__":
+    main()
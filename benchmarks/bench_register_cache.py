@@ -0,0 +1,66 @@
+#
+# Bus transactions saved by register_cache.RegisterCache for a typical GUI
+# session: status polling at 10 Hz, Get buttons clicked a few times per
+# second and slider setpoint writes each followed by a P181 check.
+#
+# Run from the repository root:
+#   python -m benchmarks.bench_register_cache [--seconds 3]
+#
+
+import argparse
+import time
+
+import drive
+from modbus_rtu import ModbusRTU
+from register_cache import RegisterCache
+from vfd_sim import SimulatedBus, SimulatedVFD, LoopbackPort
+
+POLL_PERIOD = 0.1
+GET_PERIOD = 0.25
+SLIDER_PERIOD = 0.2
+TICK = 0.01
+
+
+def session(link, seconds):
+    # Same request sequence whether or not link is cached
+    start = time.monotonic()
+    next_poll = next_get = next_slider = start
+    setpoint = 1000
+    requests = 0
+    while time.monotonic() - start < seconds:
+        now = time.monotonic()
+        if now >= next_poll:
+            drive.read_status_snapshot(link, 8)
+            next_poll += POLL_PERIOD
+            requests += 1
+        if now >= next_get:
+            drive.read_status_snapshot(link, 8)
+            next_get += GET_PERIOD
+            requests += 1
+        if now >= next_slider:
+            setpoint += 10
+            link.write_register(8, drive.param_address(drive.P_SET_FREQUENCY), setpoint)
+            assert link.read_holding_registers(8, drive.param_address(drive.P_SET_FREQUENCY_FEEDBACK), 1) == [setpoint]
+            next_slider += SLIDER_PERIOD
+            requests += 2
+        time.sleep(TICK)
+    return requests
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--seconds", type=float, default=3.0)
+    args = parser.parse_args()
+
+    for cached in (False, True):
+        raw = ModbusRTU(LoopbackPort(SimulatedBus([SimulatedVFD(8)])))
+        link = RegisterCache(raw) if cached else raw
+        requests = session(link, args.seconds)
+        line = f"{'cached' if cached else 'direct'}: {requests} requests -> {raw.transactions} bus transactions"
+        if cached:
+            line += f" (hit rate {link.hit_rate:.0%})"
+        print(line)
+
+
+if __name__ == "__main__":
+    main()
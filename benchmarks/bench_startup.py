@@ -0,0 +1,58 @@
+#
+# Startup time of the headless command line interface, and a check that the
+# library modules load without the GUI and serial packages.
+#
+# Run from the repository root:
+#   python -m benchmarks.bench_startup [--runs 20]
+#
+
+import argparse
+import statistics
+import subprocess
+import sys
+import time
+
+LIBRARY_MODULES = (
+    "modbus_rtu", "bus_worker", "drive", "telemetry", "drive_registry",
+    "write_coalescer", "param_backup", "telemetry_recorder", "vfd",
+)
+GUI_MODULES = ("tkinter", "sv_ttk", "pywinstyles", "ttkthemes", "pymodbus", "serial")
+
+
+def time_command(command, runs):
+    samples = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run(command, check=True, stdout=subprocess.DEVNULL)
+        samples.append(time.perf_counter() - start)
+    return statistics.median(samples), min(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, default=20)
+    args = parser.parse_args()
+
+    check = (
+        f"import sys; import {', '.join(LIBRARY_MODULES)}; "
+        f"loaded = [m for m in {GUI_MODULES!r} if m in sys.modules]; "
+        "print(','.join(loaded)); sys.exit(1 if loaded else 0)"
+    )
+    result = subprocess.run([sys.executable, "-c", check], capture_output=True, text=True)
+    if result.returncode:
+        print(f"library import pulled in: {result.stdout.strip() or result.stderr.strip()}")
+    else:
+        print("library modules import without GUI/serial packages")
+
+    commands = {
+        "python (baseline)": [sys.executable, "-c", "pass"],
+        "vfd --help": [sys.executable, "vfd.py", "--help"],
+        "vfd --simulate status": [sys.executable, "vfd.py", "--simulate", "status"],
+    }
+    for label, command in commands.items():
+        median, best = time_command(command, args.runs)
+        print(f"{label:24s}: median {median * 1000:6.1f} ms  best {best * 1000:6.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+#
+# Total polling throughput of bus_supervisor.BusSupervisor with 1-8
+# simulated adapters, each a separate bus of drives polled as fast as the
+# line allows. The LoopbackPorts emulate the wire time, so each bus is
+# limited by its baud rate like a real one and the total should grow
+# linearly with the number of adapters.
+#
+# Run from the repository root:
+#   python -m benchmarks.bench_supervisor [--baud 19200] [--drives 4] [--seconds 3]
+#
+
+import argparse
+import time
+
+from bus_supervisor import BusSupervisor
+from vfd_sim import SimulatedBus, SimulatedVFD, LoopbackPort
+
+SATURATING_RATE_HZ = 1000  # poll rate per drive far above what a bus can carry
+
+
+def run(ports, baudrate, drive_count, seconds):
+    buses = {f"sim{i}": SimulatedBus([SimulatedVFD(address) for address in range(1, drive_count + 1)]) for i in range(ports)}
+    supervisor = BusSupervisor(lambda name, baud, timeout: LoopbackPort(buses[name], baudrate=baud, timeout=timeout))
+    for name in buses:
+        supervisor.add_port(name, baudrate, range(1, drive_count + 1), poll_rate_hz=SATURATING_RATE_HZ)
+    time.sleep(0.5)  # first polls, threads up to speed
+    counts = [bus.link.transactions for bus in supervisor.buses.values()]
+    start = time.perf_counter()
+    time.sleep(seconds)
+    elapsed = time.perf_counter() - start
+    counts = [bus.link.transactions - n for bus, n in zip(supervisor.buses.values(), counts)]
+    updates = supervisor.store.version
+    supervisor.stop()
+    return sum(counts) / elapsed, min(counts) / elapsed, updates
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--baud", type=int, default=19200)
+    parser.add_argument("--drives", type=int, default=4, help="drives per bus")
+    parser.add_argument("--seconds", type=float, default=3.0)
+    args = parser.parse_args()
+
+    print(f"{args.drives} drives per bus at {args.baud} baud, polled as fast as possible")
+    single = None
+    for ports in (1, 2, 4, 8):
+        total, slowest, updates = run(ports, args.baud, args.drives, args.seconds)
+        single = single or total
+        print(f"{ports} port(s): {total:7.1f} transactions/s total ({total / single:4.1f}x), "
+              f"slowest bus {slowest:6.1f}/s, {updates} merged store updates")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+#
+# Modbus TCP gateway throughput and cache hit rate with several TCP clients
+# polling the same drive, against the simulated VFD on a LoopbackPort with
+# wire timing (no hardware needed).
+#
+# Run from the repository root:
+#   python -m benchmarks.bench_tcp_gateway [--baud 9600] [--clients 8] [--seconds 3]
+#
+
+import argparse
+import asyncio
+import struct
+import time
+
+import drive
+from bus_worker import BusWorker
+from modbus_rtu import ModbusRTU
+from modbus_tcp_gateway import ModbusTCPGateway, MBAP, caching_link
+from vfd_sim import SimulatedBus, SimulatedVFD, LoopbackPort
+
+
+async def client(port, seconds, latencies):
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    pdu = struct.pack(">BHH", 0x03, drive.param_address(drive.STATUS_FIRST), 10)
+    transaction_id = 0
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        transaction_id = (transaction_id + 1) & 0xFFFF
+        start = time.perf_counter()
+        writer.write(MBAP.pack(transaction_id, 0, len(pdu) + 1, 8) + pdu)
+        header = await reader.readexactly(MBAP.size)
+        response = await reader.readexactly(MBAP.unpack(header)[2] - 1)
+        assert response[0] == 0x03, response
+        latencies.append(time.perf_counter() - start)
+    writer.close()
+
+
+async def write_order(port):
+    # Setpoint writes from two clients must arrive in the order sent
+    connections = [await asyncio.open_connection("127.0.0.1", port) for _ in range(2)]
+    for i in range(20):
+        reader, writer = connections[i % 2]
+        pdu = struct.pack(">BHH", 0x06, drive.param_address(drive.P_SET_FREQUENCY), 1000 + i)
+        writer.write(MBAP.pack(i, 0, len(pdu) + 1, 8) + pdu)
+        await reader.readexactly(MBAP.size + len(pdu))
+    for _, writer in connections:
+        writer.close()
+
+
+async def run(baudrate, clients, seconds, ttl):
+    vfd = SimulatedVFD(8)
+    link = ModbusRTU(LoopbackPort(SimulatedBus([vfd]), baudrate=baudrate), baudrate=baudrate)
+    worker = BusWorker(caching_link(link, ttl))
+    worker.start()
+    gateway = ModbusTCPGateway(worker, "127.0.0.1", 0)
+    server = await gateway.start_server()
+
+    latencies = []
+    start = time.perf_counter()
+    await asyncio.gather(*(client(gateway.port, seconds, latencies) for _ in range(clients)))
+    elapsed = time.perf_counter() - start
+    await write_order(gateway.port)
+    assert vfd.registers[drive.P_SET_FREQUENCY] == 1019
+
+    server.close()
+    await server.wait_closed()
+    worker.stop(timeout=2)
+
+    latencies.sort()
+    print(f"baud {baudrate}, {clients} clients, TTL {ttl * 1000:.0f} ms: "
+          f"{len(latencies) / elapsed:.1f} client reads/s, {link.transactions / elapsed:.1f} bus transactions/s, "
+          f"cache hit rate {gateway.hit_rate:.0%}, {gateway.merged_reads} merged reads, p50 {latencies[len(latencies) // 2] * 1000:.1f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--baud", type=int, default=9600)
+    parser.add_argument("--clients", type=int, default=8)
+    parser.add_argument("--seconds", type=float, default=3.0)
+    args = parser.parse_args()
+
+    for ttl in (0.0, 0.1, 0.5):
+        asyncio.run(run(args.baud, args.clients, args.seconds, ttl))
+
+
+if __name__ == "__main__":
+    main()
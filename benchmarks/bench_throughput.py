@@ -0,0 +1,134 @@
+#
+# Reproducible load test against simulated drives: transactions per second,
+# p50/p99 latency and CPU time per transaction for several baud rates and
+# numbers of drives on the bus.
+#
+# The workload is what the GUI generates while polling: round-robin block
+# reads of P180-P189 from every drive with a setpoint write every tenth
+# transaction, through the robust ModbusRTU transport. The drives run with
+# ramp dynamics; with --fault-probability they trip at random as well. By
+# default the link is in-process (LoopbackPort emulating the wire time);
+# --pty goes through a pseudo terminal and pyserial like a real adapter.
+# CPU time is that of the whole process, the simulated drives included.
+#
+# Run from the repository root:
+#   python -m benchmarks.bench_throughput [--baud 9600 --baud 115200] [--drives 1 --drives 8]
+#                                         [--transactions 100] [--json results.json]
+#
+
+import argparse
+import json
+import platform
+import sys
+import time
+
+import drive
+from modbus_rtu import ModbusRTU, ModbusError
+from vfd_sim import SimulatedBus, SimulatedVFD, LoopbackPort, PtyServer
+
+BAUDRATES = (9600, 19200, 38400, 115200)
+DRIVE_COUNTS = (1, 4, 16)
+WRITE_EVERY = 10
+SEED = 1
+
+
+def make_bus(drive_count, fault_probability):
+    vfds = []
+    for i in range(drive_count):
+        vfd = SimulatedVFD(i + 1, ramp_time=2.0, fault_probability=fault_probability, seed=SEED + i)
+        vfd.write(drive.P_SET_FREQUENCY, 2500)
+        vfd.write(drive.P_CONTROL, drive.CONTROL_FWD)
+        vfds.append(vfd)
+    return SimulatedBus(vfds)
+
+
+def open_pty_link(bus, baudrate):
+    import serial
+
+    server = PtyServer(bus, baudrate=baudrate)
+    server.start()
+    port = serial.Serial(server.device_name, baudrate=baudrate, timeout=1.0)
+    return ModbusRTU(port, baudrate=baudrate, robust=True), lambda: (port.close(), server.stop(timeout=1))
+
+
+def run(baudrate, drive_count, transactions, fault_probability=0.0, pty=False):
+    bus = make_bus(drive_count, fault_probability)
+    if pty:
+        link, close = open_pty_link(bus, baudrate)
+    else:
+        link, close = ModbusRTU(LoopbackPort(bus, baudrate=baudrate), baudrate=baudrate, robust=True), lambda: None
+
+    latencies = []
+    errors = 0
+
+    def on_transaction(slave_address, function_code, elapsed, sent, received, error=None):
+        nonlocal errors
+        if error is None:
+            latencies.append(elapsed)
+        else:
+            errors += 1
+
+    link.on_transaction = on_transaction
+    setpoint = 2500
+    cpu_start = time.process_time()
+    start = time.perf_counter()
+    try:
+        for n in range(transactions):
+            slave_address = n % drive_count + 1
+            try:
+                if n % WRITE_EVERY == WRITE_EVERY - 1:
+                    setpoint = 2500 + (n * 37) % 2500
+                    link.write_register(slave_address, drive.param_address(drive.P_SET_FREQUENCY), setpoint)
+                else:
+                    link.read_holding_registers(slave_address, drive.param_address(drive.STATUS_FIRST), 10)
+            except ModbusError:
+                pass
+    finally:
+        elapsed = time.perf_counter() - start
+        cpu = time.process_time() - cpu_start
+        close()
+
+    latencies.sort()
+    count = len(latencies)
+    return {
+        "baudrate": baudrate,
+        "drives": drive_count,
+        "transactions": link.transactions,
+        "errors": errors,
+        "tripped": sum(1 for vfd in bus.vfds.values() if vfd.fault),
+        "transactions_per_second": link.transactions / elapsed,
+        "p50_ms": latencies[count // 2] * 1000 if count else None,
+        "p99_ms": latencies[min(count - 1, int(count * 0.99))] * 1000 if count else None,
+        "cpu_us_per_transaction": cpu / max(1, link.transactions) * 1e6,
+        "utilisation": link.utilisation(link.bytes_sent + link.bytes_received, elapsed),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--baud", type=int, action="append", help=f"baud rate, repeatable (default {BAUDRATES})")
+    parser.add_argument("--drives", type=int, action="append", help=f"drives on the bus, repeatable (default {DRIVE_COUNTS})")
+    parser.add_argument("--transactions", type=int, default=100, help="per configuration")
+    parser.add_argument("--fault-probability", type=float, default=0.0)
+    parser.add_argument("--pty", action="store_true", help="through a pseudo terminal and pyserial (POSIX)")
+    parser.add_argument("--json", help="also write the results to this file")
+    args = parser.parse_args()
+
+    print(f"Python {platform.python_version()} on {platform.platform()}, {'pty' if args.pty else 'in-process'} link, "
+          f"{args.transactions} transactions per configuration, seed {SEED}")
+    print(f"{'baud':>7} {'drives':>6} {'tx/s':>7} {'p50 ms':>7} {'p99 ms':>7} {'CPU us/tx':>9} {'bus':>5} {'errors':>6} {'tripped':>7}")
+    results = []
+    for baudrate in args.baud or BAUDRATES:
+        for drive_count in args.drives or DRIVE_COUNTS:
+            r = run(baudrate, drive_count, args.transactions, args.fault_probability, args.pty)
+            results.append(r)
+            print(f"{r['baudrate']:7d} {r['drives']:6d} {r['transactions_per_second']:7.1f} {r['p50_ms']:7.1f} {r['p99_ms']:7.1f} "
+                  f"{r['cpu_us_per_transaction']:9.0f} {r['utilisation']:5.0%} {r['errors']:6d} {r['tripped']:7d}")
+            sys.stdout.flush()
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"python": platform.python_version(), "platform": platform.platform(), "results": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
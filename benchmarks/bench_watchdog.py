@@ -0,0 +1,103 @@
+#
+# Watchdog reaction times against simulated drives: how long after the
+# application stops responding the drives are stopped, and the worst command
+# latency the heartbeat saw on a loaded bus.
+#
+# Scenarios, each with telemetry polling of every drive in the background:
+#   healthy  the control loop keeps feeding, nothing may trip
+#   ui-hang  the control loop stops feeding (a hung Tk thread)
+#   blocked  a long job occupies the bus worker (STOP has to take the direct path)
+# "stopped after" is the time from the failure until the last simulated drive
+# has seen the STOP; it is bounded by the deadline plus one period plus the
+# STOP transactions (and the grace period when the worker is blocked).
+#
+# Run from the repository root:
+#   python -m benchmarks.bench_watchdog [--baud 9600] [--drives 4] [--deadline 1.0] [--period 0.1]
+#
+
+import argparse
+import platform
+import time
+
+import drive
+from bus_worker import BusWorker, PRIORITY_POLL
+from drive_registry import DriveRegistry
+from modbus_rtu import ModbusRTU
+from telemetry import TelemetryPoller
+from vfd_sim import SimulatedBus, SimulatedVFD, LoopbackPort
+from watchdog import Watchdog
+
+SCENARIOS = ("healthy", "ui-hang", "blocked")
+FEED_INTERVAL = 0.016  # like the GUI's UI_POLL_INTERVAL_MS
+SETTLE_TIME = 1.0  # seconds of normal operation before the failure
+HOLD_TIME = 3.0  # seconds the failure lasts
+
+
+def run(scenario, baudrate, drive_count, period, deadline):
+    vfds = []
+    for i in range(drive_count):
+        vfd = SimulatedVFD(i + 1, ramp_time=0.5)
+        vfd.write(drive.P_SET_FREQUENCY, 2500)
+        vfd.write(drive.P_CONTROL, drive.CONTROL_FWD)
+        vfds.append(vfd)
+    link = ModbusRTU(LoopbackPort(SimulatedBus(vfds), baudrate=baudrate), baudrate=baudrate, robust=True)
+    worker = BusWorker(link)
+    worker.start()
+    registry = DriveRegistry()
+    for vfd in vfds:
+        registry.add(vfd.slave_address).set_rate(0, 5.0)
+    poller = TelemetryPoller(worker, registry)
+    poller.start()
+    watchdog = Watchdog(worker, [vfd.slave_address for vfd in vfds], link=link, period=period, deadline=deadline)
+    watchdog.start()
+
+    stopped_after = None
+    try:
+        settled = time.monotonic() + SETTLE_TIME
+        while time.monotonic() < settled:
+            watchdog.feed()
+            time.sleep(FEED_INTERVAL)
+        failure = time.monotonic()
+        if scenario == "blocked":
+            worker.submit(lambda link: time.sleep(HOLD_TIME), priority=PRIORITY_POLL)
+        next_feed = failure
+        while time.monotonic() < failure + HOLD_TIME:
+            now = time.monotonic()
+            if scenario != "ui-hang" and now >= next_feed:
+                watchdog.feed()
+                next_feed = now + FEED_INTERVAL
+            if stopped_after is None and not any(vfd.running for vfd in vfds):
+                stopped_after = now - failure
+            time.sleep(0.001)
+    finally:
+        watchdog.stop(timeout=1)
+        poller.stop(timeout=1)
+        worker.stop(timeout=HOLD_TIME)
+    report = watchdog.report()
+    report["scenario"] = scenario
+    report["stopped_after"] = stopped_after
+    report["running"] = sum(1 for vfd in vfds if vfd.running)
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--baud", type=int, default=9600)
+    parser.add_argument("--drives", type=int, default=4)
+    parser.add_argument("--period", type=float, default=0.1)
+    parser.add_argument("--deadline", type=float, default=1.0)
+    args = parser.parse_args()
+
+    print(f"Python {platform.python_version()} on {platform.platform()}, {args.baud} baud, {args.drives} drives, "
+          f"period {args.period} s, deadline {args.deadline} s")
+    print(f"{'scenario':>8} {'trips':>5} {'stopped after':>13} {'still running':>13} {'STOP ms':>7} "
+          f"{'worst cmd ms':>12} {'loop late ms':>12}")
+    for scenario in SCENARIOS:
+        r = run(scenario, args.baud, args.drives, args.period, args.deadline)
+        stopped = f"{r['stopped_after']:.2f} s" if r["stopped_after"] is not None else "-"
+        print(f"{r['scenario']:>8} {r['trips']:5d} {stopped:>13} {r['running']:13d} {r['worst_stop_latency'] * 1000:7.0f} "
+              f"{r['worst_command_latency'] * 1000:12.0f} {r['worst_loop_lateness'] * 1000:12.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,242 @@
+#
+# Transaction level instrumentation of the Modbus link.
+#
+# BusMetrics is installed as ModbusRTU.on_transaction and keeps latency
+# histograms per function code and per slave, counts of timeouts, CRC
+# errors, exception responses and retries, and the bytes moved over a
+# sliding window (bytes/s and the resulting bus utilisation). snapshot()
+# gives a JSON-able dict, prometheus() the Prometheus text exposition format;
+# MetricsExporter rewrites either as a file for the monitoring system.
+#
+
+import collections
+import json
+import os
+import threading
+import time
+
+from modbus_rtu import ModbusTimeoutError, ModbusCRCError, ModbusExceptionError, char_time
+
+# Upper bucket bounds in seconds, a transaction at 9600 baud takes 20-60 ms
+LATENCY_BUCKETS = (0.005, 0.01, 0.02, 0.05, 0.1, 0.2, 0.5, 1.0, 2.0)
+RATE_WINDOW = 10.0  # seconds of traffic bytes/s and utilisation are computed over
+
+
+class Histogram:
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # last one is +Inf
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, value):
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                break
+        else:
+            i = len(self.buckets)
+        self.counts[i] += 1
+        self.count += 1
+        self.sum += value
+        self.max = max(self.max, value)
+
+    def quantile(self, q):
+        # Upper bound of the bucket holding the q-quantile (max for the +Inf bucket)
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for bound, count in zip(self.buckets + (self.max,), self.counts):
+            seen += count
+            if seen >= rank:
+                return min(bound, self.max)
+        return self.max
+
+    @property
+    def mean(self):
+        return self.sum / self.count if self.count else 0.0
+
+    def to_dict(self):
+        return {
+            "count": self.count,
+            "sum": self.sum,
+            "max": self.max,
+            "p50": self.quantile(0.5),
+            "p99": self.quantile(0.99),
+            "buckets": dict(zip([str(b) for b in self.buckets] + ["+Inf"], self.counts)),
+        }
+
+
+class BusMetrics:
+    def __init__(self, baudrate=9600):
+        self.baudrate = baudrate
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.started = time.time()
+            self.by_function = collections.defaultdict(Histogram)
+            self.by_slave = collections.defaultdict(Histogram)
+            self.transactions = 0
+            self.timeouts = 0
+            self.crc_errors = 0
+            self.exceptions = collections.Counter()  # exception code -> count
+            self.other_errors = 0
+            self.retries = 0
+            self.bytes_sent = 0
+            self.bytes_received = 0
+            self._window = collections.deque()  # (monotonic time, bytes)
+
+    def record(self, slave_address, function_code, elapsed, sent, received, error=None):
+        # ModbusRTU.on_transaction callback, runs on the bus worker thread
+        now = time.monotonic()
+        with self._lock:
+            self.transactions += 1
+            self.bytes_sent += sent
+            self.bytes_received += received
+            self._window.append((now, sent + received))
+            if error is None:
+                self.by_function[function_code].observe(elapsed)
+                self.by_slave[slave_address].observe(elapsed)
+            elif isinstance(error, ModbusTimeoutError):
+                self.timeouts += 1
+            elif isinstance(error, ModbusCRCError):
+                self.crc_errors += 1
+            elif isinstance(error, ModbusExceptionError):
+                # The slave answered, so the round trip counts as a latency sample too
+                self.exceptions[error.exception_code] += 1
+                self.by_function[function_code].observe(elapsed)
+                self.by_slave[slave_address].observe(elapsed)
+            else:
+                self.other_errors += 1
+
+    def record_retry(self, slave_address=None, function_code=None, attempt=None):
+        # ModbusRTU.on_retry callback
+        with self._lock:
+            self.retries += 1
+
+    @property
+    def errors(self):
+        return self.timeouts + self.crc_errors + sum(self.exceptions.values()) + self.other_errors
+
+    def _rates(self, now):
+        # (bytes/s, utilisation) over the last RATE_WINDOW seconds
+        while self._window and self._window[0][0] < now - RATE_WINDOW:
+            self._window.popleft()
+        window = min(RATE_WINDOW, time.time() - self.started) or RATE_WINDOW
+        transferred = sum(nbytes for _, nbytes in self._window)
+        return transferred / window, transferred * char_time(self.baudrate) / window
+
+    def snapshot(self):
+        with self._lock:
+            bytes_per_second, utilisation = self._rates(time.monotonic())
+            return {
+                "timestamp": time.time(),
+                "uptime": time.time() - self.started,
+                "baudrate": self.baudrate,
+                "transactions": self.transactions,
+                "timeouts": self.timeouts,
+                "crc_errors": self.crc_errors,
+                "exceptions": {str(code): count for code, count in sorted(self.exceptions.items())},
+                "other_errors": self.other_errors,
+                "retries": self.retries,
+                "bytes_sent": self.bytes_sent,
+                "bytes_received": self.bytes_received,
+                "bytes_per_second": bytes_per_second,
+                "utilisation": utilisation,
+                "latency_by_function": {f"0x{fc:02X}": h.to_dict() for fc, h in sorted(self.by_function.items())},
+                "latency_by_slave": {str(slave): h.to_dict() for slave, h in sorted(self.by_slave.items())},
+            }
+
+    def prometheus(self, prefix="vfd_modbus"):
+        # Prometheus text exposition format
+        s = self.snapshot()
+        lines = []
+
+        def metric(name, kind, help_text, samples):
+            lines.append(f"# HELP {prefix}_{name} {help_text}")
+            lines.append(f"# TYPE {prefix}_{name} {kind}")
+            for labels, value in samples:
+                label_text = "{" + ",".join(f'{k}="{v}"' for k, v in labels.items()) + "}" if labels else ""
+                lines.append(f"{prefix}_{name}{label_text} {value}")
+
+        def histogram(name, help_text, label, histograms):
+            samples = []
+            for key, h in histograms.items():
+                cumulative = 0
+                for bound, count in h["buckets"].items():
+                    cumulative += count
+                    samples.append(({label: key, "le": bound}, cumulative))
+            metric(name, "histogram", help_text, [])
+            for labels, value in samples:
+                label_text = ",".join(f'{k}="{v}"' for k, v in labels.items())
+                lines.append(f"{prefix}_{name}_bucket{{{label_text}}} {value}")
+            for key, h in histograms.items():
+                lines.append(f'{prefix}_{name}_sum{{{label}="{key}"}} {h["sum"]}')
+                lines.append(f'{prefix}_{name}_count{{{label}="{key}"}} {h["count"]}')
+
+        metric("transactions_total", "counter", "Modbus transactions sent", [({}, s["transactions"])])
+        metric("errors_total", "counter", "Failed transactions by cause", [
+            ({"type": "timeout"}, s["timeouts"]),
+            ({"type": "crc"}, s["crc_errors"]),
+            ({"type": "other"}, s["other_errors"]),
+        ])
+        metric("exceptions_total", "counter", "Exception responses by exception code",
+               [({"code": code}, count) for code, count in s["exceptions"].items()])
+        metric("retries_total", "counter", "Requests repeated after a failure", [({}, s["retries"])])
+        metric("bytes_total", "counter", "Bytes on the line", [
+            ({"direction": "tx"}, s["bytes_sent"]),
+            ({"direction": "rx"}, s["bytes_received"]),
+        ])
+        metric("bytes_per_second", "gauge", f"Bytes/s over the last {RATE_WINDOW:g} s", [({}, f"{s['bytes_per_second']:.1f}")])
+        metric("bus_utilisation", "gauge", "Fraction of time the line carried characters", [({}, f"{s['utilisation']:.4f}")])
+        histogram("latency_seconds", "Transaction latency by function code", "function", s["latency_by_function"])
+        histogram("slave_latency_seconds", "Transaction latency by slave address", "slave", s["latency_by_slave"])
+        return "\n".join(lines) + "\n"
+
+    def export(self, path):
+        # JSON for *.json, Prometheus text otherwise; replaced atomically so a
+        # scraper never reads a half written file
+        text = json.dumps(self.snapshot(), indent=2) if path.endswith(".json") else self.prometheus()
+        temporary = path + ".tmp"
+        with open(temporary, "w") as f:
+            f.write(text)
+        os.replace(temporary, path)
+
+
+class MetricsExporter(threading.Thread):
+    # Rewrites the export file every interval seconds until stopped
+
+    def __init__(self, metrics, path, interval=5.0):
+        super().__init__(name="metrics-exporter", daemon=True)
+        self.metrics = metrics
+        self.path = path
+        self.interval = interval
+        self.on_error = None  # callback(error) when the file cannot be written, once until it works again
+        self.last_error = None
+        self._stop_event = threading.Event()
+
+    def _export(self):
+        # An unwritable or deleted path must neither end the thread nor block closing the app
+        try:
+            self.metrics.export(self.path)
+        except OSError as e:
+            if self.on_error and str(e) != str(self.last_error):
+                self.on_error(e)
+            self.last_error = e
+        else:
+            self.last_error = None
+
+    def run(self):
+        while True:
+            self._export()
+            if self._stop_event.wait(self.interval):
+                break
+
+    def stop(self, timeout=None):
+        self._stop_event.set()
+        if self.is_alive():
+            self.join(timeout)
+        self._export()  # final numbers
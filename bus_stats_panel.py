@@ -0,0 +1,87 @@
+#
+# Live view of the bus_metrics.BusMetrics collected on the serial link:
+# latency per function code and per slave, error counters, bytes/s and bus
+# utilisation, with export to a JSON or Prometheus text file.
+#
+
+import tkinter as tk
+from tkinter import ttk, filedialog
+
+REFRESH_INTERVAL_MS = 500
+
+COLUMNS = (
+    ("key", "", 90),
+    ("count", "Count", 70),
+    ("mean", "Mean ms", 70),
+    ("p50", "p50 ms", 70),
+    ("p99", "p99 ms", 70),
+    ("max", "Max ms", 70),
+)
+
+
+class BusStatsPanel(tk.Toplevel):
+    def __init__(self, master, app):
+        super().__init__(master)
+        self.app = app  # SerialTool, provides metrics and the exporter
+        self.title("VFD Commander - Bus statistics")
+
+        self.summary_label = ttk.Label(self, text="", justify="left")
+        self.summary_label.grid(row=0, column=0, padx=10, pady=5, sticky="w")
+
+        self.tree = ttk.Treeview(self, columns=[c[0] for c in COLUMNS], show="headings", height=10)
+        for column, heading, width in COLUMNS:
+            self.tree.heading(column, text=heading)
+            self.tree.column(column, width=width, anchor="w" if column == "key" else "e")
+        self.tree.grid(row=1, column=0, padx=10, pady=5, sticky="nsew")
+
+        controls = ttk.Frame(self)
+        controls.grid(row=2, column=0, padx=10, pady=5, sticky="ew")
+        ttk.Button(controls, text="Reset", command=self.reset_callback).grid(row=0, column=0, padx=5, pady=5)
+        ttk.Button(controls, text="Export to file...", command=self.export_callback).grid(row=0, column=1, padx=5, pady=5)
+        self.export_label = ttk.Label(controls, text="")
+        self.export_label.grid(row=0, column=2, padx=5, pady=5)
+
+        self.rowconfigure(1, weight=1)
+        self.columnconfigure(0, weight=1)
+        self.after(0, self.refresh)
+
+    def reset_callback(self):
+        self.app.metrics.reset()
+        self.refresh(reschedule=False)
+
+    def export_callback(self):
+        path = filedialog.asksaveasfilename(
+            parent=self, defaultextension=".prom",
+            filetypes=[("Prometheus text", "*.prom"), ("JSON", "*.json"), ("All files", "*.*")],
+        )
+        if path:
+            self.app.start_metrics_export(path)
+            self.refresh(reschedule=False)
+
+    @staticmethod
+    def _row(key, histogram):
+        return (
+            key, histogram["count"], f"{histogram['sum'] / histogram['count'] * 1000:.1f}" if histogram["count"] else "-",
+            f"{histogram['p50'] * 1000:.0f}", f"{histogram['p99'] * 1000:.0f}", f"{histogram['max'] * 1000:.1f}",
+        )
+
+    def refresh(self, reschedule=True):
+        s = self.app.metrics.snapshot()
+        exceptions = ", ".join(f"code {code}: {count}" for code, count in s["exceptions"].items()) or "0"
+        self.summary_label["text"] = (
+            f"{s['transactions']} transactions, {s['retries']} retries\n"
+            f"Timeouts {s['timeouts']}   CRC errors {s['crc_errors']}   Exceptions {exceptions}   Other {s['other_errors']}\n"
+            f"{s['bytes_per_second']:.0f} bytes/s   bus utilisation {s['utilisation'] * 100:.0f}% at {s['baudrate']} baud"
+        )
+
+        rows = [self._row(f"FC {fc}", h) for fc, h in s["latency_by_function"].items()]
+        rows += [self._row(f"Slave {int(slave):02X}", h) for slave, h in s["latency_by_slave"].items()]
+        self.tree.delete(*self.tree.get_children())
+        for row in rows:
+            self.tree.insert("", "end", values=row)
+
+        exporter = self.app.metrics_exporter
+        self.export_label["text"] = f"Writing {exporter.path} every {exporter.interval:g} s" if exporter else ""
+
+        if reschedule:
+            self.after(REFRESH_INTERVAL_MS, self.refresh)
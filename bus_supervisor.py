@@ -0,0 +1,175 @@
+#
+# Several RS485 buses (one USB adapter each) served side by side.
+#
+# Every PortBus owns its serial port, a BusWorker and a TelemetryPoller, so
+# a slow or dead bus never holds up the others. Serial reads and writes
+# release the GIL and a transaction costs well under a millisecond of CPU
+# (benchmarks/bench_throughput.py), so threads are enough for the ports to
+# run in parallel; total throughput grows with the number of adapters
+# (benchmarks/bench_supervisor.py).
+#
+# Telemetry of all buses is merged into one TelemetryStore keyed by
+# (port, slave address, param), the shared source for the combined view.
+#
+
+import threading
+import time
+
+import drive
+from bus_worker import BusWorker, PRIORITY_COMMAND
+from discovery import open_serial_port
+from drive_registry import DriveRegistry
+from modbus_rtu import ModbusRTU
+from register_cache import RegisterCache
+from telemetry import TelemetryStore, TelemetryPoller
+
+RATE_WINDOW = 5.0  # seconds transactions/s are measured over
+
+
+class PortBus:
+    def __init__(self, port_name, baudrate=9600, slave_addresses=(), open_port=open_serial_port, poll_rate_hz=10.0):
+        self.port_name = port_name
+        self.baudrate = baudrate
+        self.open_port = open_port  # open_port(port_name, baudrate, timeout) -> pyserial-like port
+        self.poll_rate_hz = poll_rate_hz
+        self.registry = DriveRegistry()
+        self.merged = None
+        self.port = None
+        self.link = None
+        self.worker = None
+        self.poller = None
+        self.error = None  # why the bus could not be started
+        self._rate_samples = []  # (monotonic time, transactions)
+        for address in slave_addresses:
+            self.add_drive(address)
+
+    @property
+    def running(self):
+        return self.worker is not None and self.worker.is_alive()
+
+    def add_drive(self, slave_address):
+        vfd = self.registry.get(slave_address)
+        if vfd is not None:
+            return vfd
+        vfd = self.registry.add(slave_address, name=f"{self.port_name}/{slave_address:02X}")
+        vfd.set_rate(0, self.poll_rate_hz)
+        vfd.store.add_listener(lambda values, timestamp: self._publish(slave_address, values, timestamp))
+        return vfd
+
+    def remove_drive(self, slave_address):
+        self.registry.remove(slave_address)
+
+    def _publish(self, slave_address, values, timestamp):
+        # Drive store listener, runs on this bus's poller thread
+        if self.merged is not None:
+            self.merged.update({(self.port_name, slave_address, param): word for param, word in values.items()}, timestamp)
+
+    def start(self, merged=None):
+        self.merged = merged
+        self.port = self.open_port(self.port_name, self.baudrate, 1.0)  # robust mode sets the timeout per request
+        self.link = ModbusRTU(self.port, baudrate=self.baudrate, robust=True)
+        self.worker = BusWorker(RegisterCache(self.link), name=f"bus-worker-{self.port_name}")
+        self.worker.start()
+        self.poller = TelemetryPoller(self.worker, self.registry)
+        self.poller.name = f"telemetry-poller-{self.port_name}"
+        self.poller.start()
+
+    def stop(self, timeout=None):
+        if self.poller:
+            self.poller.stop(timeout)
+            self.poller = None
+        if self.worker:
+            self.worker.stop(timeout)
+            self.worker = None
+        if self.port is not None:
+            close = getattr(self.port, "close", None)
+            if close:
+                close()
+            self.port = None
+
+    def submit(self, function, *args, priority=PRIORITY_COMMAND):
+        # function(link, *args) on this bus's worker; returns a Future
+        if self.worker is None:
+            raise RuntimeError(f"{self.port_name} is not running.")
+        return self.worker.submit(function, *args, priority=priority)
+
+    def transaction_rate(self):
+        # Transactions per second over the last RATE_WINDOW seconds
+        if self.link is None:
+            return 0.0
+        now = time.monotonic()
+        samples = self._rate_samples
+        samples.append((now, self.link.transactions))
+        while len(samples) > 2 and samples[1][0] < now - RATE_WINDOW:
+            samples.pop(0)
+        (t0, n0), (t1, n1) = samples[0], samples[-1]
+        return (n1 - n0) / (t1 - t0) if t1 > t0 else 0.0
+
+
+class BusSupervisor:
+    def __init__(self, open_port=open_serial_port):
+        self.open_port = open_port
+        self.store = TelemetryStore()  # {(port, slave, param): word} of every bus
+        self.buses = {}
+        self._lock = threading.Lock()
+        self.on_error = None  # callback(port_name, error) for ports that fail to start
+
+    def add_port(self, port_name, baudrate=9600, slave_addresses=(), poll_rate_hz=10.0, start=True):
+        with self._lock:
+            if port_name in self.buses:
+                raise ValueError(f"{port_name} is already supervised.")
+            bus = PortBus(port_name, baudrate, slave_addresses, self.open_port, poll_rate_hz)
+            self.buses[port_name] = bus
+        if start:
+            self.start_bus(bus)
+        return bus
+
+    def start_bus(self, bus):
+        # Failures are kept in bus.error (and reported), the other buses carry on
+        try:
+            bus.error = None
+            bus.start(self.store)
+        except Exception as e:
+            bus.stop(timeout=1)
+            bus.error = e
+            if self.on_error:
+                self.on_error(bus.port_name, e)
+        return bus.error is None
+
+    def remove_port(self, port_name, timeout=2):
+        with self._lock:
+            bus = self.buses.pop(port_name, None)
+        if bus:
+            bus.stop(timeout)
+
+    def stop(self, timeout=2):
+        # Every bus is told to stop before waiting for any of them
+        buses = list(self.buses.values())
+        for bus in buses:
+            if bus.poller:
+                bus.poller.stop(timeout=0)
+        for bus in buses:
+            bus.stop(timeout)
+
+    def drives(self):
+        # (bus, drive_registry.Drive) over all buses, in port order
+        with self._lock:
+            buses = sorted(self.buses.values(), key=lambda bus: bus.port_name)
+        return [(bus, vfd) for bus in buses for vfd in bus.registry.drives()]
+
+    def status_snapshot(self, port_name, slave_address):
+        # drive.StatusSnapshot from the merged store, None before the first poll
+        params = {}
+        timestamp = None
+        for param in drive.STATUS_PARAMS:
+            entry = self.store.get_with_time((port_name, slave_address, param))
+            if entry is not None:
+                params[param] = entry[0]
+                timestamp = max(timestamp or 0.0, entry[1])
+        return drive.StatusSnapshot.from_params(params, timestamp) if params else None
+
+    def submit(self, port_name, function, *args, priority=PRIORITY_COMMAND):
+        return self.buses[port_name].submit(function, *args, priority=priority)
+
+    def transaction_rate(self):
+        return sum(bus.transaction_rate() for bus in list(self.buses.values()))
@@ -0,0 +1,150 @@
+#
+# Combined view of every bus run by a bus_supervisor.BusSupervisor: one row
+# per drive on any adapter, read from the merged telemetry store, plus the
+# transaction rate of each bus.
+#
+
+import tkinter as tk
+from tkinter import ttk, messagebox
+
+import drive
+from bus_worker import PRIORITY_STOP
+from drive_registry import parse_slave_addresses
+
+REFRESH_INTERVAL_MS = 500
+
+COLUMNS = (
+    ("port", "Port", 80),
+    ("address", "Addr", 50),
+    ("state", "State", 90),
+    ("set_frequency", "Set Hz", 70),
+    ("actual_frequency", "Actual Hz", 70),
+    ("current", "A", 60),
+    ("voltage", "V", 60),
+    ("temperature", "°C", 50),
+    ("fault", "Fault", 50),
+    ("poll_rate", "Polls/s", 60),
+    ("errors", "Errors", 60),
+)
+
+
+class BusSupervisorPanel(tk.Toplevel):
+    def __init__(self, master, app):
+        super().__init__(master)
+        self.app = app  # SerialTool, provides the supervisor and the main connection
+        self.title("VFD Commander - Buses")
+
+        controls = ttk.Frame(self)
+        controls.grid(row=0, column=0, padx=10, pady=5, sticky="ew")
+        ttk.Label(controls, text="Port:").grid(row=0, column=0, padx=5, pady=5)
+        self.port_var = tk.StringVar()
+        self.port_dropdown = ttk.Combobox(controls, textvariable=self.port_var, values=app.com_dropdown["values"], width=12)
+        self.port_dropdown.grid(row=0, column=1, padx=5, pady=5)
+        ttk.Label(controls, text="Baud:").grid(row=0, column=2, padx=5, pady=5)
+        self.baud_var = tk.StringVar(value="9600")
+        ttk.Entry(controls, textvariable=self.baud_var, width=8).grid(row=0, column=3, padx=5, pady=5)
+        ttk.Label(controls, text="Slaves (hex):").grid(row=0, column=4, padx=5, pady=5)
+        self.address_var = tk.StringVar(value="8")
+        ttk.Entry(controls, textvariable=self.address_var, width=14).grid(row=0, column=5, padx=5, pady=5)
+        ttk.Button(controls, text="Add bus", command=self.add_callback).grid(row=0, column=6, padx=5, pady=5)
+        ttk.Button(controls, text="Remove bus", command=self.remove_callback).grid(row=0, column=7, padx=5, pady=5)
+        ttk.Button(controls, text="STOP all", command=self.stop_all_callback).grid(row=0, column=8, padx=5, pady=5)
+
+        table = ttk.Frame(self)
+        table.grid(row=1, column=0, padx=10, pady=5, sticky="nsew")
+        self.tree = ttk.Treeview(table, columns=[c[0] for c in COLUMNS], show="headings", height=15)
+        for column, heading, width in COLUMNS:
+            self.tree.heading(column, text=heading)
+            self.tree.column(column, width=width, anchor="w" if column in ("port", "state") else "e")
+        scrollbar = ttk.Scrollbar(table, orient="vertical", command=self.tree.yview)
+        self.tree.configure(yscrollcommand=scrollbar.set)
+        self.tree.grid(row=0, column=0, sticky="nsew")
+        scrollbar.grid(row=0, column=1, sticky="ns")
+        table.rowconfigure(0, weight=1)
+        table.columnconfigure(0, weight=1)
+
+        self.bus_label = ttk.Label(self, text="", justify="left")
+        self.bus_label.grid(row=2, column=0, padx=10, pady=5, sticky="w")
+
+        self.rowconfigure(1, weight=1)
+        self.columnconfigure(0, weight=1)
+        self.after(0, self.refresh)
+
+    def add_callback(self):
+        port_name = self.port_var.get().strip()
+        try:
+            baudrate = int(self.baud_var.get())
+            addresses = parse_slave_addresses(self.address_var.get())
+        except ValueError as e:
+            messagebox.showerror("Error", str(e), parent=self)
+            return
+        if not port_name:
+            return
+        if self.app.connected and port_name == self.app.com_var.get():
+            messagebox.showerror("Error", f"{port_name} is used by the main connection.", parent=self)
+            return
+        supervisor = self.app.bus_supervisor()
+        bus = supervisor.buses.get(port_name)
+        if bus is not None:
+            for address in addresses:
+                bus.add_drive(address)
+        elif not supervisor.start_bus(supervisor.add_port(port_name, baudrate, addresses, start=False)):
+            messagebox.showerror("Error", f"{port_name}: {supervisor.buses[port_name].error}", parent=self)
+            supervisor.remove_port(port_name)
+        self.refresh(reschedule=False)
+
+    def remove_callback(self):
+        ports = {self.tree.set(item, "port") for item in self.tree.selection()} or {self.port_var.get().strip()}
+        for port_name in ports:
+            self.app.bus_supervisor().remove_port(port_name)
+        self.refresh(reschedule=False)
+
+    def stop_all_callback(self):
+        for bus, vfd in self.app.bus_supervisor().drives():
+            if bus.running:
+                bus.submit(lambda link, address=vfd.slave_address: link.write_register(
+                    address, drive.param_address(drive.P_CONTROL), drive.CONTROL_STOP), priority=PRIORITY_STOP)
+
+    def _row(self, bus, vfd):
+        snapshot = self.app.bus_supervisor().status_snapshot(bus.port_name, vfd.slave_address)
+        rate, errors = f"{vfd.poll_rate:.1f}", str(vfd.errors)
+        if snapshot is None:
+            state = "no data" if bus.running else "stopped"
+            return (bus.port_name, f"{vfd.slave_address:02X}", state, "-", "-", "-", "-", "-", "-", rate, errors)
+        state = ("Running" if snapshot.running else "Stopped") + (" REV" if snapshot.reverse else " FWD")
+        return (
+            bus.port_name, f"{vfd.slave_address:02X}", state,
+            f"{snapshot.set_frequency:.2f}", f"{snapshot.actual_frequency:.2f}",
+            f"{snapshot.current:.1f}", f"{snapshot.voltage:.1f}", f"{snapshot.temperature:g}",
+            str(snapshot.fault), rate, errors,
+        )
+
+    def refresh(self, reschedule=True):
+        supervisor = self.app.bus_supervisor()
+        items = set(self.tree.get_children())
+        for bus, vfd in supervisor.drives():
+            item = f"{bus.port_name}/{vfd.slave_address}"
+            values = self._row(bus, vfd)
+            if item in items:
+                self.tree.item(item, values=values)
+                items.discard(item)
+            else:
+                self.tree.insert("", "end", iid=item, values=values)
+        for item in items:
+            self.tree.delete(item)
+
+        lines = []
+        total = 0.0
+        for port_name, bus in sorted(supervisor.buses.items()):
+            if bus.running:
+                rate = bus.transaction_rate()
+                total += rate
+                lines.append(f"{port_name}: {bus.baudrate} baud, {len(bus.registry)} drives, {rate:.1f} transactions/s")
+            else:
+                lines.append(f"{port_name}: not running ({bus.error or 'stopped'})")
+        if lines:
+            lines.append(f"Total {total:.1f} transactions/s")
+        self.bus_label["text"] = "\n".join(lines) or "No buses, add a port with its slave addresses"
+
+        if reschedule:
+            self.after(REFRESH_INTERVAL_MS, self.refresh)
@@ -0,0 +1,110 @@
+#
+# Bus worker thread: the only thread that touches the serial port.
+#
+# Work is submitted as callables taking the Modbus link as first argument and
+# executed in priority order (FIFO within a priority). Every submission
+# returns a concurrent.futures.Future so callers never block on the bus.
+#
+
+import itertools
+import queue
+import threading
+from concurrent.futures import Future
+
+# Lower value = served first
+PRIORITY_STOP = 0      # STOP commands overtake everything already queued
+PRIORITY_COMMAND = 10  # FWD/REV, setpoint writes
+PRIORITY_READ = 20     # user initiated reads
+PRIORITY_POLL = 30     # background telemetry
+
+_SHUTDOWN = object()
+
+
+class BusWorker(threading.Thread):
+    def __init__(self, link, name="bus-worker"):
+        super().__init__(name=name, daemon=True)
+        self.link = link
+        self._queue = queue.PriorityQueue()
+        self._sequence = itertools.count()
+        self._closed = False
+
+    def submit(self, function, *args, priority=PRIORITY_READ):
+        future = Future()
+        if self._closed:
+            future.set_exception(RuntimeError("Bus worker is stopped."))
+            return future
+        self._queue.put((priority, next(self._sequence), function, args, future))
+        return future
+
+    def execute(self, slave_address, function_code, address, data, priority=PRIORITY_READ):
+        return self.submit(lambda link: link.execute(slave_address, function_code, address, data), priority=priority)
+
+    def pending(self):
+        return self._queue.qsize()
+
+    def run(self):
+        while True:
+            _, _, function, args, future = self._queue.get()
+            if function is _SHUTDOWN:
+                break
+            self._run(function, args, future)
+
+        # Queued STOP commands still go out so closing never leaves a drive
+        # running; whatever else was queued behind the shutdown request fails
+        while True:
+            try:
+                priority, _, function, args, future = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if function is _SHUTDOWN:
+                continue
+            if priority <= PRIORITY_STOP:
+                self._run(function, args, future)
+            elif future.set_running_or_notify_cancel():
+                future.set_exception(RuntimeError("Bus worker is stopped."))
+
+    def _run(self, function, args, future):
+        if not future.set_running_or_notify_cancel():
+            return
+        try:
+            future.set_result(function(self.link, *args))
+        except Exception as e:
+            future.set_exception(e)
+
+    def stop(self, timeout=None):
+        # Queued at the lowest possible priority value so it runs right after the
+        # transaction in progress; queued STOP commands are still sent, other
+        # pending work fails.
+        self._closed = True
+        self._queue.put((-1, next(self._sequence), _SHUTDOWN, (), None))
+        if self.is_alive() and threading.current_thread() is not self:
+            self.join(timeout)
+
+
+class WorkerLink:
+    # Blocking link facade for long multi-transaction jobs (backup, restore,
+    # scripts) running on their own thread: every transaction is queued on
+    # the worker separately, so a STOP can still get in between them.
+
+    def __init__(self, worker, priority=PRIORITY_READ):
+        self.worker = worker
+        self.priority = priority
+
+    def call(self, method, *args):
+        # method(link, *args) runs on the worker thread
+        return self.worker.submit(method, *args, priority=self.priority).result()
+
+    def execute(self, slave_address, function_code, address, data):
+        return self.call(lambda link: link.execute(slave_address, function_code, address, data))
+
+    def read_holding_registers(self, slave_address, address, count):
+        return self.call(lambda link: link.read_holding_registers(slave_address, address, count))
+
+    def write_register(self, slave_address, address, value):
+        return self.call(lambda link: link.write_register(slave_address, address, value))
+
+    def write_registers(self, slave_address, address, values):
+        return self.call(lambda link: link.write_registers(slave_address, address, values))
+
+    def read_write_registers(self, slave_address, read_address, read_count, write_address, values):
+        return self.call(lambda link: link.read_write_registers(slave_address, read_address, read_count, write_address, values))
@@ -0,0 +1,169 @@
+#
+# Discovery of drives: scan slave addresses 1-247 at the common baud rates.
+#
+# Each probe is a one register read of P180 with a timeout derived from the
+# baud rate (wire time of the request and of the response header, silent
+# interval and a short turnaround) instead of the 1 s port default, so an
+# address costs tens of milliseconds. Any well-formed answer, also an
+# exception response, means a device is there. Ports are scanned in
+# parallel, one thread per port; on a single RS485 line the addresses have
+# to be probed one after another.
+#
+# All drives on a line share one baud rate. Before sweeping all addresses,
+# the usual addresses are tried at every rate; if one answers, only that
+# rate is swept. Otherwise every rate needs a full sweep, and the slow rates
+# dominate: a line without drives takes one to one and a half minutes
+# (benchmarks/bench_discovery.py), pass the known rate to avoid that.
+#
+# The drive has no model or version register, so found drives are reported
+# with their P180-P189 status snapshot (set frequency, voltage, fault).
+#
+
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+
+import drive
+from modbus_rtu import ModbusRTU, ModbusError, ModbusExceptionError, response_deadline
+
+# Most likely first; the drive ships with 9600 baud
+COMMON_BAUDRATES = (9600, 19200, 38400, 57600, 115200, 4800, 2400)
+ADDRESSES = range(1, 248)
+LIKELY_ADDRESSES = (1, 8)  # Modbus convention and this drive's factory setting, tried first to find the baud rate
+PROBE_TURNAROUND = 0.02  # drive response time allowed on top of the wire time
+
+
+@dataclass
+class DiscoveredDrive:
+    port: str
+    baudrate: int
+    slave_address: int
+    snapshot: object = None        # drive.StatusSnapshot, None if it could not be read
+    exception_code: int = None     # set when the device answered the probe with an exception
+
+    def describe(self):
+        text = f"{self.port} {self.baudrate} baud, slave 0x{self.slave_address:02X}"
+        if self.snapshot is not None:
+            s = self.snapshot
+            text += f": {'running' if s.running else 'stopped'}, set {s.set_frequency:.2f} Hz, {s.voltage:.1f} V, fault {s.fault}"
+        elif self.exception_code is not None:
+            text += f": answered with exception {self.exception_code} (not a VFD of this type?)"
+        return text
+
+
+def probe_timeout(baudrate, turnaround=PROBE_TURNAROUND):
+    # Until the 3 byte header is in; the rest of the frame gets a timeout of its own
+    return response_deadline(baudrate, 8, 3, turnaround)
+
+
+def probe(link, slave_address):
+    # (present, exception code or None)
+    try:
+        link.read_holding_registers(slave_address, drive.param_address(drive.STATUS_FIRST), 1)
+        return True, None
+    except ModbusExceptionError as e:
+        return True, e.exception_code
+    except ModbusError:
+        if hasattr(link.port, "reset_input_buffer"):
+            link.port.reset_input_buffer()  # noise from a wrong baud rate
+        return False, None
+
+
+def _open_link(open_port, port_name, baudrate):
+    port = open_port(port_name, baudrate, probe_timeout(baudrate))
+    return port, ModbusRTU(port, baudrate=baudrate)
+
+
+def _close(port):
+    close = getattr(port, "close", None)
+    if close:
+        close()
+
+
+def find_baudrate(open_port, port_name, baudrates=COMMON_BAUDRATES, addresses=LIKELY_ADDRESSES, stop_event=None):
+    # First baud rate at which one of the addresses answers, or None
+    for baudrate in baudrates:
+        port, link = _open_link(open_port, port_name, baudrate)
+        try:
+            for address in addresses:
+                if stop_event is not None and stop_event.is_set():
+                    return None
+                if probe(link, address)[0]:
+                    return baudrate
+        finally:
+            _close(port)
+    return None
+
+
+def scan_port(open_port, port_name, baudrates=COMMON_BAUDRATES, addresses=ADDRESSES,
+              stop_at_first_baudrate=True, progress=None, on_found=None, stop_event=None):
+    # open_port(port_name, baudrate, timeout) -> pyserial-like port.
+    # All drives on one line share a baud rate, so by default the scan ends
+    # with the first baud rate at which something answered.
+    found = []
+    if stop_at_first_baudrate and len(baudrates) > 1:
+        baudrate = find_baudrate(open_port, port_name, baudrates, [a for a in LIKELY_ADDRESSES if a in addresses], stop_event)
+        if baudrate is not None:
+            baudrates = (baudrate,)
+    for baudrate in baudrates:
+        port, link = _open_link(open_port, port_name, baudrate)
+        try:
+            for address in addresses:
+                if stop_event is not None and stop_event.is_set():
+                    return found
+                if progress:
+                    progress(port_name, baudrate, address)
+                present, exception_code = probe(link, address)
+                if not present:
+                    continue
+                result = DiscoveredDrive(port_name, baudrate, address, exception_code=exception_code)
+                if exception_code is None:
+                    try:
+                        port.timeout = probe_timeout(baudrate) * 3
+                        result.snapshot = drive.read_status_snapshot(link, address)
+                    except ModbusError:
+                        pass
+                    finally:
+                        port.timeout = probe_timeout(baudrate)
+                found.append(result)
+                if on_found:
+                    on_found(result)
+        finally:
+            _close(port)
+        if found and stop_at_first_baudrate:
+            break
+    return found
+
+
+def list_port_names():
+    import serial.tools.list_ports
+
+    return [port.device for port in serial.tools.list_ports.comports()]
+
+
+def open_serial_port(port_name, baudrate, timeout):
+    import serial
+
+    return serial.Serial(port_name, baudrate=baudrate, timeout=timeout)
+
+
+def discover(port_names, open_port=open_serial_port, baudrates=COMMON_BAUDRATES, addresses=ADDRESSES,
+             stop_at_first_baudrate=True, progress=None, on_found=None, on_error=None, stop_event=None):
+    # Scan several ports in parallel, one thread each; returns every
+    # DiscoveredDrive. The callbacks run on the scanning threads:
+    # progress(port, baudrate, address), on_found(drive), on_error(port, error).
+    port_names = list(port_names)
+    if not port_names:
+        return []
+    results = []
+    with ThreadPoolExecutor(max_workers=len(port_names), thread_name_prefix="discovery") as pool:
+        futures = {
+            pool.submit(scan_port, open_port, name, baudrates, addresses, stop_at_first_baudrate, progress, on_found, stop_event): name
+            for name in port_names
+        }
+        for future, name in futures.items():
+            try:
+                results.extend(future.result())
+            except Exception as e:  # port busy, gone or not a serial port
+                if on_error:
+                    on_error(name, e)
+    return sorted(results, key=lambda d: (d.port, d.slave_address))
@@ -0,0 +1,116 @@
+#
+# VFD specific parameter addresses and the P180-P189 status snapshot.
+#
+# Parameters Pxxx are holding registers at 40000 + xxx.
+#
+
+import time
+from dataclasses import dataclass
+
+from modbus_rtu import coalesce_ranges
+from register_map import PARAMETER_OFFSET, REGISTERS
+
+P_SET_FREQUENCY = 102  # frequency setpoint, 0.01 Hz
+P_CONTROL = 103        # run command word
+
+CONTROL_STOP = 0b0000
+CONTROL_FWD = 0b0001
+CONTROL_REV = 0b0011
+
+# Contiguous feedback block
+P_RUNNING_STATUS = 180
+P_SET_FREQUENCY_FEEDBACK = 181
+P_ACTUAL_FREQUENCY = 182
+P_CURRENT = 183
+P_VOLTAGE = 184
+P_TEMPERATURE = 185
+P_INPUT_TERMINALS = 188
+P_FAULT = 189
+
+STATUS_FIRST = P_RUNNING_STATUS
+STATUS_LAST = P_FAULT
+STATUS_PARAMS = (180, 181, 182, 183, 184, 185, 188, 189)  # P186/P187 are unused pressure registers
+
+# Largest block the drive is asked for in a single 0x03 request
+MAX_READ_COUNT = 10
+
+
+def param_address(param):
+    return PARAMETER_OFFSET + param
+
+
+def read_params(link, slave_address, params, max_count=MAX_READ_COUNT, max_gap=2):
+    # Read parameters with the fewest 0x03 requests; returns {param: raw word}
+    values = {}
+    for start, count in coalesce_ranges(params, max_count=max_count, max_gap=max_gap):
+        words = link.read_holding_registers(slave_address, param_address(start), count)
+        values.update(zip(range(start, start + count), words))
+    return {param: values[param] for param in params}
+
+
+@dataclass(frozen=True)
+class StatusSnapshot:
+    # Raw P180..P189 words plus the decoded values the GUI displays,
+    # scaled according to register_map
+    timestamp: float
+    words: tuple
+
+    @classmethod
+    def from_params(cls, values, timestamp=None):
+        words = tuple(values.get(param, 0) for param in range(STATUS_FIRST, STATUS_LAST + 1))
+        return cls(time.time() if timestamp is None else timestamp, words)
+
+    def word(self, param):
+        return self.words[param - STATUS_FIRST]
+
+    def decoded(self, param):
+        return REGISTERS[param].decode(self.word(param))
+
+    @property
+    def running(self):
+        # BIT0, BIT1 and BIT2 are HIGH while running
+        return self.decoded(P_RUNNING_STATUS)["run_state"] == 0b111
+
+    @property
+    def reverse(self):
+        # NOTE: manual states bit4-bit7 for direction status but only bit4 is used
+        return bool(self.decoded(P_RUNNING_STATUS)["reverse"])
+
+    @property
+    def set_frequency(self):
+        return self.decoded(P_SET_FREQUENCY_FEEDBACK)  # Hz
+
+    @property
+    def actual_frequency(self):
+        return self.decoded(P_ACTUAL_FREQUENCY)  # Hz
+
+    @property
+    def current(self):
+        return self.decoded(P_CURRENT)  # A
+
+    @property
+    def voltage(self):
+        return self.decoded(P_VOLTAGE)  # V
+
+    @property
+    def temperature(self):
+        return float(self.decoded(P_TEMPERATURE))  # °C
+
+    @property
+    def inputs(self):
+        # X0..X3, 0=Open 1=GND
+        return tuple(self.decoded(P_INPUT_TERMINALS).values())
+
+    @property
+    def fault(self):
+        return self.word(P_FAULT)
+
+    @property
+    def fault_info(self):
+        # faultcodes.Fault for the active fault, None when there is none or it is unknown
+        return self.decoded(P_FAULT)
+
+
+def read_status_snapshot(link, slave_address, max_count=MAX_READ_COUNT):
+    # P180..P189 in a single 0x03 request (or the fewest the drive allows)
+    return StatusSnapshot.from_params(read_params(link, slave_address, STATUS_PARAMS, max_count=max_count))
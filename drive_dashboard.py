@@ -0,0 +1,136 @@
+#
+# Dashboard window listing every drive in the registry with its latest
+# telemetry, poll rate and the aggregate bus utilisation.
+#
+
+import time
+import tkinter as tk
+from tkinter import ttk, messagebox
+
+from drive_registry import parse_slave_addresses
+
+REFRESH_INTERVAL_MS = 500
+
+COLUMNS = (
+    ("address", "Addr", 50),
+    ("name", "Name", 90),
+    ("state", "State", 90),
+    ("set_frequency", "Set Hz", 70),
+    ("actual_frequency", "Actual Hz", 70),
+    ("current", "A", 60),
+    ("voltage", "V", 60),
+    ("temperature", "°C", 50),
+    ("fault", "Fault", 50),
+    ("poll_rate", "Polls/s", 60),
+    ("latency", "Latency", 70),
+    ("errors", "Errors", 60),
+)
+
+
+class DriveDashboard(tk.Toplevel):
+    def __init__(self, master, app):
+        super().__init__(master)
+        self.app = app  # SerialTool, provides registry, worker and connection state
+        self.title("VFD Commander - Drives")
+        self._last_bus_sample = None  # (monotonic time, bytes transferred)
+
+        controls = ttk.Frame(self)
+        controls.grid(row=0, column=0, padx=10, pady=5, sticky="ew")
+
+        ttk.Label(controls, text="Slave addresses (hex, e.g. 1-4, 0A):").grid(row=0, column=0, padx=5, pady=5)
+        self.address_var = tk.StringVar()
+        ttk.Entry(controls, textvariable=self.address_var, width=20).grid(row=0, column=1, padx=5, pady=5)
+        ttk.Button(controls, text="Add", command=self.add_callback).grid(row=0, column=2, padx=5, pady=5)
+        ttk.Button(controls, text="Remove selected", command=self.remove_callback).grid(row=0, column=3, padx=5, pady=5)
+
+        table = ttk.Frame(self)
+        table.grid(row=1, column=0, padx=10, pady=5, sticky="nsew")
+        self.tree = ttk.Treeview(table, columns=[c[0] for c in COLUMNS], show="headings", height=15)
+        for column, heading, width in COLUMNS:
+            self.tree.heading(column, text=heading)
+            self.tree.column(column, width=width, anchor="e" if column not in ("name", "state") else "w")
+        scrollbar = ttk.Scrollbar(table, orient="vertical", command=self.tree.yview)
+        self.tree.configure(yscrollcommand=scrollbar.set)
+        self.tree.grid(row=0, column=0, sticky="nsew")
+        scrollbar.grid(row=0, column=1, sticky="ns")
+        table.rowconfigure(0, weight=1)
+        table.columnconfigure(0, weight=1)
+
+        self.bus_label = ttk.Label(self, text="")
+        self.bus_label.grid(row=2, column=0, padx=10, pady=5, sticky="w")
+
+        self.rowconfigure(1, weight=1)
+        self.columnconfigure(0, weight=1)
+        self.after(0, self.refresh)
+
+    def add_callback(self):
+        try:
+            addresses = parse_slave_addresses(self.address_var.get())
+        except ValueError as e:
+            messagebox.showerror("Error", str(e), parent=self)
+            return
+        for address in addresses:
+            self.app.registry.add(address)
+        self.address_var.set("")
+        self.refresh(reschedule=False)
+
+    def remove_callback(self):
+        for item in self.tree.selection():
+            self.app.registry.remove(int(item))
+        self.refresh(reschedule=False)
+
+    def _row(self, vfd):
+        snapshot = vfd.store.status_snapshot()
+        latency = f"{vfd.last_latency * 1000:.0f} ms" if vfd.last_latency is not None else "-"
+        rate = f"{vfd.poll_rate:.1f}"
+        errors = str(vfd.errors)
+        if snapshot is None:
+            return (f"{vfd.slave_address:02X}", vfd.name, "no data", "-", "-", "-", "-", "-", "-", rate, latency, errors)
+        state = ("Running" if snapshot.running else "Stopped") + (" REV" if snapshot.reverse else " FWD")
+        return (
+            f"{vfd.slave_address:02X}", vfd.name, state,
+            f"{snapshot.set_frequency:.2f}", f"{snapshot.actual_frequency:.2f}",
+            f"{snapshot.current:.1f}", f"{snapshot.voltage:.1f}", f"{snapshot.temperature:g}",
+            str(snapshot.fault), rate, latency, errors,
+        )
+
+    def refresh(self, reschedule=True):
+        drives = self.app.registry.drives()
+        items = set(self.tree.get_children())
+        for vfd in drives:
+            item = str(vfd.slave_address)
+            values = self._row(vfd)
+            if item in items:
+                self.tree.item(item, values=values)
+                items.discard(item)
+            else:
+                self.tree.insert("", "end", iid=item, values=values)
+        for item in items:
+            self.tree.delete(item)
+
+        total_rate = sum(vfd.poll_rate for vfd in drives)
+        worker = self.app.worker
+        if worker is not None:
+            link = worker.link
+            transferred = link.bytes_sent + link.bytes_received
+            now = time.monotonic()
+            if self._last_bus_sample and now > self._last_bus_sample[0]:
+                elapsed = now - self._last_bus_sample[0]
+                delta = transferred - self._last_bus_sample[1]
+                self.bus_label["text"] = (
+                    f"Bus utilisation {link.utilisation(delta, elapsed) * 100:.0f}%  "
+                    f"{delta / elapsed:.0f} bytes/s at {link.baudrate} baud  "
+                    f"{total_rate:.1f} polls/s over {len(drives)} drives"
+                )
+                if hasattr(link, "hit_rate"):
+                    self.bus_label["text"] += f"  cache {link.hit_rate:.0%} of {link.hits + link.misses} reads"
+
+            self._last_bus_sample = (now, transferred)
+        else:
+            self._last_bus_sample = None
+            self.bus_label["text"] = f"Not connected, {len(drives)} drives"
+        if not self.app.poller:
+            self.bus_label["text"] += "  (enable 'Poll continuously' to poll)"
+
+        if reschedule:
+            self.after(REFRESH_INTERVAL_MS, self.refresh)
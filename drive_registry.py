@@ -0,0 +1,129 @@
+#
+# Registry of the drives (slave addresses) sharing one RS485 bus.
+#
+# Every Drive carries its own telemetry store, poll schedule and statistics;
+# telemetry.TelemetryPoller interleaves the drives on the bus.
+#
+
+import collections
+import threading
+import time
+
+from telemetry import TelemetryStore, default_poll_groups, MAX_BACKOFF
+from modbus_rtu import ModbusTimeoutError, ModbusCRCError
+
+MIN_SLAVE_ADDRESS = 1
+MAX_SLAVE_ADDRESS = 247
+
+
+def parse_slave_addresses(text, base=16):
+    # "8, 0A, 10-12" -> [8, 10, 16, 17, 18]; hex by default like the slave address field
+    addresses = []
+    for part in text.replace(";", ",").split(","):
+        part = part.strip()
+        if not part:
+            continue
+        if "-" in part:
+            first, last = (int(x, base) for x in part.split("-", 1))
+            addresses.extend(range(first, last + 1))
+        else:
+            addresses.append(int(part, base))
+    for address in addresses:
+        if not MIN_SLAVE_ADDRESS <= address <= MAX_SLAVE_ADDRESS:
+            raise ValueError(f"Slave address {address} out of range {MIN_SLAVE_ADDRESS}-{MAX_SLAVE_ADDRESS}")
+    return sorted(set(addresses))
+
+
+class Drive:
+    def __init__(self, slave_address, name=None, store=None, groups=None):
+        self.slave_address = slave_address
+        self.name = name or f"VFD {slave_address:02X}"
+        self.store = store if store is not None else TelemetryStore()
+        self.groups = groups if groups is not None else default_poll_groups()
+        self.enabled = True
+
+        # Statistics
+        self.backoff = 1.0
+        self.polls = 0
+        self.errors = 0
+        self.timeouts = 0
+        self.crc_errors = 0
+        self.last_latency = None
+        self.average_latency = None
+        self.last_error = None
+        self._poll_times = collections.deque(maxlen=50)
+
+    def set_rate(self, group_index, rate_hz):
+        self.groups[group_index].rate_hz = rate_hz
+
+    def due_groups(self, now):
+        return [group for group in self.groups if group.next_due <= now]
+
+    def next_due(self):
+        return min(group.next_due for group in self.groups)
+
+    def reschedule(self, groups, now):
+        # Schedule from the previous due time so the rate does not drift,
+        # but never try to catch up on missed samples.
+        for group in groups:
+            if not group.next_due:
+                group.next_due = now  # first poll
+            group.next_due = max(group.next_due + group.period * self.backoff, now)
+
+    def record_success(self, latency):
+        self.polls += 1
+        self.last_latency = latency
+        self.average_latency = latency if self.average_latency is None else 0.9 * self.average_latency + 0.1 * latency
+        self.backoff = max(1.0, self.backoff / 2)
+        self._poll_times.append(time.monotonic())
+
+    def record_error(self, error):
+        self.errors += 1
+        self.last_error = error
+        if isinstance(error, ModbusTimeoutError):
+            self.timeouts += 1
+        elif isinstance(error, ModbusCRCError):
+            self.crc_errors += 1
+        self.backoff = min(MAX_BACKOFF, self.backoff * 2)
+
+    @property
+    def poll_rate(self):
+        # Achieved polls per second over the recent window
+        times = self._poll_times
+        if len(times) < 2 or times[-1] == times[0]:
+            return 0.0
+        if time.monotonic() - times[-1] > 5 * (times[-1] - times[0]) / (len(times) - 1):
+            return 0.0  # stalled
+        return (len(times) - 1) / (times[-1] - times[0])
+
+
+class DriveRegistry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._drives = {}  # slave address -> Drive, insertion ordered
+
+    def add(self, slave_address, name=None, store=None, groups=None):
+        with self._lock:
+            if slave_address not in self._drives:
+                self._drives[slave_address] = Drive(slave_address, name, store, groups)
+            return self._drives[slave_address]
+
+    def remove(self, slave_address):
+        with self._lock:
+            self._drives.pop(slave_address, None)
+
+    def get(self, slave_address):
+        with self._lock:
+            return self._drives.get(slave_address)
+
+    def drives(self):
+        with self._lock:
+            return list(self._drives.values())
+
+    def __len__(self):
+        with self._lock:
+            return len(self._drives)
+
+    def __contains__(self, slave_address):
+        with self._lock:
+            return slave_address in self._drives
@@ -0,0 +1,112 @@
+#
+# Fault event detection on the telemetry stream.
+#
+# FaultMonitor listens to a TelemetryStore and reacts only when the P189
+# word in an update differs from the last one seen, so the per-sample cost is
+# a dict lookup and an integer compare. Transitions are decoded through
+# faultcodes.fault_mapping and kept in a bounded history together with the
+# current, voltage and temperature at the time of the trip.
+#
+
+import collections
+import threading
+from dataclasses import dataclass
+
+import drive
+import register_map
+
+DEFAULT_HISTORY = 100
+
+# Telemetry captured with every event
+CONTEXT_PARAMS = (drive.P_ACTUAL_FREQUENCY, drive.P_CURRENT, drive.P_VOLTAGE, drive.P_TEMPERATURE)
+
+
+@dataclass(frozen=True)
+class FaultEvent:
+    timestamp: float
+    word: int               # P189 after the transition
+    previous: int           # P189 before, None for the first sample
+    fault: object           # faultcodes.Fault, None when cleared or unknown
+    telemetry: dict         # {param: raw word} of CONTEXT_PARAMS at the transition
+    slave_address: int = None
+
+    @property
+    def tripped(self):
+        return self.word != 0
+
+    @property
+    def code(self):
+        if self.fault is not None:
+            return self.fault.code
+        return "cleared" if self.word == 0 else f"unknown ({self.word})"
+
+    def describe(self):
+        if not self.tripped:
+            return f"Fault cleared (was {self.previous})"
+        description = self.fault.description if self.fault is not None else "not in fault table"
+        context = ", ".join(register_map.register(param).format(word) for param, word in self.telemetry.items())
+        return f"Fault {self.code}: {description}" + (f" at {context}" if context else "")
+
+
+class FaultMonitor:
+    def __init__(self, store, history=DEFAULT_HISTORY, slave_address=None):
+        self.store = store
+        self.slave_address = slave_address
+        self.history = collections.deque(maxlen=history)
+        self._callbacks = []
+        self._lock = threading.Lock()
+        self._last = None
+        store.add_listener(self._on_update)
+
+    def add_callback(self, callback):
+        # callback(event) runs on the thread that updated the store (the bus
+        # worker while polling); hand GUI work over to the Tk thread
+        self._callbacks.append(callback)
+
+    def remove_callback(self, callback):
+        self._callbacks.remove(callback)
+
+    @property
+    def active(self):
+        # Fault event of the fault currently present, None when healthy
+        with self._lock:
+            if self.history and self.history[-1].tripped:
+                return self.history[-1]
+        return None
+
+    def events(self):
+        with self._lock:
+            return list(self.history)
+
+    def clear(self):
+        with self._lock:
+            self.history.clear()
+
+    def close(self):
+        self.store.remove_listener(self._on_update)
+
+    def _on_update(self, values, timestamp):
+        word = values.get(drive.P_FAULT)
+        if word is None or word == self._last:
+            return
+        previous, self._last = self._last, word
+        if previous is None and word == 0:
+            return  # healthy at start, nothing to report
+
+        telemetry = {}
+        for param in CONTEXT_PARAMS:
+            value = values.get(param, self.store.get(param))
+            if value is not None:
+                telemetry[param] = value
+        event = FaultEvent(
+            timestamp=timestamp,
+            word=word,
+            previous=previous,
+            fault=register_map.decode(drive.P_FAULT, word),
+            telemetry=telemetry,
+            slave_address=self.slave_address,
+        )
+        with self._lock:
+            self.history.append(event)
+        for callback in list(self._callbacks):
+            callback(event)
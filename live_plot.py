@@ -0,0 +1,322 @@
+#
+# Live chart of the polled telemetry: set and actual frequency (P181/P182),
+# current, voltage and temperature.
+#
+# TelemetryHistory is a TelemetryStore listener that appends decoded values
+# into fixed size array-backed ring buffers, so memory does not grow and the
+# poller thread only pays for a few array stores per update. Next to the raw
+# samples it keeps the min and max of every OVERVIEW_BUCKET seconds, updated
+# as samples arrive. LivePlotPanel redraws on a Tk timer: windows wider than
+# one bucket per pixel column are drawn from the buckets, narrower ones from
+# the raw samples, and either is reduced to a min and a max per pixel column
+# (min/max decimation keeps spikes visible). A redraw therefore handles at
+# most a few thousand points per series, whatever the window or session
+# length, and the timer backs off when a redraw still gets expensive.
+#
+
+import bisect
+import threading
+import time
+import tkinter as tk
+from array import array
+from tkinter import ttk
+
+import register_map
+
+HISTORY_CAPACITY = 18000   # samples per series, 30 minutes at the 10 Hz fast poll rate
+OVERVIEW_BUCKET = 1.0      # seconds per min/max bucket of the overview series
+OVERVIEW_CAPACITY = 2 * 1800  # min and max of each bucket, 30 minutes
+REDRAW_INTERVAL_MS = 250
+MAX_REDRAW_LOAD = 0.1      # fraction of UI time redraws may use before the timer backs off
+WINDOWS = {"1 min": 60, "5 min": 300, "30 min": 1800}
+
+# (title, params, colours); the params of a strip share its y axis
+STRIPS = (
+    ("Frequency [Hz]", (181, 182), ("#1f77b4", "#ff7f0e")),
+    ("Current [A]", (183,), ("#2ca02c",)),
+    ("Voltage [V]", (184,), ("#d62728",)),
+    ("Temperature [°C]", (185,), ("#9467bd",)),
+)
+
+
+class RingSeries:
+    # Fixed capacity (timestamp, value) history, oldest samples are overwritten
+
+    def __init__(self, capacity=HISTORY_CAPACITY):
+        self.capacity = capacity
+        self.times = array("d", bytes(8 * capacity))
+        self.values = array("d", bytes(8 * capacity))
+        self.count = 0
+        self._next = 0
+
+    def append(self, timestamp, value):
+        self.times[self._next] = timestamp
+        self.values[self._next] = value
+        self._next = (self._next + 1) % self.capacity
+        self.count = min(self.count + 1, self.capacity)
+
+    def ordered(self):
+        # (times, values) oldest first, as copies
+        if self.count < self.capacity:
+            return self.times[:self.count], self.values[:self.count]
+        n = self._next
+        return self.times[n:] + self.times[:n], self.values[n:] + self.values[:n]
+
+    def range(self, start, end):
+        # (times, values) with start <= t <= end, oldest first; only the
+        # selected samples are copied
+        if self.count < self.capacity:
+            segments = ((0, self.count),)
+        else:
+            segments = ((self._next, self.capacity), (0, self._next))
+        times, values = array("d"), array("d")
+        for first, last in segments:  # each one in time order
+            lo = bisect.bisect_left(self.times, start, first, last)
+            hi = bisect.bisect_right(self.times, end, lo, last)
+            times += self.times[lo:hi]
+            values += self.values[lo:hi]
+        return times, values
+
+    @property
+    def last_time(self):
+        return self.times[self._next - 1] if self.count else None
+
+    def clear(self):
+        self.count = 0
+        self._next = 0
+
+
+class TelemetryHistory:
+    def __init__(self, params=(181, 182, 183, 184, 185), capacity=HISTORY_CAPACITY,
+                 overview_bucket=OVERVIEW_BUCKET, overview_capacity=OVERVIEW_CAPACITY):
+        self.registers = {param: register_map.register(param) for param in params}
+        self.series = {param: RingSeries(capacity) for param in params}
+        self.overview_bucket = overview_bucket
+        self.overview = {param: RingSeries(overview_capacity) for param in params}  # min/max points of closed buckets
+        self._buckets = {}  # {param: [bucket, lo_t, lo_v, hi_t, hi_v]} of the bucket being filled
+        self._lock = threading.Lock()
+        self._store = None
+        self.version = 0
+
+    def attach(self, store):
+        self.detach()
+        self._store = store
+        store.add_listener(self.on_update)
+
+    def detach(self):
+        if self._store is not None:
+            self._store.remove_listener(self.on_update)
+            self._store = None
+
+    def on_update(self, values, timestamp):
+        # TelemetryStore listener, runs on the polling thread
+        with self._lock:
+            for param, word in values.items():
+                series = self.series.get(param)
+                if series is not None:
+                    value = self.registers[param].decode(word)
+                    series.append(timestamp, value)
+                    self._add_to_bucket(param, timestamp, value)
+            self.version += 1
+
+    def _add_to_bucket(self, param, t, v):
+        bucket = int(t // self.overview_bucket)
+        state = self._buckets.get(param)
+        if state is None or state[0] != bucket:
+            if state is not None:
+                self._close_bucket(param, state)
+            self._buckets[param] = [bucket, t, v, t, v]
+        elif v < state[2]:
+            state[1:3] = t, v
+        elif v > state[4]:
+            state[3:5] = t, v
+
+    def _close_bucket(self, param, state):
+        times, values = [], []
+        _emit_minmax(times, values, *state[1:])
+        for t, v in zip(times, values):
+            self.overview[param].append(t, v)
+
+    def window(self, param, start, end, columns=None):
+        # (times, values) of one series with start <= t <= end. With the
+        # number of pixel columns, wide windows come from the overview buckets.
+        with self._lock:
+            if columns is None or (end - start) / columns < self.overview_bucket:
+                return self.series[param].range(start, end)
+            times, values = self.overview[param].range(start, end)
+            state = self._buckets.get(param)
+            if state is not None:  # the bucket being filled holds the newest samples
+                partial_times, partial_values = [], []
+                _emit_minmax(partial_times, partial_values, *state[1:])
+                for t, v in zip(partial_times, partial_values):
+                    if start <= t <= end:
+                        times.append(t)
+                        values.append(v)
+            return times, values
+
+    def latest(self):
+        # Time of the newest sample, None while empty
+        with self._lock:
+            times = [s.last_time for s in self.series.values() if s.count]
+        return max(times) if times else None
+
+    def clear(self):
+        with self._lock:
+            for series in self.series.values():
+                series.clear()
+            for series in self.overview.values():
+                series.clear()
+            self._buckets.clear()
+            self.version += 1
+
+
+def decimate_minmax(times, values, start, end, columns):
+    # At most two points per column: the minimum and the maximum of the
+    # samples falling in it, in time order. Short series are returned as is.
+    if len(times) <= 2 * columns or end <= start:
+        return list(times), list(values)
+    scale = columns / (end - start)
+    out_times, out_values = [], []
+    column = None
+    for t, v in zip(times, values):
+        c = int((t - start) * scale)
+        if c != column:
+            if column is not None:
+                _emit_minmax(out_times, out_values, lo_t, lo_v, hi_t, hi_v)
+            column = c
+            lo_t = hi_t = t
+            lo_v = hi_v = v
+        elif v < lo_v:
+            lo_t, lo_v = t, v
+        elif v > hi_v:
+            hi_t, hi_v = t, v
+    _emit_minmax(out_times, out_values, lo_t, lo_v, hi_t, hi_v)
+    return out_times, out_values
+
+
+def _emit_minmax(out_times, out_values, lo_t, lo_v, hi_t, hi_v):
+    if lo_t == hi_t:
+        out_times.append(lo_t)
+        out_values.append(lo_v)
+    elif lo_t < hi_t:
+        out_times += (lo_t, hi_t)
+        out_values += (lo_v, hi_v)
+    else:
+        out_times += (hi_t, lo_t)
+        out_values += (hi_v, lo_v)
+
+
+class LivePlotPanel(tk.Toplevel):
+    def __init__(self, master, app):
+        super().__init__(master)
+        self.app = app  # SerialTool, provides the telemetry store
+        self.title("VFD Commander - Live plot")
+        self.history = TelemetryHistory()
+        self.history.attach(app.telemetry)
+        self._drawn_version = None
+        self._interval = REDRAW_INTERVAL_MS
+        self._after_id = None
+
+        controls = ttk.Frame(self)
+        controls.grid(row=0, column=0, padx=10, pady=5, sticky="ew")
+        ttk.Label(controls, text="Window:").grid(row=0, column=0, padx=5, pady=5)
+        self.window_var = tk.StringVar(value="1 min")
+        window_dropdown = ttk.Combobox(controls, textvariable=self.window_var, values=list(WINDOWS), width=8, state="readonly")
+        window_dropdown.grid(row=0, column=1, padx=5, pady=5)
+        window_dropdown.bind("<<ComboboxSelected>>", lambda event: self.redraw(force=True))
+        self.pause_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(controls, text="Pause", variable=self.pause_var).grid(row=0, column=2, padx=5, pady=5)
+        ttk.Button(controls, text="Clear", command=self.clear_callback).grid(row=0, column=3, padx=5, pady=5)
+        self.info_label = ttk.Label(controls, text="")
+        self.info_label.grid(row=0, column=4, padx=5, pady=5)
+
+        self.canvas = tk.Canvas(self, width=720, height=480, background="white", highlightthickness=0)
+        self.canvas.grid(row=1, column=0, padx=10, pady=5, sticky="nsew")
+        self.canvas.bind("<Configure>", lambda event: self.redraw(force=True))
+        # One persistent line item per series, only its coordinates change on a redraw
+        self._lines = {}
+        self._labels = []
+        for title, params, colours in STRIPS:
+            self._labels.append((self.canvas.create_text(0, 0, anchor="nw", text=title),
+                                 self.canvas.create_text(0, 0, anchor="ne"),
+                                 self.canvas.create_text(0, 0, anchor="se"),
+                                 self.canvas.create_line(0, 0, 0, 0, fill="#cccccc")))
+            for param, colour in zip(params, colours):
+                self._lines[param] = self.canvas.create_line(0, 0, 0, 0, fill=colour, width=1)
+
+        self.rowconfigure(1, weight=1)
+        self.columnconfigure(0, weight=1)
+        self.protocol("WM_DELETE_WINDOW", self.close)
+        self._after_id = self.after(0, self.tick)
+
+    def clear_callback(self):
+        self.history.clear()
+        self.redraw(force=True)
+
+    def tick(self):
+        start = time.perf_counter()
+        self.redraw()
+        cost = time.perf_counter() - start
+        # Keep redraws below MAX_REDRAW_LOAD of the UI thread's time
+        self._interval = max(REDRAW_INTERVAL_MS, int(cost / MAX_REDRAW_LOAD * 1000))
+        self._after_id = self.after(self._interval, self.tick)
+
+    def redraw(self, force=False):
+        if not force and (self.pause_var.get() or self.history.version == self._drawn_version):
+            return
+        self._drawn_version = self.history.version
+        width = max(self.canvas.winfo_width(), 100)
+        height = max(self.canvas.winfo_height(), 100)
+        margin = 55
+        plot_width = width - margin - 10
+        strip_height = height / len(STRIPS)
+        end = self.history.latest() or time.time()  # follows a replayed recording as well
+        start = end - WINDOWS[self.window_var.get()]
+
+        points = 0
+        for index, ((title, params, colours), items) in enumerate(zip(STRIPS, self._labels)):
+            title_item, top_item, bottom_item, axis_item = items
+            top = index * strip_height + 18
+            bottom = (index + 1) * strip_height - 6
+            series = {}
+            for param in params:
+                times, values = self.history.window(param, start, end, plot_width)
+                series[param] = decimate_minmax(times, values, start, end, plot_width)
+                points += len(series[param][0])
+
+            all_values = [v for _, values in series.values() for v in values]
+            lo, hi = (min(all_values), max(all_values)) if all_values else (0.0, 1.0)
+            if hi - lo < 1e-9:
+                lo, hi = lo - 0.5, hi + 0.5
+            pad = (hi - lo) * 0.05
+            lo, hi = lo - pad, hi + pad
+
+            self.canvas.coords(title_item, margin, index * strip_height + 2)
+            self.canvas.coords(top_item, margin - 4, top)
+            self.canvas.itemconfigure(top_item, text=f"{hi:.1f}")
+            self.canvas.coords(bottom_item, margin - 4, bottom)
+            self.canvas.itemconfigure(bottom_item, text=f"{lo:.1f}")
+            self.canvas.coords(axis_item, margin, bottom, margin + plot_width, bottom)
+
+            x_scale = plot_width / (end - start)
+            y_scale = (bottom - top) / (hi - lo)
+            for param, (times, values) in series.items():
+                if len(times) < 2:
+                    self.canvas.coords(self._lines[param], 0, 0, 0, 0)
+                    continue
+                coords = []
+                for t, v in zip(times, values):
+                    coords += (margin + (t - start) * x_scale, bottom - (v - lo) * y_scale)
+                self.canvas.coords(self._lines[param], coords)
+
+            latest = ", ".join(f"{self.history.registers[param].name} {series[param][1][-1]:.1f}"
+                               for param in params if series[param][1])
+            self.canvas.itemconfigure(title_item, text=f"{title}   {latest}")
+
+        self.info_label["text"] = f"{points} points drawn, redraw every {self._interval} ms"
+
+    def close(self):
+        if self._after_id is not None:
+            self.after_cancel(self._after_id)
+        self.history.detach()
+        self.destroy()
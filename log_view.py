@@ -0,0 +1,78 @@
+#
+# Bounded, batched log for a Tk text widget.
+#
+# Messages are collected in a ring buffer and written to the widget in one
+# batch per flush interval; the widget is trimmed to max_lines so long
+# sessions don't slow it down. Colour tags are created once per colour and
+# reused. A message may be a callable, it is only formatted when flushed.
+# append() may be called from any thread; everything else from the Tk thread.
+#
+
+import collections
+import datetime
+import tkinter as tk
+
+DEFAULT_MAX_LINES = 2000
+DEFAULT_FLUSH_INTERVAL_MS = 100
+
+TIMESTAMP_TAG = "black"
+
+
+class LogView:
+    def __init__(self, widget, max_lines=DEFAULT_MAX_LINES, flush_interval_ms=DEFAULT_FLUSH_INTERVAL_MS):
+        self.widget = widget
+        self.max_lines = max_lines
+        self.flush_interval_ms = flush_interval_ms
+        self._pending = collections.deque(maxlen=max_lines)  # (timestamp, message, color)
+        self._tags = set()
+        self._line_count = 0
+        self.dropped = 0  # messages that fell out of the ring buffer before being shown
+        self.widget.after(self.flush_interval_ms, self._flush_timer)
+
+    def append(self, message, color="black"):
+        if len(self._pending) == self._pending.maxlen:
+            self.dropped += 1
+        self._pending.append((datetime.datetime.now(), message, color))
+
+    def _tag(self, color):
+        tag = f"color_{color}"
+        if tag not in self._tags:
+            self.widget.tag_configure(tag, foreground=color)
+            self._tags.add(tag)
+        return tag
+
+    def flush(self):
+        if not self._pending:
+            return
+        # popleft is atomic, so appends from other threads are never lost
+        pending = [self._pending.popleft() for _ in range(len(self._pending))]
+
+        # One insert call for the whole batch: alternating text/tag arguments
+        chunks = []
+        for timestamp, message, color in pending:
+            if callable(message):
+                message = message()
+            chunks += (f"[{timestamp:%H:%M:%S}] ", TIMESTAMP_TAG, f"{message}\n", self._tag(color))
+
+        self.widget.config(state="normal")
+        self.widget.insert(tk.END, *chunks)
+        self._line_count += len(pending)
+        if self._line_count > self.max_lines:
+            excess = self._line_count - self.max_lines
+            self.widget.delete("1.0", f"{excess + 1}.0")
+            self._line_count = self.max_lines
+        self.widget.config(state="disabled")
+        self.widget.see(tk.END)
+
+    def _flush_timer(self):
+        try:
+            self.flush()
+        finally:
+            self.widget.after(self.flush_interval_ms, self._flush_timer)
+
+    def clear(self):
+        self._pending.clear()
+        self.widget.config(state="normal")
+        self.widget.delete("1.0", tk.END)
+        self.widget.config(state="disabled")
+        self._line_count = 0
@@ -0,0 +1,117 @@
+#
+# asyncio Modbus RTU master.
+#
+# Requests from any number of tasks are queued on the transport and go out
+# one at a time (RTU is half duplex), each with its own deadline derived from
+# the baud rate and the request/response frame sizes instead of a flat
+# timeout. The deadline starts when the request is put on the wire, so time
+# spent waiting in the queue does not count against it.
+#
+# Works on any POSIX file descriptor (serial port, pseudo terminal); on
+# Windows use the synchronous modbus_rtu.ModbusRTU instead.
+#
+
+import asyncio
+import os
+import time
+
+from modbus_rtu import (
+    ModbusTimeoutError, build_request, expected_response_length, parse_response,
+    response_deadline, response_length, silent_interval, DEFAULT_TURNAROUND,
+)
+
+
+class AsyncModbusRTU:
+    def __init__(self, fd, baudrate, turnaround=DEFAULT_TURNAROUND, close_fd=None):
+        self.fd = fd
+        self.baudrate = baudrate
+        self.turnaround = turnaround
+        self.on_frame = None  # optional callback(direction, frame), as ModbusRTU.on_frame
+        self._close_fd = close_fd
+        self._buffer = bytearray()
+        self._data_event = asyncio.Event()
+        self._lock = asyncio.Lock()
+        self._last_activity = 0.0
+        self._loop = asyncio.get_running_loop()
+        os.set_blocking(fd, False)
+        self._loop.add_reader(fd, self._on_readable)
+
+        # Statistics
+        self.transactions = 0
+        self.timeouts = 0
+
+    @classmethod
+    async def open(cls, device, baudrate, **kwargs):
+        # Open a serial device (or pty) by name; configured through pyserial
+        import serial
+
+        port = serial.Serial(device, baudrate=baudrate, timeout=0)
+        return cls(port.fileno(), baudrate, close_fd=port.close, **kwargs)
+
+    def _on_readable(self):
+        try:
+            data = os.read(self.fd, 4096)
+        except (BlockingIOError, InterruptedError):
+            return
+        except OSError:
+            data = b""
+        if data:
+            self._buffer += data
+            self._data_event.set()
+
+    async def _read_exact(self, length, deadline, what):
+        while len(self._buffer) < length:
+            remaining = deadline - self._loop.time()
+            if remaining <= 0:
+                raise ModbusTimeoutError(f"Incomplete response {what} received.")
+            self._data_event.clear()
+            try:
+                await asyncio.wait_for(self._data_event.wait(), remaining)
+            except asyncio.TimeoutError:
+                pass
+        data = bytes(self._buffer[:length])
+        del self._buffer[:length]
+        return data
+
+    async def execute(self, slave_address, function_code, address, data, timeout=None):
+        request = build_request(slave_address, function_code, address, data)
+        async with self._lock:
+            delay = self._last_activity + silent_interval(self.baudrate) - time.monotonic()
+            if delay > 0:
+                await asyncio.sleep(delay)
+
+            # Anything left over belongs to an earlier, timed out transaction
+            self._buffer.clear()
+            if timeout is None:
+                timeout = response_deadline(self.baudrate, len(request), expected_response_length(function_code, data), self.turnaround)
+            deadline = self._loop.time() + timeout
+
+            os.write(self.fd, request)
+            self.transactions += 1
+            if self.on_frame:
+                self.on_frame("TX", request)
+            try:
+                header = await self._read_exact(3, deadline, "header")
+                response = header + await self._read_exact(response_length(header) - 3, deadline, "body")
+            except ModbusTimeoutError:
+                self.timeouts += 1
+                raise
+            finally:
+                self._last_activity = time.monotonic()
+
+        if self.on_frame:
+            self.on_frame("RX", response)
+        response_structure = parse_response(function_code, response)
+        response_structure["request"] = request
+        return response_structure
+
+    async def read_holding_registers(self, slave_address, address, count, timeout=None):
+        return (await self.execute(slave_address, 0x03, address, count, timeout))["data"]
+
+    async def write_register(self, slave_address, address, value, timeout=None):
+        return (await self.execute(slave_address, 0x06, address, value, timeout))["data"]
+
+    def close(self):
+        self._loop.remove_reader(self.fd)
+        if self._close_fd:
+            self._close_fd()
@@ -0,0 +1,436 @@
+#
+# Modbus RTU framing helpers shared by the GUI and the command line tools.
+#
+# The CRC16 (poly 0xA001, init 0xFFFF) is computed from a precomputed 256-entry
+# table, so each byte costs one lookup instead of the 8-step shift loop.
+#
+
+import struct
+import threading
+import time
+
+
+def _build_crc16_table():
+    table = []
+    for byte in range(256):
+        crc = byte
+        for _ in range(8):
+            if crc & 1:
+                crc = (crc >> 1) ^ 0xA001
+            else:
+                crc >>= 1
+        table.append(crc)
+    return tuple(table)
+
+
+CRC16_TABLE = _build_crc16_table()
+
+
+def crc16(data, crc=0xFFFF):
+    # Accepts bytes, bytearray or memoryview; iterating a memoryview yields ints
+    # without copying, so slices of a larger receive buffer can be passed as-is.
+    table = CRC16_TABLE
+    for byte in data:
+        crc = (crc >> 8) ^ table[(crc ^ byte) & 0xFF]
+    return crc
+
+
+def crc16_batch(frames):
+    # CRC of every frame in one call (e.g. a burst of buffered responses)
+    table = CRC16_TABLE
+    results = []
+    for frame in frames:
+        crc = 0xFFFF
+        for byte in frame:
+            crc = (crc >> 8) ^ table[(crc ^ byte) & 0xFF]
+        results.append(crc)
+    return results
+
+
+def check_crc(frame):
+    # Running the CRC over a frame including its (little endian) CRC trailer
+    # yields zero when the checksum is valid, so no slicing is needed.
+    return len(frame) >= 4 and crc16(frame) == 0
+
+
+def check_crc_batch(frames):
+    frames = list(frames)
+    return [len(frame) >= 4 and crc == 0 for frame, crc in zip(frames, crc16_batch(frames))]
+
+
+def append_crc(frame):
+    return bytes(frame) + struct.pack('<H', crc16(frame))
+
+
+class ModbusError(Exception):
+    pass
+
+
+class ModbusTimeoutError(ModbusError):
+    # No or incomplete response within the port timeout
+    pass
+
+
+class ModbusCRCError(ModbusError):
+    pass
+
+
+ILLEGAL_FUNCTION = 1
+
+EXCEPTION_CODES = {
+    1: "Illegal function",
+    2: "Illegal data address",
+    3: "Illegal data value",
+    4: "Slave device failure",
+    5: "Acknowledge",
+    6: "Slave device busy",
+}
+
+
+class ModbusExceptionError(ModbusError):
+    # Exception response (function code | 0x80) returned by the slave
+    def __init__(self, function_code, exception_code):
+        self.function_code = function_code
+        self.exception_code = exception_code
+        description = EXCEPTION_CODES.get(exception_code, "Unknown exception")
+        super().__init__(f"Exception response to function 0x{function_code:02X}: {exception_code} ({description})")
+
+
+def build_request(slave_address, function_code, address, data):
+    # Request layout shared by 0x03 (data = register count) and 0x06 (data = value)
+    return append_crc(struct.pack('>BBHH', slave_address, function_code, address, data))
+
+
+# Most registers a single 0x10 request may carry
+MAX_WRITE_COUNT = 123
+
+
+def build_write_multiple_request(slave_address, address, values):
+    # 0x10 Write Multiple Registers
+    count = len(values)
+    if not 1 <= count <= MAX_WRITE_COUNT:
+        raise ValueError(f"0x10 write needs 1-{MAX_WRITE_COUNT} values, got {count}")
+    return append_crc(struct.pack(f'>BBHHB{count}H', slave_address, 0x10, address, count, 2 * count, *values))
+
+
+# Most registers a single 0x17 request may write and read
+MAX_READ_WRITE_WRITE_COUNT = 121
+MAX_READ_WRITE_READ_COUNT = 125
+
+
+def build_read_write_multiple_request(slave_address, read_address, read_count, write_address, values):
+    # 0x17 Read/Write Multiple Registers; the slave writes before it reads
+    count = len(values)
+    if not 1 <= count <= MAX_READ_WRITE_WRITE_COUNT:
+        raise ValueError(f"0x17 write needs 1-{MAX_READ_WRITE_WRITE_COUNT} values, got {count}")
+    if not 1 <= read_count <= MAX_READ_WRITE_READ_COUNT:
+        raise ValueError(f"0x17 read needs 1-{MAX_READ_WRITE_READ_COUNT} registers, got {read_count}")
+    return append_crc(struct.pack(f'>BBHHHHB{count}H', slave_address, 0x17, read_address, read_count,
+                                  write_address, count, 2 * count, *values))
+
+
+def format_frame(frame):
+    return ' '.join(format(x, '02X') for x in frame)
+
+
+# An RTU character is 11 bits on the wire (start, 8 data, parity/stop, stop)
+BITS_PER_CHAR = 11
+
+
+def char_time(baudrate):
+    return BITS_PER_CHAR / baudrate
+
+
+# Time the drive may take between the end of a request and the start of its
+# response. Added on top of the wire time when deriving a response deadline.
+DEFAULT_TURNAROUND = 0.05
+
+# Robust mode: reads are repeated after timeouts and framing/CRC errors with
+# exponential back-off. Writes are never repeated automatically.
+MAX_RETRIES = 3
+RETRY_BACKOFF = 0.02      # seconds before the first retry, doubled per attempt
+MAX_RETRY_BACKOFF = 0.5
+RETRYABLE_FUNCTIONS = (0x03, 0x04)
+
+
+def response_length(header):
+    # Total response frame length from its first 3 bytes
+    function_code = header[1]
+    if function_code & 0x80:
+        return 5  # address, function | 0x80, exception code, CRC
+    if function_code in (0x03, 0x04, 0x17):
+        return 5 + header[2]  # address, function, byte count, data, CRC
+    if function_code in (0x05, 0x06, 0x0F, 0x10):
+        return 8  # echo of address/value or address/quantity
+    raise ModbusError(f"Unsupported function code 0x{function_code:02X} in response.")
+
+
+def expected_response_length(function_code, data):
+    # Length of a normal response to a build_request() frame
+    if function_code in (0x03, 0x04):
+        return 5 + 2 * data
+    return 8
+
+
+def response_deadline(baudrate, request_length, response_length, turnaround=DEFAULT_TURNAROUND):
+    # Seconds from starting to send a request until its response must be complete
+    return (request_length + response_length) * char_time(baudrate) + silent_interval(baudrate) + turnaround
+
+
+def parse_response(function_code, response):
+    # Validate a complete response frame and return the response structure
+    if not check_crc(response):
+        raise ModbusCRCError("Invalid checksum in received packet (CRC error).")
+    if response[1] == function_code | 0x80:
+        raise ModbusExceptionError(function_code, response[2])
+    if response[1] != function_code:
+        raise ModbusError(f"Unexpected function code 0x{response[1]:02X} in response.")
+
+    response_structure = {
+        "slave_address": response[0],
+        "function_code": response[1],
+        "response": bytes(response),
+    }
+    if function_code in (0x03, 0x04, 0x17):
+        byte_count = response[2]
+        response_structure["byte_count"] = byte_count
+        response_structure["data"] = list(struct.unpack(f'>{byte_count // 2}H', response[3:3 + byte_count - byte_count % 2]))
+    else:
+        response_structure["register_address"], response_structure["data"] = struct.unpack('>HH', response[2:6])
+    return response_structure
+
+
+def silent_interval(baudrate):
+    # Minimum idle time between frames: 3.5 character times, fixed at
+    # 1.75 ms above 19200 baud as recommended by the Modbus serial line spec.
+    if baudrate > 19200:
+        return 0.00175
+    return 3.5 * char_time(baudrate)
+
+
+class ModbusRTU:
+    # Synchronous Modbus RTU master on top of a pyserial-like port object
+    # (anything with write() and read(n) honouring its own timeout).
+    #
+    # With robust=True the link is meant for noisy lines: the port timeout is
+    # derived from the baud rate and frame length, stale input is discarded
+    # before every request, the input is flushed once the line went quiet
+    # after a broken frame, and reads are retried (see MAX_RETRIES).
+
+    def __init__(self, port, baudrate=None, robust=False, retries=MAX_RETRIES, turnaround=DEFAULT_TURNAROUND):
+        self.port = port
+        self.baudrate = baudrate or getattr(port, "baudrate", None) or 9600
+        self.robust = robust
+        self.turnaround = turnaround  # reply delay allowed on top of the wire time in robust mode
+        self.retries = retries if robust else 0
+        self.on_retry = None  # optional callback(slave_address, function_code, attempt)
+        self.on_frame = None  # optional callback(direction, frame) with direction "TX" or "RX"
+        # optional callback(slave_address, function_code, elapsed, bytes_sent, bytes_received, error)
+        # after every transaction, error is None or the ModbusError raised (see bus_metrics.py)
+        self.on_transaction = None
+        self._last_activity = 0.0
+        # Normally only the bus worker uses the link; the watchdog's emergency
+        # STOP may come from another thread and must not split a transaction
+        self._transaction_lock = threading.Lock()
+
+        # Bus statistics
+        self.transactions = 0
+        self.bytes_sent = 0
+        self.bytes_received = 0
+        self.busy_time = 0.0  # seconds spent inside transactions
+        self.resyncs = 0  # times stale or broken input was discarded
+
+    def _read_exact(self, length, what):
+        data = self.port.read(length)
+        self.bytes_received += len(data)
+        if len(data) != length:
+            raise ModbusTimeoutError(f"Incomplete response {what} received.")
+        return data
+
+    def _wait_silent_interval(self):
+        delay = self._last_activity + silent_interval(self.baudrate) - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+
+    def _discard_input(self):
+        # Drop whatever is waiting in the receive buffer; True if there was something
+        waiting = getattr(self.port, "in_waiting", 0)
+        if not waiting:
+            return False
+        if hasattr(self.port, "reset_input_buffer"):
+            self.port.reset_input_buffer()
+        else:
+            self.port.read(waiting)
+        self.resyncs += 1
+        return True
+
+    def _resync(self):
+        # After a timeout or a broken frame the rest of it may still be on
+        # its way: wait for one silent interval, then flush what arrived.
+        time.sleep(silent_interval(self.baudrate))
+        self._discard_input()
+        self._last_activity = time.monotonic()
+
+    def wire_time(self, nbytes):
+        # Seconds needed to transfer nbytes at the configured baud rate
+        return nbytes * char_time(self.baudrate)
+
+    def utilisation(self, bytes_transferred, elapsed):
+        # Fraction of the elapsed time the line was carrying characters
+        return self.wire_time(bytes_transferred) / elapsed if elapsed > 0 else 0.0
+
+    def execute(self, slave_address, function_code, address, data):
+        if function_code not in (0x03, 0x06):
+            raise ModbusError("Unsupported function code or not implemented.")
+        return self.transact(function_code, build_request(slave_address, function_code, address, data))
+
+    def transact(self, function_code, request):
+        # Send a complete request frame and return the parsed response;
+        # robust links retry reads that fail for other reasons than an
+        # exception response
+        attempts = 1 + (self.retries if function_code in RETRYABLE_FUNCTIONS else 0)
+        for attempt in range(attempts):
+            try:
+                with self._transaction_lock:
+                    return self._transact_once(function_code, request)
+            except ModbusExceptionError:
+                raise
+            except ModbusError:
+                if attempt + 1 == attempts:
+                    raise
+            if self.on_retry:
+                self.on_retry(request[0], function_code, attempt + 1)
+            time.sleep(min(RETRY_BACKOFF * 2 ** attempt, MAX_RETRY_BACKOFF))
+
+    def _transact_once(self, function_code, request):
+        self._wait_silent_interval()
+        if self.robust:
+            self._discard_input()  # leftovers of an earlier frame would desync this one
+            self.port.timeout = response_deadline(self.baudrate, len(request), self._expected_length(function_code, request),
+                                                  self.turnaround)
+        start = time.monotonic()
+        received = self.bytes_received
+        error = None
+        try:
+            try:
+                self.port.write(request)
+                self.bytes_sent += len(request)
+                self.transactions += 1
+                if self.on_frame:
+                    self.on_frame("TX", request)
+
+                # Slave address, function code and byte count or exception code
+                # tell how much more is coming.
+                header = self._read_exact(3, "header")
+                response = header + self._read_exact(response_length(header) - 3, "body")
+            finally:
+                self._last_activity = time.monotonic()
+                self.busy_time += self._last_activity - start
+
+            if self.on_frame:
+                self.on_frame("RX", response)
+
+            response_structure = parse_response(function_code, response)
+            if response[0] != request[0]:
+                raise ModbusError(f"Response from slave {response[0]}, expected {request[0]}.")
+        except Exception as e:
+            error = e
+            if self.robust and isinstance(e, ModbusError) and not isinstance(e, ModbusExceptionError):
+                self._resync()
+            raise
+        finally:
+            if self.on_transaction:
+                self.on_transaction(request[0], function_code, self._last_activity - start,
+                                    len(request), self.bytes_received - received, error)
+        response_structure["request"] = request
+        return response_structure
+
+    @staticmethod
+    def _expected_length(function_code, request):
+        if function_code in (0x03, 0x04, 0x17):  # the (read) count is at the same offset in all three
+            return 5 + 2 * struct.unpack('>H', request[4:6])[0]
+        return 8
+
+    def read_holding_registers(self, slave_address, address, count):
+        return self.execute(slave_address, 0x03, address, count)["data"]
+
+    def write_register(self, slave_address, address, value):
+        return self.execute(slave_address, 0x06, address, value)["data"]
+
+    def write_registers(self, slave_address, address, values):
+        # Returns the number of registers the slave reports as written
+        return self.transact(0x10, build_write_multiple_request(slave_address, address, values))["data"]
+
+    def read_write_registers(self, slave_address, read_address, read_count, write_address, values):
+        # Write values and read read_count registers in one transaction;
+        # returns the words read
+        request = build_read_write_multiple_request(slave_address, read_address, read_count, write_address, values)
+        return self.transact(0x17, request)["data"]
+
+
+class FunctionSupport:
+    # Function codes each slave answered with "Illegal function", so later
+    # requests go to the fallback straight away
+
+    def __init__(self):
+        self._unsupported = {}  # {slave: {function code}}
+
+    def supported(self, slave_address, function_code):
+        return function_code not in self._unsupported.get(slave_address, ())
+
+    def reject(self, slave_address, function_code):
+        self._unsupported.setdefault(slave_address, set()).add(function_code)
+
+    def clear(self):
+        self._unsupported.clear()
+
+
+def _unless_illegal_function(support, slave_address, function_code, e):
+    # Remember a missing function code, re-raise every other exception
+    if e.exception_code != ILLEGAL_FUNCTION or support is None:
+        raise e
+    support.reject(slave_address, function_code)
+
+
+def write_values(link, slave_address, address, values, support=None):
+    # Write consecutive registers with the fewest requests the slave accepts:
+    # one 0x10, or one 0x06 per value for a slave without 0x10 (a single
+    # value is always written with 0x06). Returns the function codes sent.
+    values = list(values)
+    if len(values) > 1 and (support is None or support.supported(slave_address, 0x10)):
+        try:
+            link.write_registers(slave_address, address, values)
+            return [0x10]
+        except ModbusExceptionError as e:
+            _unless_illegal_function(support, slave_address, 0x10, e)
+    for offset, value in enumerate(values):
+        link.write_register(slave_address, address + offset, value)
+    return [0x06] * len(values)
+
+
+def read_write_values(link, slave_address, read_address, read_count, write_address, values, support=None):
+    # 0x17, falling back to write_values() followed by a 0x03 read.
+    # Returns (words read, function codes sent).
+    values = list(values)
+    if support is None or support.supported(slave_address, 0x17):
+        try:
+            return link.read_write_registers(slave_address, read_address, read_count, write_address, values), [0x17]
+        except ModbusExceptionError as e:
+            _unless_illegal_function(support, slave_address, 0x17, e)
+    sent = write_values(link, slave_address, write_address, values, support)
+    return link.read_holding_registers(slave_address, read_address, read_count), sent + [0x03]
+
+
+def coalesce_ranges(addresses, max_count=125, max_gap=0):
+    # Group register addresses into (start, count) blocks for 0x03 reads.
+    # Gaps of up to max_gap unused registers are read along rather than
+    # starting a new request; no block exceeds max_count registers.
+    ranges = []
+    for address in sorted(set(addresses)):
+        if ranges:
+            start, count = ranges[-1]
+            if address - (start + count) <= max_gap and address - start < max_count:
+                ranges[-1] = (start, address - start + 1)
+                continue
+        ranges.append((address, 1))
+    return ranges
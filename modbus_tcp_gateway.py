@@ -0,0 +1,251 @@
+#
+# Modbus TCP gateway: many TCP clients (SCADA, historian, laptops) sharing
+# the one RTU link owned by a BusWorker.
+#
+# Holding register reads (0x03) are answered from the worker's
+# register_cache.RegisterCache (give the worker one with the gateway TTL);
+# identical reads arriving while one is already on the bus wait for that
+# transaction instead of queueing their own, unless a write to one of their
+# registers completed after that read was queued. Writes (0x06, 0x10) are
+# queued on the worker in arrival order; the cache stores the written values
+# in the same order on the worker thread. The MBAP unit identifier selects
+# the slave address; 0 and 255 map to default_slave.
+#
+
+import asyncio
+import itertools
+import struct
+import threading
+
+from bus_worker import PRIORITY_COMMAND, PRIORITY_READ
+from modbus_rtu import ModbusExceptionError, ModbusTimeoutError, MAX_WRITE_COUNT
+from register_cache import RegisterCache
+
+DEFAULT_PORT = 502
+DEFAULT_TTL = 0.2  # seconds a read value is reused for other clients
+
+MBAP = struct.Struct(">HHHB")  # transaction id, protocol id, length, unit id
+
+ILLEGAL_FUNCTION = 0x01
+ILLEGAL_DATA_VALUE = 0x03
+SERVER_DEVICE_FAILURE = 0x04
+GATEWAY_TARGET_FAILED = 0x0B
+
+
+class GatewayError(Exception):
+    def __init__(self, exception_code):
+        super().__init__(f"exception {exception_code:#04x}")
+        self.exception_code = exception_code
+
+
+def caching_link(link, ttl=DEFAULT_TTL):
+    # RegisterCache for the gateway's worker: every register reused for ttl seconds
+    return RegisterCache(link, ttl=lambda param: ttl)
+
+
+class ModbusTCPGateway:
+    def __init__(self, worker, host="0.0.0.0", port=DEFAULT_PORT, default_slave=8):
+        self.worker = worker
+        self.host = host
+        self.port = port
+        self.default_slave = default_slave
+        self.cache = worker.link if isinstance(worker.link, RegisterCache) else None
+        self._in_flight = {}  # {(slave, address, count): (asyncio.Future, write sequence when queued)}
+        self._write_sequence = itertools.count(1)
+        self._last_write = 0
+        self._written = {}  # {(slave, address): write sequence of the last completed write}
+        self._server = None
+        self._loop = None
+        self._thread = None
+
+        # statistics
+        self.clients = 0
+        self.requests = 0
+        self.cache_hits = 0   # reads answered from the register cache
+        self.merged_reads = 0  # reads that waited for an identical read already on the bus
+        self.bus_reads = 0
+        self.bus_writes = 0
+
+    @property
+    def hit_rate(self):
+        # Cache hits among the reads that were not merged into another one
+        reads = self.cache_hits + self.bus_reads
+        return self.cache_hits / reads if reads else 0.0
+
+    # ---- bus access ----
+
+    async def _bus(self, function, priority):
+        return await asyncio.wrap_future(self.worker.submit(function, priority=priority))
+
+    def _written_since(self, slave, address, count, sequence):
+        return any(self._written.get((slave, a), 0) > sequence for a in range(address, address + count))
+
+    async def read(self, slave, address, count):
+        # lookup() only reads the cache dict, safe from the event loop thread
+        words = self.cache.lookup(slave, address, count) if self.cache else None
+        if words is not None:
+            self.cache_hits += 1
+            return words
+
+        key = (slave, address, count)
+        pending = self._in_flight.get(key)
+        if pending is not None and not self._written_since(slave, address, count, pending[1]):
+            self.merged_reads += 1
+            return await asyncio.shield(pending[0])
+
+        future = self._loop.create_future()
+        entry = self._in_flight[key] = (future, self._last_write)
+        try:
+            response = await self._bus(lambda link: link.execute(slave, 0x03, address, count), PRIORITY_READ)
+            if response.get("cached"):
+                self.cache_hits += 1
+            else:
+                self.bus_reads += 1
+            future.set_result(response["data"])
+            return response["data"]
+        except Exception as e:
+            future.set_exception(e)
+            future.exception()  # retrieved here, waiting clients re-raise it
+            raise
+        finally:
+            if self._in_flight.get(key) is entry:
+                del self._in_flight[key]
+
+    async def write(self, slave, address, values):
+        # Submitted synchronously on arrival: the worker keeps FIFO order
+        # within a priority, so writes reach the drive in the order received.
+        self.bus_writes += 1
+        if len(values) == 1:
+            bus = self.worker.submit(lambda link: link.write_register(slave, address, values[0]), priority=PRIORITY_COMMAND)
+        else:
+            bus = self.worker.submit(lambda link: link.write_registers(slave, address, values), priority=PRIORITY_COMMAND)
+        try:
+            await asyncio.wrap_future(bus)
+        finally:
+            # Reads queued before this point may return the old value, later reads must not join them
+            self._last_write = next(self._write_sequence)
+            for a in range(address, address + len(values)):
+                self._written[(slave, a)] = self._last_write
+
+    # ---- protocol ----
+
+    async def handle_pdu(self, slave, pdu):
+        # Response PDU for a request PDU; exceptions are encoded as Modbus exception responses
+        function_code = pdu[0]
+        try:
+            if function_code == 0x03:
+                address, count = struct.unpack(">HH", pdu[1:5])
+                if not 1 <= count <= 125:
+                    raise GatewayError(ILLEGAL_DATA_VALUE)
+                words = await self.read(slave, address, count)
+                return bytes([0x03, 2 * count]) + struct.pack(f">{count}H", *words)
+            if function_code == 0x06:
+                address, value = struct.unpack(">HH", pdu[1:5])
+                await self.write(slave, address, [value])
+                return pdu[:5]
+            if function_code == 0x10:
+                address, count, byte_count = struct.unpack(">HHB", pdu[1:6])
+                if not 1 <= count <= MAX_WRITE_COUNT or byte_count != 2 * count or len(pdu) < 6 + byte_count:
+                    raise GatewayError(ILLEGAL_DATA_VALUE)
+                await self.write(slave, address, list(struct.unpack(f">{count}H", pdu[6:6 + byte_count])))
+                return pdu[:5]
+            raise GatewayError(ILLEGAL_FUNCTION)
+        except GatewayError as e:
+            code = e.exception_code
+        except ModbusExceptionError as e:
+            code = e.exception_code
+        except ModbusTimeoutError:
+            code = GATEWAY_TARGET_FAILED
+        except (struct.error, ValueError):
+            code = ILLEGAL_DATA_VALUE
+        except Exception:
+            code = SERVER_DEVICE_FAILURE
+        return bytes([function_code | 0x80, code])
+
+    async def _respond(self, writer, write_lock, transaction_id, unit_id, pdu):
+        slave = self.default_slave if unit_id in (0, 255) else unit_id
+        response = await self.handle_pdu(slave, pdu)
+        async with write_lock:
+            writer.write(MBAP.pack(transaction_id, 0, len(response) + 1, unit_id) + response)
+            await writer.drain()
+
+    async def _handle_client(self, reader, writer):
+        # Requests of one client are served concurrently (clients may pipeline);
+        # responses carry the client's transaction id.
+        self.clients += 1
+        write_lock = asyncio.Lock()
+        tasks = set()
+        try:
+            while True:
+                header = await reader.readexactly(MBAP.size)
+                transaction_id, protocol_id, length, unit_id = MBAP.unpack(header)
+                if protocol_id != 0 or not 2 <= length <= 254:
+                    break
+                pdu = await reader.readexactly(length - 1)
+                self.requests += 1
+                if pdu[0] in (0x06, 0x10):
+                    # Queue the write on the bus before reading the next request
+                    await self._respond(writer, write_lock, transaction_id, unit_id, pdu)
+                    continue
+                task = asyncio.ensure_future(self._respond(writer, write_lock, transaction_id, unit_id, pdu))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+        except (asyncio.IncompleteReadError, ConnectionError, asyncio.CancelledError):
+            pass  # client went away or the server is shutting down
+        finally:
+            for task in tasks:
+                task.cancel()
+            self.clients -= 1
+            writer.close()
+
+    async def start_server(self):
+        self._loop = asyncio.get_running_loop()
+        self._server = await asyncio.start_server(self._handle_client, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]  # resolved when port=0
+        return self._server
+
+    async def serve_forever(self):
+        server = await self.start_server()
+        async with server:
+            await server.serve_forever()
+
+    async def _shutdown(self):
+        self._server.close()
+        tasks = [task for task in asyncio.all_tasks() if task is not asyncio.current_task()]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        await self._server.wait_closed()
+
+    # ---- background thread, for the GUI ----
+
+    def start(self):
+        # Run the server on its own event loop thread; returns once it is listening
+        started = threading.Event()
+        errors = []
+
+        def run():
+            loop = asyncio.new_event_loop()
+            try:
+                loop.run_until_complete(self.start_server())
+            except OSError as e:
+                errors.append(e)
+                started.set()
+                loop.close()
+                return
+            started.set()
+            loop.run_forever()
+            loop.run_until_complete(self._shutdown())
+            loop.close()
+
+        self._thread = threading.Thread(target=run, name="modbus-tcp-gateway", daemon=True)
+        self._thread.start()
+        started.wait()
+        if errors:
+            raise errors[0]
+
+    def stop(self, timeout=None):
+        if self._loop is not None and self._thread is not None:
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self._thread.join(timeout)
+            self._thread = None
@@ -0,0 +1,253 @@
+#
+# Scripted motion profiles: frequency ramps, holds, direction changes and
+# frequency tables executed against P102/P103 on a fixed timeline.
+#
+# A profile file is JSON:
+#
+#   {"format": "vfd-commander-profile", "update_rate_hz": 5, "steps": [
+#       {"run": "fwd"},
+#       {"ramp": 35.0, "seconds": 10},
+#       {"hold": 60},
+#       {"run": "rev"},
+#       {"table": [[10, 5], [20, 5], [30, 5]]},
+#       {"frequency": 15.0},
+#       {"run": "stop"}
+#   ]}
+#
+# Steps are compiled into commands with offsets from the start, plus the
+# duration of the whole profile (a trailing hold has no command of its own).
+# The runner schedules every command against an absolute monotonic deadline,
+# so a late write does not push the rest of the profile back, samples
+# telemetry in the gaps between commands, records commanded versus achieved
+# times and finishes when the duration is over.
+#
+
+import csv
+import json
+import statistics
+import threading
+import time
+from dataclasses import dataclass
+
+import drive
+import register_map
+
+PROFILE_FORMAT = "vfd-commander-profile"
+DEFAULT_UPDATE_RATE_HZ = 5  # setpoint updates per second during ramps
+SPIN_THRESHOLD = 0.002      # last part of a wait is spent polling the clock
+
+RUN_COMMANDS = {"fwd": drive.CONTROL_FWD, "rev": drive.CONTROL_REV, "stop": drive.CONTROL_STOP}
+
+
+@dataclass(frozen=True)
+class Command:
+    offset: float   # seconds from the start of the profile
+    param: int
+    value: int      # raw register value
+    label: str
+
+
+@dataclass
+class CommandRecord:
+    command: Command
+    scheduled: float  # monotonic deadline
+    started: float    # monotonic time the write was issued
+    finished: float   # monotonic time the write was acknowledged
+    error: str = None
+
+    @property
+    def jitter(self):
+        return self.started - self.scheduled
+
+    @property
+    def latency(self):
+        return self.finished - self.started
+
+
+def _raw_frequency(hz):
+    return register_map.REGISTERS[drive.P_SET_FREQUENCY].encode(hz)
+
+
+def compile_profile(profile):
+    # List of Commands from a profile document (dict) or a list of steps
+    return compile_timeline(profile)[0]
+
+
+def compile_timeline(profile):
+    # (Commands, duration in seconds) from a profile document or a list of steps
+    if isinstance(profile, dict):
+        steps = profile["steps"]
+        update_rate = profile.get("update_rate_hz", DEFAULT_UPDATE_RATE_HZ)
+    else:
+        steps, update_rate = profile, DEFAULT_UPDATE_RATE_HZ
+
+    commands = []
+    t = 0.0
+    frequency = None  # last commanded frequency, Hz
+
+    def set_frequency(hz, label):
+        nonlocal frequency
+        commands.append(Command(t, drive.P_SET_FREQUENCY, _raw_frequency(hz), label))
+        frequency = hz
+
+    for number, step in enumerate(steps, 1):
+        if "run" in step:
+            direction = step["run"].lower()
+            if direction not in RUN_COMMANDS:
+                raise ValueError(f"step {number}: run must be fwd, rev or stop")
+            commands.append(Command(t, drive.P_CONTROL, RUN_COMMANDS[direction], direction.upper()))
+        elif "frequency" in step:
+            set_frequency(float(step["frequency"]), f"{float(step['frequency']):g} Hz")
+        elif "ramp" in step:
+            target = float(step["ramp"])
+            seconds = float(step["seconds"])
+            start = frequency if frequency is not None else 0.0
+            points = max(1, round(seconds * update_rate))
+            for i in range(1, points + 1):
+                t_point = t + seconds * i / points
+                hz = start + (target - start) * i / points
+                commands.append(Command(t_point, drive.P_SET_FREQUENCY, _raw_frequency(hz), f"ramp {hz:.2f} Hz"))
+            frequency = target
+            t += seconds
+        elif "hold" in step:
+            t += float(step["hold"])
+        elif "table" in step:
+            for hz, seconds in step["table"]:
+                set_frequency(float(hz), f"table {float(hz):g} Hz")
+                t += float(seconds)
+        else:
+            raise ValueError(f"step {number}: unknown step {step}")
+    return commands, t
+
+
+def load_profile(path):
+    with open(path) as f:
+        document = json.load(f)
+    if document.get("format", PROFILE_FORMAT) != PROFILE_FORMAT:
+        raise ValueError(f"{path} is not a motion profile")
+    return document
+
+
+class ProfileRunner(threading.Thread):
+    # Runs compiled commands through link (a WorkerLink or ModbusRTU). With a
+    # TelemetryStore, the status block is read whenever there is time left
+    # before the next command and published to the store.
+
+    def __init__(self, link, slave_address, commands, store=None, sample_rate_hz=5.0, on_command=None, on_finished=None,
+                 duration=None):
+        super().__init__(name="motion-profile", daemon=True)
+        self.link = link
+        self.slave_address = slave_address
+        self.commands = sorted(commands, key=lambda c: c.offset)
+        self._duration = duration  # from compile_timeline(); None = ends with the last command
+        self.store = store
+        self.sample_period = 1.0 / sample_rate_hz if sample_rate_hz else None
+        self.on_command = on_command  # callback(CommandRecord), called on this thread
+        self.on_finished = on_finished  # callback(runner), called on this thread at the end
+        self.records = []
+        self.samples = 0
+        self.aborted = False
+        self.error = None
+        self._stop_event = threading.Event()
+        self._sample_cost = 0.0  # duration of a status read, measured before the start
+        self._next_sample = 0.0
+
+    @property
+    def duration(self):
+        last = self.commands[-1].offset if self.commands else 0.0
+        return max(last, self._duration or 0.0)
+
+    def stop(self, timeout=None):
+        # Abort the profile; the drive is sent STOP
+        self._stop_event.set()
+        if self.is_alive() and threading.current_thread() is not self:
+            self.join(timeout)
+
+    def _sample(self):
+        start = time.monotonic()
+        try:
+            snapshot = drive.read_status_snapshot(self.link, self.slave_address)
+        except Exception:
+            snapshot = None
+        elapsed = time.monotonic() - start
+        self._sample_cost = 0.8 * self._sample_cost + 0.2 * elapsed if self._sample_cost else elapsed
+        self._next_sample = start + self.sample_period
+        if snapshot is not None:
+            self.samples += 1
+            self.store.update(dict(zip(range(drive.STATUS_FIRST, drive.STATUS_LAST + 1), snapshot.words)), snapshot.timestamp)
+
+    def _wait_until(self, deadline):
+        # Sleep until deadline, sampling telemetry while there is enough slack;
+        # returns False when aborted
+        while True:
+            now = time.monotonic()
+            remaining = deadline - now
+            if remaining <= 0:
+                return True
+            if self.store is not None and self.sample_period and now >= self._next_sample and remaining > 2 * self._sample_cost:
+                self._sample()
+                continue
+            if remaining > SPIN_THRESHOLD:
+                if self._stop_event.wait(remaining - SPIN_THRESHOLD):
+                    return False
+            elif self._stop_event.is_set():
+                return False
+
+    def run(self):
+        if self.store is not None and self.sample_period:
+            self._sample()
+        start = time.monotonic()
+        try:
+            for command in self.commands:
+                scheduled = start + command.offset  # absolute: lateness does not accumulate
+                if not self._wait_until(scheduled):
+                    self.aborted = True
+                    break
+                started = time.monotonic()
+                error = None
+                try:
+                    self.link.write_register(self.slave_address, drive.param_address(command.param), command.value)
+                except Exception as e:
+                    error = str(e)
+                record = CommandRecord(command, scheduled, started, time.monotonic(), error)
+                self.records.append(record)
+                if self.on_command:
+                    self.on_command(record)
+            else:
+                # Trailing hold: the profile is only over at its full duration
+                if not self._wait_until(start + self.duration):
+                    self.aborted = True
+        except Exception as e:
+            self.error = e
+            self.aborted = True
+        if self.aborted:
+            try:
+                self.link.write_register(self.slave_address, drive.param_address(drive.P_CONTROL), drive.CONTROL_STOP)
+            except Exception as e:
+                self.error = self.error or e
+        if self.on_finished:
+            self.on_finished(self)
+
+    def jitter_summary(self):
+        # Seconds: mean, p50, p99 and max of achieved - commanded start times
+        jitters = sorted(record.jitter for record in self.records)
+        if not jitters:
+            return {"commands": 0}
+        return {
+            "commands": len(jitters),
+            "mean": statistics.fmean(jitters),
+            "p50": jitters[len(jitters) // 2],
+            "p99": jitters[min(len(jitters) - 1, int(len(jitters) * 0.99))],
+            "max": jitters[-1],
+            "write_latency_mean": statistics.fmean(record.latency for record in self.records),
+            "errors": sum(1 for record in self.records if record.error),
+        }
+
+    def save_jitter_csv(self, path):
+        with open(path, "w", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(["offset", "label", "param", "value", "jitter_ms", "latency_ms", "error"])
+            for record in self.records:
+                c = record.command
+                writer.writerow([f"{c.offset:.3f}", c.label, f"P{c.param:03d}", c.value,
+                                 f"{record.jitter * 1000:.2f}", f"{record.latency * 1000:.2f}", record.error or ""])
@@ -0,0 +1,167 @@
+#
+# Parameter set backup and restore (P000-P189).
+#
+# Backups are read with the fewest block reads the drive accepts; blocks the
+# drive rejects are split until the offending parameters are isolated and
+# skipped. A restore reads the live values, writes only the parameters that
+# differ (0x10 for consecutive runs, falling back to 0x06 when the drive
+# does not implement 0x10, see modbus_rtu.write_values) and reads them back
+# to verify.
+#
+
+import datetime
+import json
+
+import drive
+from modbus_rtu import ModbusExceptionError, FunctionSupport, coalesce_ranges, write_values, MAX_WRITE_COUNT
+
+BACKUP_FORMAT = "vfd-commander-parameters"
+BACKUP_VERSION = 1
+
+PARAM_FIRST = 0
+PARAM_LAST = 189
+
+# Never written by a restore: the feedback block is read-only and the run
+# command must not start the motor as a side effect of loading settings.
+READ_ONLY_PARAMS = frozenset(range(drive.STATUS_FIRST, drive.STATUS_LAST + 1))
+EXCLUDED_FROM_RESTORE = READ_ONLY_PARAMS | {drive.P_CONTROL}
+
+
+def _report(progress, done, total, message):
+    if progress:
+        progress(done, total, message)
+
+
+def _read_block(link, slave_address, start, count, values, missing):
+    try:
+        words = link.read_holding_registers(slave_address, drive.param_address(start), count)
+    except ModbusExceptionError:
+        if count == 1:
+            missing.append(start)
+            return
+        half = count // 2
+        _read_block(link, slave_address, start, half, values, missing)
+        _read_block(link, slave_address, start + half, count - half, values, missing)
+        return
+    values.update(zip(range(start, start + count), words))
+
+
+def read_parameters(link, slave_address, params=None, max_count=drive.MAX_READ_COUNT, progress=None):
+    # Returns ({param: word}, [params the drive refused])
+    params = list(range(PARAM_FIRST, PARAM_LAST + 1)) if params is None else list(params)
+    ranges = coalesce_ranges(params, max_count=max_count)
+    values = {}
+    missing = []
+    for i, (start, count) in enumerate(ranges):
+        _report(progress, i, len(ranges), f"Reading P{start:03d}-P{start + count - 1:03d}")
+        _read_block(link, slave_address, start, count, values, missing)
+    _report(progress, len(ranges), len(ranges), f"Read {len(values)} parameters")
+    return {param: values[param] for param in params if param in values}, missing
+
+
+def save_backup(path, values, slave_address=None):
+    document = {
+        "format": BACKUP_FORMAT,
+        "version": BACKUP_VERSION,
+        "created": datetime.datetime.now().isoformat(timespec="seconds"),
+        "slave_address": slave_address,
+        "parameters": {f"P{param:03d}": word for param, word in sorted(values.items())},
+    }
+    with open(path, "w") as f:
+        json.dump(document, f, indent=2)
+
+
+def load_backup(path):
+    with open(path) as f:
+        document = json.load(f)
+    if document.get("format") != BACKUP_FORMAT:
+        raise ValueError(f"{path} is not a parameter backup")
+    values = {}
+    for name, word in document["parameters"].items():
+        param = int(name.lstrip("Pp"))
+        if not 0 <= int(word) <= 0xFFFF:
+            raise ValueError(f"{name}: value {word} out of range")
+        values[param] = int(word)
+    return values
+
+
+def backup(link, slave_address, path, max_count=drive.MAX_READ_COUNT, progress=None):
+    values, missing = read_parameters(link, slave_address, max_count=max_count, progress=progress)
+    save_backup(path, values, slave_address)
+    return values, missing
+
+
+def diff_parameters(wanted, live):
+    # {param: (live, wanted)} for restorable parameters that differ
+    return {
+        param: (live.get(param), word)
+        for param, word in sorted(wanted.items())
+        if param not in EXCLUDED_FROM_RESTORE and live.get(param) != word
+    }
+
+
+def _runs(params, max_count):
+    # Consecutive parameter runs, each written with one request
+    return coalesce_ranges(params, max_count=max_count, max_gap=0)
+
+
+class RestoreResult:
+    def __init__(self):
+        self.changes = {}       # {param: (old, new)}
+        self.requests = 0       # write requests sent
+        self.failed = {}        # {param: error}
+        self.mismatches = {}    # {param: (read back, wanted)} after verify
+        self.multi_write = True
+
+    @property
+    def ok(self):
+        return not self.failed and not self.mismatches
+
+
+def restore(link, slave_address, wanted, max_count=drive.MAX_READ_COUNT, multi_write=True, verify=True, progress=None,
+            support=None):
+    result = RestoreResult()
+    support = support if support is not None else FunctionSupport()
+    if not multi_write:
+        support.reject(slave_address, 0x10)
+    restorable = [param for param in wanted if param not in EXCLUDED_FROM_RESTORE]
+    live, _ = read_parameters(link, slave_address, restorable, max_count=max_count, progress=progress)
+    result.changes = diff_parameters({param: wanted[param] for param in restorable}, live)
+
+    runs = _runs(result.changes, MAX_WRITE_COUNT)
+    total = len(result.changes)
+    done = 0
+    for start, count in runs:
+        params = range(start, start + count)
+        values = [wanted[param] for param in params]
+        _report(progress, done, total, f"Writing P{start:03d}" + (f"-P{start + count - 1:03d}" if count > 1 else ""))
+        if count > 1 and support.supported(slave_address, 0x10):
+            try:
+                result.requests += len(write_values(link, slave_address, drive.param_address(start), values, support))
+                done += count
+                continue
+            except ModbusExceptionError as e:
+                if support.supported(slave_address, 0x10):  # the 0x10 request itself was refused
+                    for param in params:
+                        result.failed[param] = e
+                    done += count
+                    continue
+                # no 0x10 and one of the 0x06 writes failed: redo them one by one to find which
+        for param, value in zip(params, values):
+            try:
+                result.requests += len(write_values(link, slave_address, drive.param_address(param), [value], support))
+            except ModbusExceptionError as e:
+                result.failed[param] = e
+            done += 1
+    result.multi_write = support.supported(slave_address, 0x10)
+
+    if verify and result.changes:
+        _report(progress, total, total, "Verifying")
+        written = [param for param in result.changes if param not in result.failed]
+        read_back, _ = read_parameters(link, slave_address, written, max_count=max_count)
+        result.mismatches = {
+            param: (read_back.get(param), wanted[param]) for param in written if read_back.get(param) != wanted[param]
+        }
+
+    _report(progress, total, total, f"Restored {len(result.changes) - len(result.failed)} of {total} changed parameters")
+    return result
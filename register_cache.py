@@ -0,0 +1,128 @@
+#
+# Read-through register cache in front of a Modbus link.
+#
+# RegisterCache wraps a ModbusRTU and is handed to the BusWorker in its
+# place, so every read made on the worker (Get buttons, manual 0x03 sends,
+# polling) is answered from the cache while all requested registers are
+# younger than their register_map ttl. Writes go to the drive and their echo
+# updates the cache, including the feedback parameter that reports the
+# written value (P102 -> P181). Registers without a ttl are never cached.
+#
+# Only used from the bus worker thread, except lookup(), which only reads
+# and may be called from another thread (the Modbus TCP gateway).
+#
+
+import time
+
+import register_map
+from modbus_rtu import build_request
+
+
+class RegisterCache:
+    def __init__(self, link, ttl=None):
+        self.link = link
+        self._ttl = ttl or (lambda param: register_map.register(param).ttl)  # param -> seconds
+        self._values = {}  # {(slave, address): (word, expires)}
+        self.hits = 0
+        self.misses = 0
+
+    def __getattr__(self, name):
+        # Statistics, baudrate, on_frame, ... of the wrapped link
+        return getattr(self.link, name)
+
+    @property
+    def hit_rate(self):
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def _expiry(self, address, now):
+        return now + self._ttl(address - register_map.PARAMETER_OFFSET)
+
+    def lookup(self, slave_address, address, count):
+        # Cached words for the whole range, None if any of them is missing or stale
+        now = time.monotonic()
+        words = []
+        for a in range(address, address + count):
+            entry = self._values.get((slave_address, a))
+            if entry is None or entry[1] <= now:
+                return None
+            words.append(entry[0])
+        return words
+
+    def store(self, slave_address, address, words):
+        now = time.monotonic()
+        for a, word in enumerate(words, address):
+            self._values[(slave_address, a)] = (word, self._expiry(a, now))
+
+    def _store_written(self, slave_address, address, words):
+        self.store(slave_address, address, words)
+        for a, word in enumerate(words, address):
+            feedback = register_map.register(a - register_map.PARAMETER_OFFSET).feedback
+            if feedback is not None:
+                self.store(slave_address, register_map.PARAMETER_OFFSET + feedback, [word])
+
+    def invalidate(self, slave_address=None, address=None, count=1):
+        if slave_address is None:
+            self._values.clear()
+        elif address is None:
+            for key in [key for key in self._values if key[0] == slave_address]:
+                del self._values[key]
+        else:
+            for a in range(address, address + count):
+                self._values.pop((slave_address, a), None)
+
+    def read_holding_registers(self, slave_address, address, count):
+        words = self.lookup(slave_address, address, count)
+        if words is not None:
+            self.hits += 1
+            return words
+        self.misses += 1
+        words = self.link.read_holding_registers(slave_address, address, count)
+        self.store(slave_address, address, words)
+        return words
+
+    def write_register(self, slave_address, address, value):
+        self.invalidate(slave_address, address)
+        echo = self.link.write_register(slave_address, address, value)
+        self._store_written(slave_address, address, [echo])
+        return echo
+
+    def write_registers(self, slave_address, address, values):
+        self.invalidate(slave_address, address, len(values))
+        written = self.link.write_registers(slave_address, address, values)
+        self._store_written(slave_address, address, values)
+        return written
+
+    def read_write_registers(self, slave_address, read_address, read_count, write_address, values):
+        # Never answered from the cache: the write has to reach the drive
+        self.invalidate(slave_address, write_address, len(values))
+        words = self.link.read_write_registers(slave_address, read_address, read_count, write_address, values)
+        self._store_written(slave_address, write_address, values)
+        self.store(slave_address, read_address, words)
+        return words
+
+    def execute(self, slave_address, function_code, address, data):
+        # Same response structure as ModbusRTU.execute; reads served from the
+        # cache are marked with "cached": True and have no frame on the wire.
+        if function_code == 0x03:
+            words = self.lookup(slave_address, address, data)
+            if words is not None:
+                self.hits += 1
+                return {
+                    "slave_address": slave_address,
+                    "function_code": function_code,
+                    "byte_count": 2 * len(words),
+                    "data": words,
+                    "request": build_request(slave_address, function_code, address, data),
+                    "cached": True,
+                }
+            self.misses += 1
+            response = self.link.execute(slave_address, function_code, address, data)
+            self.store(slave_address, address, response["data"])
+            return response
+        if function_code == 0x06:
+            self.invalidate(slave_address, address)
+            response = self.link.execute(slave_address, function_code, address, data)
+            self._store_written(slave_address, response["register_address"], [response["data"]])
+            return response
+        return self.link.execute(slave_address, function_code, address, data)
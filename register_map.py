@@ -0,0 +1,160 @@
+#
+# Declarative register map: address, scaling, unit, signedness, bitfields and
+# enumerations of the VFD parameters the tools work with, plus how long a
+# read value may be reused (ttl, see register_cache.py).
+#
+# decode()/decode_block() turn raw words into engineering values;
+# decode_series() does the same for a whole time series in one vectorized
+# pass (NumPy arrays in, NumPy arrays out; plain lists work without NumPy).
+#
+
+from dataclasses import dataclass, field
+
+import faultcodes
+
+PARAMETER_OFFSET = 40000
+
+
+@dataclass(frozen=True)
+class Bitfield:
+    name: str
+    bit: int
+    width: int = 1
+
+    @property
+    def mask(self):
+        return (1 << self.width) - 1
+
+
+@dataclass(frozen=True)
+class Register:
+    param: int
+    name: str
+    scale: float = 1.0      # engineering value = raw * scale
+    unit: str = ""
+    signed: bool = False
+    bitfields: tuple = ()
+    enum: dict = field(default=None, hash=False, compare=False)  # raw value -> label object
+    writable: bool = False
+    ttl: float = 0.0        # seconds a read value stays valid in the register cache, 0 = never cached
+    feedback: int = None    # read-only parameter that reports the value written here
+
+    @property
+    def address(self):
+        return PARAMETER_OFFSET + self.param
+
+    @property
+    def divisor(self):
+        # Scales below 1 (0.1, 0.01) are applied as a division by an integer:
+        # 3 * 0.1 is 0.30000000000000004, 3 / 10 is 0.3
+        return round(1 / self.scale) if self.scale < 1 else None
+
+    def scaled(self, value):
+        return value / self.divisor if self.scale < 1 else value * self.scale
+
+    def to_signed(self, raw):
+        return raw - 0x10000 if self.signed and raw & 0x8000 else raw
+
+    def decode(self, raw):
+        # Engineering value: dict for bitfields, label for enums, number otherwise
+        if self.bitfields:
+            return {bitfield.name: raw >> bitfield.bit & bitfield.mask for bitfield in self.bitfields}
+        if self.enum is not None:
+            return self.enum.get(raw)
+        value = self.to_signed(raw)
+        return self.scaled(value) if self.scale != 1 else value
+
+    def encode(self, value):
+        raw = int(round(value * self.divisor if self.scale < 1 else value / self.scale))
+        if not (-0x8000 if self.signed else 0) <= raw <= (0x7FFF if self.signed else 0xFFFF):
+            raise ValueError(f"P{self.param:03d}: {value} {self.unit} out of range")
+        return raw & 0xFFFF
+
+    def format(self, raw, unit=True):
+        value = self.decode(raw)
+        if self.bitfields:
+            return " ".join(f"{name}={bit}" for name, bit in value.items())
+        if self.enum is not None:
+            return str(raw) if value is None else f"{raw} {getattr(value, 'code', value)}"
+        return f"{value:g} {self.unit}".rstrip() if unit else f"{value:g}"
+
+
+REGISTERS = {register.param: register for register in (
+    Register(102, "set_frequency_command", 0.01, "Hz", writable=True, feedback=181),
+    Register(103, "control", bitfields=(Bitfield("run", 0), Bitfield("reverse", 1)), writable=True, ttl=0.5),
+    Register(180, "running_status", bitfields=(Bitfield("run_state", 0, 3), Bitfield("reverse", 4)), ttl=0.1),
+    Register(181, "set_frequency", 0.01, "Hz", ttl=1.0),
+    Register(182, "actual_frequency", 0.01, "Hz", ttl=0.1),
+    Register(183, "current", 0.1, "A", ttl=0.1),
+    Register(184, "voltage", 0.1, "V", ttl=0.1),
+    Register(185, "temperature", 1, "°C", ttl=1.0),
+    Register(186, "P186", ttl=1.0),  # unused pressure registers inside the status block
+    Register(187, "P187", ttl=1.0),
+    Register(188, "inputs", bitfields=tuple(Bitfield(f"X{i}", i) for i in range(4)), ttl=0.1),
+    Register(189, "fault", enum=faultcodes.fault_mapping, ttl=0.1),
+)}
+
+
+def register(param):
+    # Register definition, or a plain unscaled one for parameters not in the map
+    return REGISTERS.get(param) or Register(param, f"P{param:03d}")
+
+
+def decode(param, raw):
+    return register(param).decode(raw)
+
+
+def decode_block(first_param, words):
+    # {name: value} for a block of consecutive raw words (e.g. one 0x03 read)
+    values = {}
+    for param, raw in enumerate(words, first_param):
+        reg = register(param)
+        decoded = reg.decode(raw)
+        if reg.bitfields:
+            values.update((f"{reg.name}.{name}", bit) for name, bit in decoded.items())
+        else:
+            values[reg.name] = decoded
+    return values
+
+
+def decode_series(first_param, words):
+    # words: [n, count] raw samples (NumPy uint16 array or list of rows).
+    # Returns {name: column}; scaled columns are float64 arrays, bitfields
+    # and enum registers stay integer codes. Without NumPy, lists are returned.
+    try:
+        import numpy as np
+    except ImportError:
+        np = None
+
+    if np is not None:
+        words = np.asarray(words, dtype=np.uint16)
+        if words.ndim == 1:
+            words = words.reshape(-1, 1)
+        columns = {}
+        for i in range(words.shape[1]):
+            reg = register(first_param + i)
+            raw = words[:, i]
+            if reg.bitfields:
+                for bitfield in reg.bitfields:
+                    columns[f"{reg.name}.{bitfield.name}"] = (raw >> bitfield.bit) & bitfield.mask
+            elif reg.enum is not None:
+                columns[reg.name] = raw.astype(np.int32)
+            else:
+                values = raw.view(np.int16) if reg.signed else raw
+                columns[reg.name] = reg.scaled(values.astype(np.float64))
+        return columns
+
+    rows = [list(row) for row in words]
+    count = len(rows[0]) if rows else 0
+    columns = {}
+    for i in range(count):
+        reg = register(first_param + i)
+        raw = [row[i] for row in rows]
+        if reg.bitfields:
+            for bitfield in reg.bitfields:
+                columns[f"{reg.name}.{bitfield.name}"] = [x >> bitfield.bit & bitfield.mask for x in raw]
+        elif reg.enum is not None:
+            columns[reg.name] = raw
+        else:
+            columns[reg.name] = [reg.scaled(reg.to_signed(x)) for x in raw]
+    return columns
@@ -0,0 +1,164 @@
+#
+# Saved connection profiles and the last known state of the drives.
+#
+# profiles.json holds one ConnectionProfile per site or drive group (port,
+# serial settings, slave address, the drives to poll, auto-connect) and the
+# name of the profile used last. snapshots.json keeps the latest raw
+# P180-P189 words per profile and slave, so the GUI can fill in the status
+# fields at startup before the first poll has answered.
+#
+# Both are small JSON files in the user's configuration directory
+# (VFD_COMMANDER_HOME overrides it), replaced atomically when written.
+#
+
+import json
+import os
+import sys
+import time
+from dataclasses import dataclass, field, asdict, fields
+
+PROFILES_FORMAT = "vfd-commander-profiles"
+# Reply delay allowed on top of the wire time. Generous: slow drives and
+# USB-RS485 adapters holding bytes for their latency timer need far more
+# than modbus_rtu.DEFAULT_TURNAROUND.
+PROFILE_TURNAROUND = 0.5
+SNAPSHOTS_FORMAT = "vfd-commander-snapshots"
+
+
+def config_dir():
+    if os.environ.get("VFD_COMMANDER_HOME"):
+        return os.environ["VFD_COMMANDER_HOME"]
+    if sys.platform == "win32":
+        return os.path.join(os.environ.get("APPDATA", os.path.expanduser("~")), "VFD_Commander")
+    return os.path.join(os.environ.get("XDG_CONFIG_HOME", os.path.expanduser("~/.config")), "vfd_commander")
+
+
+def _write_json(path, document):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    temporary = path + ".tmp"
+    with open(temporary, "w") as f:
+        json.dump(document, f, indent=2)
+    os.replace(temporary, path)
+
+
+def _read_json(path, format_name):
+    # Document or None when missing or unreadable; a broken file must not
+    # keep the application from starting
+    try:
+        with open(path) as f:
+            document = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if not isinstance(document, dict) or document.get("format") != format_name:
+        return None
+    return document
+
+
+@dataclass
+class ConnectionProfile:
+    name: str
+    port: str = "COM15" if sys.platform == "win32" else "/dev/ttyUSB0"
+    baudrate: int = 9600
+    stop_bits: str = "1"
+    slave_address: int = 8
+    parameter: int = 102                        # parameter shown in the manual send panel
+    drives: list = field(default_factory=list)  # further slave addresses polled on this bus
+    autoconnect: bool = False
+    poll: bool = False                          # start continuous polling after connecting
+    turnaround: float = PROFILE_TURNAROUND      # seconds, see PROFILE_TURNAROUND
+
+    @classmethod
+    def from_dict(cls, document):
+        known = {f.name for f in fields(cls)}
+        return cls(**{key: value for key, value in document.items() if key in known})
+
+
+class ProfileStore:
+    def __init__(self, path=None):
+        self.path = path or os.path.join(config_dir(), "profiles.json")
+        self.profiles = {}
+        self.last = None  # name of the profile used last
+        self.load()
+
+    def load(self):
+        document = _read_json(self.path, PROFILES_FORMAT) or {}
+        self.profiles = {}
+        for entry in document.get("profiles", []):
+            try:
+                profile = ConnectionProfile.from_dict(entry)
+            except TypeError:
+                continue  # entry without a name
+            self.profiles[profile.name] = profile
+        self.last = document.get("last")
+
+    def save(self):
+        _write_json(self.path, {
+            "format": PROFILES_FORMAT,
+            "last": self.last,
+            "profiles": [asdict(profile) for profile in self.profiles.values()],
+        })
+
+    def names(self):
+        return sorted(self.profiles)
+
+    def get(self, name):
+        return self.profiles.get(name)
+
+    def last_profile(self):
+        return self.profiles.get(self.last)
+
+    def put(self, profile, make_last=True):
+        self.profiles[profile.name] = profile
+        if make_last:
+            self.last = profile.name
+        self.save()
+
+    def delete(self, name):
+        self.profiles.pop(name, None)
+        if self.last == name:
+            self.last = None
+        self.save()
+
+    def use(self, name):
+        if name in self.profiles and self.last != name:
+            self.last = name
+            self.save()
+
+
+class SnapshotCache:
+    # Last known raw words per (profile, slave address)
+
+    def __init__(self, path=None):
+        self.path = path or os.path.join(config_dir(), "snapshots.json")
+        document = _read_json(self.path, SNAPSHOTS_FORMAT) or {}
+        self._entries = document.get("snapshots", {})
+
+    @staticmethod
+    def _key(profile_name, slave_address):
+        return f"{profile_name}/{slave_address}"
+
+    def get(self, profile_name, slave_address):
+        # ({param: word}, timestamp) or None
+        entry = self._entries.get(self._key(profile_name, slave_address))
+        if not entry:
+            return None
+        return {int(param): word for param, word in entry["words"].items()}, entry["timestamp"]
+
+    def put(self, profile_name, slave_address, words, timestamp=None):
+        self._entries[self._key(profile_name, slave_address)] = {
+            "timestamp": time.time() if timestamp is None else timestamp,
+            "words": {str(param): word for param, word in sorted(words.items())},
+        }
+
+    def save(self):
+        _write_json(self.path, {"format": SNAPSHOTS_FORMAT, "snapshots": self._entries})
+
+    def restore(self, profile_name, slave_address, store):
+        # Publish the cached words into a TelemetryStore with their original
+        # timestamp; returns the timestamp or None when nothing was cached
+        cached = self.get(profile_name, slave_address)
+        if cached is None:
+            return None
+        words, timestamp = cached
+        store.update(words, timestamp)
+        return timestamp
@@ -0,0 +1,159 @@
+#
+# Background telemetry polling.
+#
+# TelemetryPoller samples groups of parameters at their own rate through the
+# bus worker and publishes the raw words into each drive's TelemetryStore.
+# The UI only reads the stores, it never generates bus traffic for display
+# updates.
+#
+
+import threading
+import time
+
+import drive
+from bus_worker import PRIORITY_POLL
+
+MAX_BACKOFF = 32  # poll periods are stretched by at most this factor
+
+
+class TelemetryStore:
+    # Thread safe latest value (raw word) and sample time per parameter
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._values = {}
+        self._listeners = []
+        self.version = 0  # incremented on every update, cheap change check for the UI
+        self.listener_errors = 0
+        self.on_listener_error = None  # callback(listener, error), called on the updating thread
+
+    def update(self, values, timestamp=None):
+        timestamp = time.time() if timestamp is None else timestamp
+        with self._lock:
+            for param, word in values.items():
+                self._values[param] = (word, timestamp)
+            self.version += 1
+            listeners = list(self._listeners)
+        # A failing consumer (closed recorder, plot, fault callback) must not
+        # take down the poller thread or the listeners after it
+        for listener in listeners:
+            try:
+                listener(values, timestamp)
+            except Exception as e:
+                self.listener_errors += 1
+                if self.on_listener_error:
+                    self.on_listener_error(listener, e)
+
+    def get(self, param, default=None):
+        with self._lock:
+            entry = self._values.get(param)
+        return default if entry is None else entry[0]
+
+    def get_with_time(self, param):
+        # (word, timestamp) or None
+        with self._lock:
+            return self._values.get(param)
+
+    def snapshot(self):
+        with self._lock:
+            return {param: word for param, (word, _) in self._values.items()}
+
+    def status_snapshot(self):
+        # drive.StatusSnapshot assembled from the latest P180-P189 values
+        with self._lock:
+            entries = {param: self._values[param] for param in drive.STATUS_PARAMS if param in self._values}
+        if not entries:
+            return None
+        timestamp = max(t for _, t in entries.values())
+        return drive.StatusSnapshot.from_params({p: word for p, (word, _) in entries.items()}, timestamp)
+
+    def add_listener(self, listener):
+        # listener(values, timestamp) is called on the updating thread
+        with self._lock:
+            self._listeners.append(listener)
+
+    def remove_listener(self, listener):
+        with self._lock:
+            self._listeners.remove(listener)
+
+
+class PollGroup:
+    def __init__(self, params, rate_hz):
+        self.params = tuple(params)
+        self.rate_hz = rate_hz
+        self.next_due = 0.0
+
+    @property
+    def period(self):
+        return 1.0 / self.rate_hz
+
+
+def default_poll_groups(rate_hz=10.0):
+    # The whole P180-P189 block in one request: leaving out the temperature
+    # (P185) would split it in two reads, so it is polled at the same rate
+    return [
+        PollGroup(drive.STATUS_PARAMS, rate_hz),
+    ]
+
+
+class TelemetryPoller(threading.Thread):
+    # Polls every enabled drive of a drive_registry.DriveRegistry. Drives are
+    # served round-robin, one transaction each, so a busy or unresponsive
+    # drive cannot starve the others on the shared bus.
+
+    def __init__(self, worker, registry, max_count=drive.MAX_READ_COUNT):
+        super().__init__(name="telemetry-poller", daemon=True)
+        self.worker = worker
+        self.registry = registry
+        self.max_count = max_count
+        self._stop_event = threading.Event()
+        self._next_index = 0
+
+    def poll_once(self, vfd, groups):
+        params = sorted({param for group in groups for param in group.params})
+        start = time.monotonic()
+        future = self.worker.submit(drive.read_params, vfd.slave_address, params, self.max_count, priority=PRIORITY_POLL)
+        try:
+            values = future.result()
+        except Exception as e:
+            vfd.record_error(e)
+            if not self.worker.is_alive():
+                self._stop_event.set()  # worker stopped underneath us
+            return False
+
+        vfd.record_success(time.monotonic() - start)
+        vfd.store.update(values)
+        return True
+
+    def _next_drive(self, drives, now):
+        # First drive with due work, starting after the one served last
+        for offset in range(len(drives)):
+            index = (self._next_index + offset) % len(drives)
+            vfd = drives[index]
+            due = vfd.due_groups(now)
+            if due:
+                self._next_index = index + 1
+                return vfd, due
+        return None, None
+
+    def run(self):
+        while not self._stop_event.is_set():
+            drives = [vfd for vfd in self.registry.drives() if vfd.enabled]
+            if not drives:
+                self._stop_event.wait(0.1)
+                continue
+
+            now = time.monotonic()
+            vfd, due = self._next_drive(drives, now)
+            if vfd is None:
+                wait = min(vfd.next_due() for vfd in drives) - now
+                self._stop_event.wait(min(wait, 0.1))  # re-check the registry regularly
+                continue
+
+            self.poll_once(vfd, due)
+            vfd.reschedule(due, time.monotonic())
+
+    def stop(self, timeout=None):
+        self._stop_event.set()
+        if self.is_alive() and threading.current_thread() is not self:
+            self.join(timeout)
@@ -0,0 +1,206 @@
+#
+# Binary telemetry recorder.
+#
+# Samples are fixed-size records (float64 unix time + raw register words)
+# written into a preallocated, memory-mapped ring file, so recording at full
+# bus speed for hours costs a struct.pack_into per sample and no file growth.
+# When the ring is full the oldest records are overwritten.
+#
+# File layout (little endian):
+#   header  : magic, version, first_param, word_count, capacity, records_written
+#   records : capacity * (timestamp, word_count * uint16)
+#
+
+import csv
+import datetime
+import mmap
+import struct
+import threading
+import time
+
+import drive
+import register_map
+
+MAGIC = b"VFDREC1\0"
+VERSION = 1
+HEADER = struct.Struct("<8sIIIIQ")
+HEADER_SIZE = 64  # header is padded so records start aligned
+
+# P182 actual frequency, P183 current, P184 voltage, P185 temperature
+DEFAULT_FIRST_PARAM = drive.P_ACTUAL_FREQUENCY
+DEFAULT_WORD_COUNT = 4
+DEFAULT_CAPACITY = 3600 * 20 * 4  # 4 hours at 20 samples/s
+
+
+def _record_struct(word_count):
+    return struct.Struct(f"<d{word_count}H")
+
+
+class TelemetryRecorder:
+    def __init__(self, path, capacity=DEFAULT_CAPACITY, first_param=DEFAULT_FIRST_PARAM, word_count=DEFAULT_WORD_COUNT):
+        self.path = path
+        self.first_param = first_param
+        self.word_count = word_count
+        self.capacity = capacity
+        self._record = _record_struct(word_count)
+        self._params = range(first_param, first_param + word_count)
+        self._last_words = [0] * word_count
+        self._lock = threading.Lock()
+        self._store = None
+
+        size = HEADER_SIZE + capacity * self._record.size
+        with open(path, "wb") as f:
+            f.truncate(size)  # preallocate (sparse where supported)
+        self._file = open(path, "r+b")
+        self._mm = mmap.mmap(self._file.fileno(), size)
+        self.records_written = 0
+        self._write_header()
+
+    def _write_header(self):
+        HEADER.pack_into(self._mm, 0, MAGIC, VERSION, self.first_param, self.word_count, self.capacity, self.records_written)
+
+    def append(self, timestamp, words):
+        with self._lock:
+            offset = HEADER_SIZE + (self.records_written % self.capacity) * self._record.size
+            self._record.pack_into(self._mm, offset, timestamp, *words)
+            self.records_written += 1
+            # Only the counter changes in the header
+            struct.pack_into("<Q", self._mm, HEADER.size - 8, self.records_written)
+
+    def _on_store_update(self, values, timestamp):
+        # Keep the last value of slower polled registers, record whenever one of ours changed
+        last = self._last_words
+        recorded = False
+        for i, param in enumerate(self._params):
+            word = values.get(param)
+            if word is not None:
+                last[i] = word
+                recorded = True
+        if recorded:
+            self.append(timestamp, last)
+
+    def attach(self, store):
+        # Record every update of a telemetry.TelemetryStore
+        for i, param in enumerate(self._params):
+            self._last_words[i] = store.get(param, 0)
+        self._store = store
+        store.add_listener(self._on_store_update)
+
+    def close(self):
+        if self._store is not None:
+            self._store.remove_listener(self._on_store_update)
+            self._store = None
+        with self._lock:
+            self._mm.flush()
+            self._mm.close()
+            self._file.close()
+
+
+class TelemetryRecording:
+    # Read access to a recorder file (also while it is being written)
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, "rb") as f:
+            magic, version, self.first_param, self.word_count, self.capacity, _ = HEADER.unpack(f.read(HEADER.size))
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"{path} is not a telemetry recording")
+        self._record = _record_struct(self.word_count)
+        self.params = tuple(range(self.first_param, self.first_param + self.word_count))
+
+    def _map(self):
+        with open(self.path, "rb") as f:
+            return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    @staticmethod
+    def _order(records_written, capacity):
+        # Chronological (first record index, count) of the ring contents
+        count = min(records_written, capacity)
+        return records_written % capacity if records_written > capacity else 0, count
+
+    def iter_records(self, start=None, end=None):
+        # (timestamp, words) tuples in time order, optionally limited to [start, end]
+        mm = self._map()
+        try:
+            records_written = struct.unpack_from("<Q", mm, HEADER.size - 8)[0]
+            first, count = self._order(records_written, self.capacity)
+            size = self._record.size
+            for i in range(count):
+                offset = HEADER_SIZE + ((first + i) % self.capacity) * size
+                timestamp, *words = self._record.unpack_from(mm, offset)
+                if start is not None and timestamp < start:
+                    continue
+                if end is not None and timestamp > end:
+                    break
+                yield timestamp, words
+        finally:
+            mm.close()
+
+    def read_arrays(self, start=None, end=None, decoded=False):
+        # NumPy (timestamps float64[n], words uint16[n, word_count]) for a time range.
+        # With decoded=True the words are returned as {name: column} in
+        # engineering units (register_map.decode_series).
+        try:
+            import numpy as np
+        except ImportError:
+            raise ImportError("numpy is required for read_arrays(), use iter_records() instead") from None
+
+        with open(self.path, "rb") as f:
+            records_written = struct.unpack_from("<Q", f.read(HEADER.size), HEADER.size - 8)[0]
+        selected = self._select(records_written, start, end)
+        words = np.ascontiguousarray(selected["words"])
+        return np.ascontiguousarray(selected["timestamp"]), register_map.decode_series(self.first_param, words) if decoded else words
+
+    def _select(self, records_written, start, end):
+        # Records in [start, end] in time order, copied out of the mapped file.
+        # Only the searched timestamps and the selected records are paged in.
+        import numpy as np
+
+        dtype = np.dtype([("timestamp", "<f8"), ("words", "<u2", (self.word_count,))])
+        first, count = self._order(records_written, self.capacity)
+        records = np.memmap(self.path, dtype=dtype, mode="r", offset=HEADER_SIZE, shape=(self.capacity,))
+        segments = [records[first:count], records[:first]] if records_written > self.capacity else [records[:count]]
+        selected = []
+        for segment in segments:  # each one in time order
+            timestamps = segment["timestamp"]
+            lo = 0 if start is None else np.searchsorted(timestamps, start, side="left")
+            hi = len(timestamps) if end is None else np.searchsorted(timestamps, end, side="right")
+            selected.append(segment[lo:hi])
+        return np.concatenate(selected)
+
+    def export_csv(self, csv_path, start=None, end=None):
+        with open(csv_path, "w", newline="") as f:
+            writer = csv.writer(f)
+            # raw words followed by the decoded values with their units
+            registers = [register_map.register(param) for param in self.params]
+            columns = [f"{reg.name} [{reg.unit}]" if reg.unit else reg.name for reg in registers]
+            writer.writerow(["timestamp", "time"] + [f"P{param}" for param in self.params] + columns)
+            rows = 0
+            for timestamp, words in self.iter_records(start, end):
+                writer.writerow(
+                    [f"{timestamp:.3f}", datetime.datetime.fromtimestamp(timestamp).isoformat(timespec="milliseconds")]
+                    + words
+                    + [reg.format(word, unit=False) for reg, word in zip(registers, words)]
+                )
+                rows += 1
+        return rows
+
+    def replay(self, store, speed=1.0, stop_event=None, start=None, end=None):
+        # Feed the recording into a TelemetryStore with its original timing
+        # (scaled by speed) so the UI shows it like live data.
+        first_timestamp = None
+        started = time.monotonic()
+        for timestamp, words in self.iter_records(start, end):
+            if first_timestamp is None:
+                first_timestamp = timestamp
+            delay = (timestamp - first_timestamp) / speed - (time.monotonic() - started)
+            if delay > 0:
+                if stop_event is not None:
+                    if stop_event.wait(delay):
+                        return
+                else:
+                    time.sleep(delay)
+            elif stop_event is not None and stop_event.is_set():
+                return
+            store.update(dict(zip(self.params, words)), timestamp)
+
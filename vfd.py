@@ -0,0 +1,406 @@
+#
+# Headless command line interface, no Tk required.
+#
+#   python vfd.py --port /dev/ttyUSB0 read P180..P189
+#   python vfd.py set P102 2500
+#   python vfd.py watch --rate 2
+#   python vfd.py serve --listen 0.0.0.0:5020
+#
+# Connection defaults come from VFD_PORT, VFD_BAUD and VFD_SLAVE (hex, like
+# the GUI's slave address field), or from a connection profile saved in the
+# GUI with --profile NAME (env VFD_PROFILE). --simulate talks to vfd_sim
+# instead of a serial port.
+#
+
+import argparse
+import os
+import sys
+import time
+
+import drive
+import register_map
+from modbus_rtu import ModbusRTU, ModbusError, MAX_RETRIES, DEFAULT_TURNAROUND, FunctionSupport, write_values, read_write_values
+
+DEFAULT_PORT = "COM15" if sys.platform == "win32" else "/dev/ttyUSB0"
+
+
+def parse_param(text):
+    # "P102", "p102" or "102"
+    try:
+        return int(text.strip().lstrip("Pp"), 10)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid parameter {text!r}, expected e.g. P102") from None
+
+
+def parse_params(text):
+    # "P180..P189", "P180-P189", "P102,P103" or "P180"
+    params = []
+    for part in text.split(","):
+        for separator in ("..", "-"):
+            if separator in part:
+                first, last = part.split(separator, 1)
+                params.extend(range(parse_param(first), parse_param(last) + 1))
+                break
+        else:
+            params.append(parse_param(part))
+    return params
+
+
+def parse_value(text):
+    # Register word: "2500", "010" (decimal) or "0x09C4"
+    try:
+        value = int(text, 10)
+    except ValueError:
+        try:
+            value = int(text, 0)
+        except ValueError:
+            raise argparse.ArgumentTypeError(f"invalid value {text!r}, expected a number like 2500 or 0x09C4") from None
+    if not 0 <= value <= 0xFFFF:
+        raise argparse.ArgumentTypeError(f"value {text!r} out of range 0-65535")
+    return value
+
+
+def parse_slave(text):
+    # Hex, like the GUI's slave address field
+    try:
+        return int(text, 16)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid slave address {text!r}, expected hex e.g. 8 or 0A") from None
+
+
+def open_link(args):
+    if args.simulate:
+        from vfd_sim import SimulatedBus, SimulatedVFD, LoopbackPort
+
+        port = LoopbackPort(SimulatedBus([SimulatedVFD(args.slave, ramp_time=5.0)]), timeout=args.timeout)
+        return ModbusRTU(port, baudrate=args.baud, robust=args.retries > 0, retries=args.retries, turnaround=args.turnaround)
+
+    import serial
+
+    port = serial.Serial(args.port, baudrate=args.baud, stopbits=args.stop_bits, timeout=args.timeout)
+    return ModbusRTU(port, robust=args.retries > 0, retries=args.retries, turnaround=args.turnaround)
+
+
+def format_status(snapshot):
+    return (
+        f"{'RUN' if snapshot.running else 'STOP'} {'REV' if snapshot.reverse else 'FWD'}  "
+        f"set {snapshot.set_frequency:6.2f} Hz  actual {snapshot.actual_frequency:6.2f} Hz  "
+        f"{snapshot.current:5.1f} A  {snapshot.voltage:5.1f} V  {snapshot.temperature:4.0f} °C  "
+        f"X0-X3 {''.join(str(x) for x in snapshot.inputs)}  fault {snapshot.fault}"
+    )
+
+
+def command_read(link, args):
+    values = drive.read_params(link, args.slave, args.params, max_count=args.max_count)
+    for param, word in values.items():
+        reg = register_map.register(param)
+        decoded = f"  {reg.name} {reg.format(word)}" if reg.unit or reg.bitfields or reg.enum is not None else ""
+        print(f"P{param:03d} = {word} (0x{word:04X}){decoded}")
+
+
+def command_set(link, args):
+    # Several values go to consecutive parameters in one 0x10 request (0x17
+    # with --read-back), or as 0x06 writes when the drive lacks the function
+    param, values = args.param, args.values
+    support = FunctionSupport()
+    if args.read_back:
+        words, sent = read_write_values(link, args.slave, drive.param_address(param), len(values), drive.param_address(param), values, support)
+    else:
+        words, sent = None, write_values(link, args.slave, drive.param_address(param), values, support)
+    for offset, value in enumerate(values):
+        print(f"P{param + offset:03d} <- {value}" + (f"  (read back {words[offset]})" if words else ""))
+    if len(values) > 1 or args.read_back:
+        print(f"{len(sent)} request(s): {' '.join(f'0x{fc:02X}' for fc in sent)}")
+
+
+def command_status(link, args):
+    print(format_status(drive.read_status_snapshot(link, args.slave, max_count=args.max_count)))
+
+
+def command_watch(link, args):
+    period = 1.0 / args.rate
+    next_time = time.monotonic()
+    samples = 0
+    while args.count is None or samples < args.count:
+        try:
+            snapshot = drive.read_status_snapshot(link, args.slave, max_count=args.max_count)
+            print(time.strftime("%H:%M:%S"), format_status(snapshot), flush=True)
+        except ModbusError as e:
+            print(time.strftime("%H:%M:%S"), f"error: {e}", file=sys.stderr, flush=True)
+        samples += 1
+        next_time += period
+        time.sleep(max(0.0, next_time - time.monotonic()))
+
+
+def command_run(link, args):
+    control = {"fwd": drive.CONTROL_FWD, "rev": drive.CONTROL_REV, "stop": drive.CONTROL_STOP}[args.direction]
+    link.write_register(args.slave, drive.param_address(drive.P_CONTROL), control)
+    print(f"P{drive.P_CONTROL} <- {control:04b} ({args.direction.upper()})")
+
+
+def command_backup(link, args):
+    import param_backup
+
+    values, missing = param_backup.backup(link, args.slave, args.file, max_count=args.max_count)
+    print(f"saved {len(values)} parameters to {args.file}")
+    if missing:
+        print("not readable: " + ", ".join(f"P{p:03d}" for p in missing), file=sys.stderr)
+
+
+def command_restore(link, args):
+    import param_backup
+
+    result = param_backup.restore(link, args.slave, param_backup.load_backup(args.file), max_count=args.max_count)
+    for param, (old, new) in result.changes.items():
+        print(f"P{param:03d}: {old} -> {new}")
+    print(f"{len(result.changes)} changed, {result.requests} write requests")
+    for param, error in result.failed.items():
+        print(f"P{param:03d} write failed: {error}", file=sys.stderr)
+    for param, (read_back, wanted) in result.mismatches.items():
+        print(f"P{param:03d} verify failed: read {read_back}, expected {wanted}", file=sys.stderr)
+    return 0 if result.ok else 1
+
+
+def command_serve(link, args):
+    import asyncio
+    from bus_worker import BusWorker
+    from modbus_tcp_gateway import ModbusTCPGateway, caching_link
+
+    host, _, port = args.listen.rpartition(":")
+    worker = BusWorker(caching_link(link, args.ttl))
+    worker.start()
+    gateway = ModbusTCPGateway(worker, host or "0.0.0.0", int(port), default_slave=args.slave)
+    print(f"Modbus TCP gateway on {gateway.host}:{gateway.port}, cache TTL {args.ttl} s", flush=True)
+    try:
+        asyncio.run(gateway.serve_forever())
+    finally:
+        worker.stop(timeout=2)
+        print(f"{gateway.requests} requests, {gateway.bus_reads} bus reads, {gateway.merged_reads} merged reads, "
+              f"{gateway.bus_writes} writes, cache hit rate {gateway.hit_rate:.0%}")
+
+
+def command_discover(link, args):
+    import discovery
+
+    ports = args.ports or discovery.list_port_names()
+    baudrates = args.bauds or discovery.COMMON_BAUDRATES
+    print(f"Scanning {', '.join(ports) or 'no ports'} at {', '.join(map(str, baudrates))} baud", flush=True)
+    start = time.monotonic()
+    found = discovery.discover(
+        ports, baudrates=baudrates, stop_at_first_baudrate=not args.all_bauds,
+        on_found=lambda d: print(d.describe(), flush=True),
+        on_error=lambda port, error: print(f"{port}: {error}", file=sys.stderr, flush=True),
+    )
+    print(f"{len(found)} drive(s) found in {time.monotonic() - start:.1f} s")
+    return 0 if found else 1
+
+
+def parse_bus(text, default_baudrate):
+    # "COM3:9600:1-4,8" -> (port, baud rate, [slave addresses]); the baud rate may be left out
+    from drive_registry import parse_slave_addresses
+
+    parts = text.split(":")
+    if len(parts) == 2:
+        (port, slaves), baud = parts, None
+    elif len(parts) == 3:
+        port, baud, slaves = parts
+    else:
+        raise SystemExit(f"error: {text}: expected PORT[:BAUD]:SLAVES, e.g. COM3:9600:1-4")
+    return port, int(baud) if baud else default_baudrate, parse_slave_addresses(slaves)
+
+
+def command_supervise(link, args):
+    # Poll drives on several adapters in parallel, print the merged status
+    from bus_supervisor import BusSupervisor
+
+    supervisor = BusSupervisor()
+    supervisor.on_error = lambda port, error: print(f"{port}: {error}", file=sys.stderr, flush=True)
+    for text in args.buses:
+        port, baudrate, slaves = parse_bus(text, args.baud)
+        supervisor.add_port(port, baudrate, slaves, poll_rate_hz=args.rate)
+    if not any(bus.running for bus in supervisor.buses.values()):
+        return 1
+    try:
+        while True:
+            time.sleep(args.interval)
+            for bus, vfd in supervisor.drives():
+                snapshot = supervisor.status_snapshot(bus.port_name, vfd.slave_address)
+                state = format_status(snapshot) if snapshot else "no data" if bus.running else f"not running: {bus.error}"
+                print(time.strftime("%H:%M:%S"), f"{vfd.name:>16}", state, flush=True)
+            print(f"{supervisor.transaction_rate():.1f} transactions/s over {len(supervisor.buses)} bus(es)", flush=True)
+    finally:
+        supervisor.stop()
+
+
+def command_profile(link, args):
+    import motion_profile
+    from telemetry import TelemetryStore
+
+    commands, duration = motion_profile.compile_timeline(motion_profile.load_profile(args.file))
+    store = TelemetryStore()
+    if args.verbose:
+        store.add_listener(lambda values, timestamp: print(time.strftime("%H:%M:%S"), format_status(store.status_snapshot()), flush=True))
+
+    def on_command(record):
+        late = f" (+{record.jitter * 1000:.1f} ms)" if record.jitter > 0.001 else ""
+        error = f"  error: {record.error}" if record.error else ""
+        print(f"{record.command.offset:8.2f} s  {record.command.label}{late}{error}", flush=True)
+
+    runner = motion_profile.ProfileRunner(link, args.slave, commands, store=store, sample_rate_hz=args.sample_rate, on_command=on_command,
+                                          duration=duration)
+    print(f"{len(commands)} commands over {runner.duration:.1f} s", flush=True)
+    runner.start()
+    try:
+        while runner.is_alive():
+            runner.join(0.2)
+    except KeyboardInterrupt:
+        runner.stop(timeout=5)
+        print("aborted, drive stopped", file=sys.stderr)
+
+    summary = runner.jitter_summary()
+    if summary["commands"]:
+        print(f"jitter mean {summary['mean'] * 1000:.2f} ms  p99 {summary['p99'] * 1000:.2f} ms  max {summary['max'] * 1000:.2f} ms, "
+              f"write latency {summary['write_latency_mean'] * 1000:.1f} ms, {runner.samples} telemetry samples, {summary['errors']} errors")
+    if args.jitter_csv:
+        runner.save_jitter_csv(args.jitter_csv)
+    return 1 if runner.aborted or summary.get("errors") else 0
+
+
+def command_ports(link, args):
+    import serial.tools.list_ports
+
+    for port in serial.tools.list_ports.comports():
+        print(f"{port.device}\t{port.description}")
+
+
+def load_connection_profile(argv):
+    # ConnectionProfile named by --profile or VFD_PROFILE, None without one
+    pre = argparse.ArgumentParser(add_help=False)
+    pre.add_argument("--profile", default=os.environ.get("VFD_PROFILE"))
+    name = pre.parse_known_args(argv)[0].profile
+    if not name:
+        return None
+    from session_config import ProfileStore
+
+    store = ProfileStore()
+    profile = store.get(name)
+    if profile is None:
+        raise SystemExit(f"error: no profile {name!r} in {store.path} (saved: {', '.join(store.names()) or 'none'})")
+    return profile
+
+
+def build_parser(profile=None):
+    # A profile replaces the environment defaults; options still win
+    if profile is not None:
+        port, baud, stop_bits, slave = profile.port, profile.baudrate, float(profile.stop_bits), f"{profile.slave_address:X}"
+        turnaround = profile.turnaround
+    else:
+        port, baud, stop_bits = os.environ.get("VFD_PORT", DEFAULT_PORT), int(os.environ.get("VFD_BAUD", 9600)), 1
+        slave = os.environ.get("VFD_SLAVE", "8")
+        turnaround = DEFAULT_TURNAROUND
+    parser = argparse.ArgumentParser(prog="vfd", description="VFD Commander command line interface")
+    parser.add_argument("--profile", help="use the port, baud rate and slave of a profile saved in the GUI (env VFD_PROFILE)")
+    parser.add_argument("--port", default=port, help="serial port (env VFD_PORT)")
+    parser.add_argument("--baud", type=int, default=baud, help="baud rate (env VFD_BAUD)")
+    parser.add_argument("--stop-bits", type=float, default=stop_bits, choices=(1, 1.5, 2))
+    parser.add_argument("--slave", type=parse_slave, default=slave, help="slave address in hex (env VFD_SLAVE)")
+    parser.add_argument("--timeout", type=float, default=1.0, help="response timeout in seconds with --retries 0, otherwise derived from the baud rate")
+    parser.add_argument("--retries", type=int, default=MAX_RETRIES, help="read retries on a noisy line, 0 = plain transport")
+    parser.add_argument("--turnaround", type=float, default=turnaround,
+                        help="seconds the drive may take to start its reply with --retries > 0")
+    parser.add_argument("--max-count", type=int, default=drive.MAX_READ_COUNT, help="largest block read the drive accepts")
+    parser.add_argument("--simulate", action="store_true", help="use the simulated VFD instead of a serial port")
+    parser.add_argument("--metrics-file", help="keep writing bus statistics to this file (JSON for *.json, else Prometheus text)")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    p = commands.add_parser("read", help="read parameters, e.g. P180..P189")
+    p.add_argument("params", type=parse_params)
+    p.set_defaults(handler=command_read)
+
+    p = commands.add_parser("set", help="write parameters, e.g. P102 2500, or P102 2500 1 for P102 and P103")
+    p.add_argument("param", type=parse_param)
+    p.add_argument("values", nargs="+", type=parse_value, metavar="value")
+    p.add_argument("--read-back", action="store_true", help="read the written parameters back in the same transaction (0x17)")
+    p.set_defaults(handler=command_set)
+
+    p = commands.add_parser("status", help="read and decode P180-P189 once")
+    p.set_defaults(handler=command_status)
+
+    p = commands.add_parser("watch", help="print the decoded status continuously")
+    p.add_argument("--rate", type=float, default=1.0, help="samples per second")
+    p.add_argument("--count", type=int, help="stop after this many samples")
+    p.set_defaults(handler=command_watch)
+
+    p = commands.add_parser("run", help="start or stop the drive (P103)")
+    p.add_argument("direction", choices=("fwd", "rev", "stop"))
+    p.set_defaults(handler=command_run)
+
+    p = commands.add_parser("backup", help="save P000-P189 to a JSON file")
+    p.add_argument("file")
+    p.set_defaults(handler=command_backup)
+
+    p = commands.add_parser("restore", help="write the parameters that differ from a backup")
+    p.add_argument("file")
+    p.set_defaults(handler=command_restore)
+
+    p = commands.add_parser("serve", help="share the serial link with Modbus TCP clients")
+    p.add_argument("--listen", default="0.0.0.0:502", help="host:port to listen on")
+    p.add_argument("--ttl", type=float, default=0.2, help="seconds a read is served from the cache")
+    p.set_defaults(handler=command_serve)
+
+    p = commands.add_parser("profile", help="run a motion profile file (ramps, holds, direction changes)")
+    p.add_argument("file")
+    p.add_argument("--sample-rate", type=float, default=5.0, help="telemetry samples per second between commands")
+    p.add_argument("--jitter-csv", help="save commanded vs achieved timing of every command")
+    p.add_argument("--verbose", "-v", action="store_true", help="print every telemetry sample")
+    p.set_defaults(handler=command_profile)
+
+    p = commands.add_parser("discover", help="scan ports for drives at all addresses and common baud rates")
+    p.add_argument("ports", nargs="*", help="ports to scan (default: all)")
+    p.add_argument("--baud", dest="bauds", type=int, action="append", help="baud rate to try, repeatable")
+    p.add_argument("--all-bauds", action="store_true", help="keep scanning other baud rates after drives were found")
+    p.set_defaults(handler=command_discover, no_link=True)
+
+    p = commands.add_parser("supervise", help="poll several adapters in parallel, e.g. COM3:9600:1-4 COM4:8")
+    p.add_argument("buses", nargs="+", metavar="PORT[:BAUD]:SLAVES", help="slave addresses in hex, e.g. 1-4,0A")
+    p.add_argument("--rate", type=float, default=2.0, help="polls per second per drive")
+    p.add_argument("--interval", type=float, default=1.0, help="seconds between printed status blocks")
+    p.set_defaults(handler=command_supervise, no_link=True)
+
+    p = commands.add_parser("ports", help="list serial ports")
+    p.set_defaults(handler=command_ports, no_link=True)
+    return parser
+
+
+def main(argv=None):
+    args = build_parser(load_connection_profile(argv)).parse_args(argv)
+    if getattr(args, "no_link", False):
+        return args.handler(None, args) or 0
+
+    link = open_link(args)
+    exporter = None
+    if args.metrics_file:
+        from bus_metrics import BusMetrics, MetricsExporter
+
+        metrics = BusMetrics(link.baudrate)
+        link.on_transaction = metrics.record
+        exporter = MetricsExporter(metrics, args.metrics_file)
+        exporter.on_error = lambda error: print(f"metrics export failed: {error}", file=sys.stderr, flush=True)
+        exporter.start()
+    try:
+        return args.handler(link, args) or 0
+    except ModbusError as e:
+        print(f"error: {e}", file=sys.stderr)
+        return 1
+    except KeyboardInterrupt:
+        return 130
+    finally:
+        if exporter:
+            exporter.stop(timeout=1)
+        close = getattr(link.port, "close", None)
+        if close:
+            close()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,344 @@
+#
+# Software stand-in for one or more VFDs on an RS485 bus.
+#
+# SimulatedBus answers Modbus RTU request frames like the real drives do.
+# It can be used in-process through LoopbackPort (a pyserial-like object for
+# ModbusRTU) or served on a pseudo terminal with PtyServer so that anything
+# opening a serial device (the GUI, the asyncio transport) can talk to it.
+# PtyServer needs a POSIX system.
+#
+# SimulatedVFD ramps the output frequency towards the setpoint (ramp_time
+# seconds for 0-50 Hz, 0 jumps straight to it) and can trip with any fault
+# of faultcodes.fault_mapping, on request or at random while running.
+#
+#   python vfd_sim.py --drives 8,9 --baud 9600 --ramp-time 5
+#
+
+import os
+import random
+import struct
+import threading
+import time
+
+import drive
+import faultcodes
+from modbus_rtu import append_crc, check_crc, char_time
+
+REGISTER_COUNT = 200  # P000..P199
+RAMP_REFERENCE = 5000  # ramp_time is the time for 0 to 50.00 Hz
+
+
+class SimulatedVFD:
+    def __init__(self, slave_address=8, multi_write=True, read_write=True, ramp_time=0.0, fault_probability=0.0, seed=None,
+                 clock=time.monotonic):
+        self.slave_address = slave_address
+        self.multi_write = multi_write  # answer 0x10 or reject it as an illegal function
+        self.read_write = read_write  # same for 0x17
+        self.ramp_time = ramp_time  # seconds for 0-50 Hz, 0 = no ramp
+        self.fault_probability = fault_probability  # chance per request to trip while running
+        self.clock = clock
+        self._random = random.Random(seed)
+        self.registers = [0] * REGISTER_COUNT
+        self.registers[drive.P_SET_FREQUENCY] = 1000  # 10 Hz
+        self.registers[drive.P_VOLTAGE] = 2200
+        self.registers[drive.P_TEMPERATURE] = 30
+        self.fault = 0  # code of faultcodes.fault_mapping while tripped
+        self._actual = 0.0  # output frequency, 0.01 Hz
+        self._last_update = clock()
+        self._update_feedback()
+
+    def read(self, param):
+        self._update_feedback()
+        return self.registers[param]
+
+    def write(self, param, value):
+        self._update_feedback()  # ramp up to now with the old setpoint
+        if param == drive.P_CONTROL and value == drive.CONTROL_STOP:
+            self.fault = 0  # STOP also resets a trip
+        self.registers[param] = value
+        self._update_feedback()
+
+    def inject_fault(self, code=None):
+        # Trip with code (random from fault_mapping when None); the output
+        # stops at once and run commands are ignored until STOP or clear_fault()
+        if code is None:
+            code = self._random.choice(sorted(faultcodes.fault_mapping))
+        elif code not in faultcodes.fault_mapping:
+            raise ValueError(f"Invalid fault number {code}")
+        self._update_feedback()
+        self.fault = code
+        self._actual = 0.0
+        self._update_feedback()
+
+    def clear_fault(self):
+        self.fault = 0
+        self._update_feedback()
+
+    @property
+    def running(self):
+        return bool(self.registers[drive.P_CONTROL] & 0b1) and not self.fault
+
+    def _update_feedback(self):
+        r = self.registers
+        now = self.clock()
+        elapsed, self._last_update = now - self._last_update, now
+        running = self.running
+        target = r[drive.P_SET_FREQUENCY] if running else 0
+        if not self.ramp_time:
+            self._actual = float(target)
+        elif self._actual < target:
+            self._actual = min(target, self._actual + RAMP_REFERENCE * elapsed / self.ramp_time)
+        elif self._actual > target:
+            self._actual = max(target, self._actual - RAMP_REFERENCE * elapsed / self.ramp_time)
+        ramping = round(self._actual) != target
+
+        control = r[drive.P_CONTROL]
+        r[drive.P_RUNNING_STATUS] = (0b111 if running else 0) | (0b10000 if control & 0b10 else 0)
+        r[drive.P_SET_FREQUENCY_FEEDBACK] = r[drive.P_SET_FREQUENCY]
+        r[drive.P_ACTUAL_FREQUENCY] = round(self._actual)
+        current = r[drive.P_ACTUAL_FREQUENCY] // 500  # 0.1 A per 5 Hz
+        r[drive.P_CURRENT] = current + current // 2 if ramping and running else current  # acceleration torque
+        r[drive.P_FAULT] = self.fault
+
+    def handle_pdu(self, function_code, body):
+        # Returns the response PDU (function code onwards, without address/CRC)
+        if self.fault_probability and self.running and self._random.random() < self.fault_probability:
+            self.inject_fault()
+        self._update_feedback()
+        if function_code == 0x03:
+            address, count = struct.unpack('>HH', body[:4])
+            param = address - drive.PARAMETER_OFFSET
+            if not 1 <= count <= 125:
+                return bytes([0x83, 3])
+            if param < 0 or param + count > REGISTER_COUNT:
+                return bytes([0x83, 2])
+            words = self.registers[param:param + count]
+            return bytes([0x03, 2 * count]) + struct.pack(f'>{count}H', *words)
+        if function_code == 0x06:
+            address, value = struct.unpack('>HH', body[:4])
+            param = address - drive.PARAMETER_OFFSET
+            if not 0 <= param < REGISTER_COUNT:
+                return bytes([0x86, 2])
+            self.write(param, value)
+            return bytes([0x06]) + body[:4]
+        if function_code == 0x10 and self.multi_write:
+            address, count, byte_count = struct.unpack('>HHB', body[:5])
+            param = address - drive.PARAMETER_OFFSET
+            if not 1 <= count <= 123 or byte_count != 2 * count:
+                return bytes([0x90, 3])
+            if param < 0 or param + count > REGISTER_COUNT:
+                return bytes([0x90, 2])
+            for offset, value in enumerate(struct.unpack(f'>{count}H', body[5:5 + byte_count])):
+                self.write(param + offset, value)
+            return bytes([0x10]) + body[:4]
+        if function_code == 0x17 and self.read_write:
+            read_address, read_count, write_address, count, byte_count = struct.unpack('>HHHHB', body[:9])
+            read_param = read_address - drive.PARAMETER_OFFSET
+            write_param = write_address - drive.PARAMETER_OFFSET
+            if not 1 <= read_count <= 125 or not 1 <= count <= 121 or byte_count != 2 * count:
+                return bytes([0x97, 3])
+            if not (0 <= read_param and read_param + read_count <= REGISTER_COUNT and 0 <= write_param and write_param + count <= REGISTER_COUNT):
+                return bytes([0x97, 2])
+            for offset, value in enumerate(struct.unpack(f'>{count}H', body[9:9 + byte_count])):
+                self.write(write_param + offset, value)
+            words = self.registers[read_param:read_param + read_count]
+            return bytes([0x17, 2 * read_count]) + struct.pack(f'>{read_count}H', *words)
+        return bytes([function_code | 0x80, 1])
+
+
+def request_length(buffer):
+    # Length of the request frame starting at buffer[0], None if more bytes are needed
+    if len(buffer) < 2:
+        return None
+    function_code = buffer[1]
+    if function_code in (0x0F, 0x10):
+        return 9 + buffer[6] if len(buffer) >= 7 else None
+    if function_code == 0x17:
+        return 13 + buffer[10] if len(buffer) >= 11 else None
+    return 8  # 0x01..0x06 and anything unknown
+
+
+class SimulatedBus:
+    # One or more simulated drives sharing a line
+
+    def __init__(self, vfds=None, response_delay=0.0, baudrate=None):
+        self.vfds = {}
+        for vfd in vfds if vfds is not None else [SimulatedVFD()]:
+            self.vfds[vfd.slave_address] = vfd
+        self.response_delay = response_delay  # drive processing time before answering
+        self.baudrate = baudrate  # when set, LoopbackPorts at another rate get no answers
+        self.requests = 0
+
+    def handle_frame(self, frame):
+        # Response frame or None when no drive answers (wrong address, bad CRC)
+        self.requests += 1
+        if len(frame) < 4 or not check_crc(frame):
+            return None
+        vfd = self.vfds.get(frame[0])
+        if vfd is None:
+            return None
+        if self.response_delay:
+            time.sleep(self.response_delay)
+        return append_crc(bytes([frame[0]]) + vfd.handle_pdu(frame[1], bytes(frame[2:-2])))
+
+
+class LineNoise:
+    # Disturbances of a noisy RS485 line, applied to each response:
+    #   corrupt  - probability that one bit of the frame is flipped
+    #   truncate - probability that the tail of the frame arrives late, only
+    #              after the master's read has already timed out
+    #   garbage  - probability of a stray byte in front of the frame
+
+    def __init__(self, corrupt=0.0, truncate=0.0, garbage=0.0, seed=None):
+        self.corrupt = corrupt
+        self.truncate = truncate
+        self.garbage = garbage
+        self._random = random.Random(seed)
+
+    def apply(self, frame):
+        # (bytes delivered now, bytes delivered late)
+        frame = bytearray(frame)
+        r = self._random
+        if r.random() < self.corrupt:
+            frame[r.randrange(len(frame))] ^= 1 << r.randrange(8)
+        if r.random() < self.garbage:
+            frame.insert(0, r.randrange(256))
+        if r.random() < self.truncate:
+            cut = r.randrange(1, len(frame))
+            return bytes(frame[:cut]), bytes(frame[cut:])
+        return bytes(frame), b""
+
+
+class LoopbackPort:
+    # pyserial-like port connected straight to a SimulatedBus. With baudrate
+    # set, writes and reads take as long as they would on the wire; noise
+    # (a LineNoise) disturbs the responses.
+
+    def __init__(self, bus, baudrate=None, timeout=1.0, noise=None):
+        self.bus = bus
+        self.baudrate = baudrate
+        self.timeout = timeout
+        self.noise = noise
+        self._buffer = bytearray()
+        self._late = b""  # arrives once a read has timed out
+
+    def _wire_delay(self, nbytes):
+        if self.baudrate:
+            time.sleep(nbytes * char_time(self.baudrate))
+
+    def write(self, data):
+        self._wire_delay(len(data))
+        if self.bus.baudrate and self.baudrate and self.bus.baudrate != self.baudrate:
+            return len(data)  # the drives only see framing errors
+        response = self.bus.handle_frame(bytes(data))
+        if response:
+            if self.noise:
+                response, late = self.noise.apply(response)
+                self._late += late
+            self._buffer += response
+        return len(data)
+
+    def read(self, size=1):
+        data = bytes(self._buffer[:size])
+        del self._buffer[:size]
+        if len(data) < size:
+            if self.timeout:
+                time.sleep(self.timeout)  # nobody answers: the read times out
+            self._buffer += self._late
+            self._late = b""
+        self._wire_delay(len(data))
+        return data
+
+    def reset_input_buffer(self):
+        self._buffer.clear()
+
+    @property
+    def in_waiting(self):
+        return len(self._buffer)
+
+    def close(self):
+        pass
+
+
+class PtyServer(threading.Thread):
+    # Serves a SimulatedBus on the master side of a pseudo terminal; open
+    # self.device_name like any serial port. With baudrate set, responses are
+    # delayed by their wire time.
+
+    def __init__(self, bus, baudrate=None):
+        import tty  # POSIX only
+
+        super().__init__(name="vfd-sim-pty", daemon=True)
+        self.bus = bus
+        self.baudrate = baudrate
+        self.master_fd, self.slave_fd = os.openpty()
+        tty.setraw(self.slave_fd)
+        self.device_name = os.ttyname(self.slave_fd)
+        self._stop_event = threading.Event()
+
+    def run(self):
+        import select
+
+        buffer = bytearray()
+        while not self._stop_event.is_set():
+            readable, _, _ = select.select([self.master_fd], [], [], 0.1)
+            if not readable:
+                buffer.clear()  # a gap resynchronises framing
+                continue
+            try:
+                buffer += os.read(self.master_fd, 4096)
+            except OSError:
+                break
+            while True:
+                length = request_length(buffer)
+                if length is None or len(buffer) < length:
+                    break
+                frame = bytes(buffer[:length])
+                del buffer[:length]
+                response = self.bus.handle_frame(frame)
+                if response:
+                    if self.baudrate:
+                        time.sleep((len(frame) + len(response)) * char_time(self.baudrate))
+                    os.write(self.master_fd, response)
+
+    def stop(self, timeout=None):
+        self._stop_event.set()
+        if self.is_alive():
+            self.join(timeout)
+        os.close(self.master_fd)
+        os.close(self.slave_fd)
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Serve simulated VFDs on a pseudo terminal")
+    parser.add_argument("--drives", default="8", help="slave addresses in hex, comma separated")
+    parser.add_argument("--baud", type=int, help="emulate the wire time of this baud rate")
+    parser.add_argument("--ramp-time", type=float, default=5.0, help="seconds for 0-50 Hz, 0 = no ramp")
+    parser.add_argument("--fault-probability", type=float, default=0.0, help="chance per request that a running drive trips")
+    parser.add_argument("--seed", type=int, help="random seed for reproducible faults")
+    args = parser.parse_args()
+
+    vfds = [SimulatedVFD(int(address, 16), ramp_time=args.ramp_time, fault_probability=args.fault_probability,
+                         seed=None if args.seed is None else args.seed + i)
+            for i, address in enumerate(args.drives.split(","))]
+    server = PtyServer(SimulatedBus(vfds), baudrate=args.baud)
+    server.start()
+    print(f"Serving {len(vfds)} simulated drive(s) on {server.device_name}, Ctrl+C to stop")
+    faults = {}
+    try:
+        while server.is_alive():
+            time.sleep(0.2)
+            for vfd in vfds:
+                if vfd.fault != faults.get(vfd.slave_address, 0):
+                    faults[vfd.slave_address] = vfd.fault
+                    fault = faultcodes.fault_mapping.get(vfd.fault)
+                    print(f"{vfd.slave_address:02X}: " + (f"tripped {fault.code} ({fault.description})" if fault else "fault reset"))
+    except KeyboardInterrupt:
+        pass
+    server.stop(timeout=1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,198 @@
+#
+# Drive watchdog: stops the drives when the application can no longer
+# control them.
+#
+# The watchdog thread runs on a fixed schedule (absolute monotonic deadlines,
+# like motion_profile) and trips when
+#   - the control loop stopped calling feed() (GUI hung, e.g. in a blocking
+#     call on the Tk thread),
+#   - a heartbeat request queued on the bus worker at command priority was
+#     not picked up by the worker in time (worker or bus blocked), or
+#   - its own loop woke up too late (the PC stalled).
+# On a trip every drive is sent STOP (P103 = 0) at PRIORITY_STOP. If the
+# worker does not carry that out within stop_grace, the STOP is written on
+# the link directly from the watchdog thread; ModbusRTU serialises it with
+# the transaction in progress.
+#
+# The heartbeat reads P102 of one drive at a time, round robin. P102 has no
+# cache ttl, so the read always reaches the drive and keeps its RS485
+# communication timeout (fault 17) from tripping while the application is
+# healthy. Only the time a heartbeat waits for the worker counts towards the
+# deadline: a drive that does not answer costs its retries but is no reason
+# to stop the others. The round trip of answered heartbeats is the latency a
+# command sees at that moment; the worst one observed is reported.
+#
+
+import threading
+import time
+
+import drive
+from bus_worker import PRIORITY_COMMAND, PRIORITY_STOP
+
+DEFAULT_PERIOD = 0.1     # seconds between watchdog checks and heartbeats
+DEFAULT_DEADLINE = 1.0   # longest tolerated silence of the control loop or the command path
+DEFAULT_STOP_GRACE = 0.2  # time the worker gets to send the STOP before the direct path is used
+
+
+class Watchdog(threading.Thread):
+    def __init__(self, worker, slave_addresses, link=None, period=DEFAULT_PERIOD, deadline=DEFAULT_DEADLINE,
+                 stop_grace=DEFAULT_STOP_GRACE):
+        super().__init__(name="watchdog", daemon=True)
+        self.worker = worker
+        self.slave_addresses = slave_addresses  # callable returning the addresses to stop, or a list
+        self.link = link  # raw ModbusRTU for the direct STOP path, None to rely on the worker
+        self.period = period
+        self.deadline = deadline
+        self.stop_grace = stop_grace
+        self.on_trip = None     # callback(reason, stop_latency), called on this thread
+        self.on_recover = None  # callback(), called on this thread once everything responds again
+
+        self.tripped = None  # reason while tripped
+        self.trips = 0
+        self.heartbeats = 0
+        self.worst_heartbeat_latency = 0.0
+        self.worst_command_latency = 0.0  # of commands passed to track()
+        self.worst_loop_lateness = 0.0
+        self.worst_feed_gap = 0.0
+        self.worst_stop_latency = 0.0
+        self._last_feed = None  # monotonic time of the last feed(), None until the first
+        self._heartbeat = None  # (future, submitted, started) in flight, started is set by the worker
+        self._next_address = 0  # round robin index into _addresses()
+        self._stopping = None  # (reason, {address: future}, completion times, start) while the STOP is on its way
+        self._stop_event = threading.Event()
+
+    def feed(self):
+        # Called regularly by the control loop (the Tk thread); cheap
+        self._last_feed = time.monotonic()
+
+    def track(self, future, submitted=None):
+        # Record the submit-to-done latency of a command future
+        submitted = time.monotonic() if submitted is None else submitted
+
+        def done(f):
+            self.worst_command_latency = max(self.worst_command_latency, time.monotonic() - submitted)
+
+        future.add_done_callback(done)
+        return future
+
+    def stop(self, timeout=None):
+        self._stop_event.set()
+        if self.is_alive() and threading.current_thread() is not self:
+            self.join(timeout)
+
+    def _addresses(self):
+        return list(self.slave_addresses() if callable(self.slave_addresses) else self.slave_addresses)
+
+    def _check_heartbeat(self, now):
+        # Reason to trip, or None
+        if self._heartbeat is None:
+            addresses = self._addresses()
+            if not addresses:
+                return None
+            address = addresses[self._next_address % len(addresses)]
+            self._next_address += 1
+            started = []
+            future = self.worker.submit(self._heartbeat_request, address, started, priority=PRIORITY_COMMAND)
+            future.add_done_callback(lambda f: self._heartbeat_done(f, now))
+            self._heartbeat = (future, now, started)
+            return None
+        future, submitted, started = self._heartbeat
+        if future.done():
+            self._heartbeat = None
+            return None
+        waited = (started[0] if started else now) - submitted
+        if waited > self.deadline:
+            return f"command path blocked for {waited:.2f} s"
+        return None
+
+    def _heartbeat_done(self, future, submitted):
+        # Runs on the worker thread: the latency is measured when the heartbeat completes, not at the next tick
+        if not future.cancelled() and future.exception() is None:
+            self.heartbeats += 1
+            self.worst_heartbeat_latency = max(self.worst_heartbeat_latency, time.monotonic() - submitted)
+
+    @staticmethod
+    def _heartbeat_request(link, slave_address, started):
+        started.append(time.monotonic())
+        link.read_holding_registers(slave_address, drive.param_address(drive.P_SET_FREQUENCY), 1)
+
+    @staticmethod
+    def _stop_request(link, slave_address):
+        link.write_register(slave_address, drive.param_address(drive.P_CONTROL), drive.CONTROL_STOP)
+
+    def _safe_stop(self, reason, now):
+        # Queue the STOP; _check_stop() takes the direct path if the worker does not get to it
+        self.tripped = reason
+        self.trips += 1
+        futures = {address: self.worker.submit(self._stop_request, address, priority=PRIORITY_STOP)
+                   for address in self._addresses()}
+        done = []  # completion times, so the STOP latency does not depend on the tick
+        for future in futures.values():
+            future.add_done_callback(lambda f: done.append(time.monotonic()))
+        self._stopping = (reason, futures, done, now)
+        self._check_stop(now)
+
+    def _check_stop(self, now):
+        reason, futures, done, start = self._stopping
+        pending = [address for address, future in futures.items() if not future.done()]
+        if pending and now - start < self.stop_grace:
+            return
+        finished = max(done, default=start)
+        if pending and self.link is not None:
+            for address in pending:
+                if futures[address].cancel():  # not started: no stale STOP once the worker gets going again
+                    try:
+                        self._stop_request(self.link, address)
+                    except Exception:
+                        pass
+            finished = time.monotonic()
+        self._stopping = None
+        latency = finished - start
+        self.worst_stop_latency = max(self.worst_stop_latency, latency)
+        if self.on_trip:
+            self.on_trip(reason, latency)
+
+    def run(self):
+        start = time.monotonic()
+        ticks = 0
+        while True:
+            ticks += 1
+            scheduled = start + ticks * self.period  # absolute: lateness does not accumulate
+            if self._stop_event.wait(max(0.0, scheduled - time.monotonic())):
+                break
+            now = time.monotonic()
+            lateness = now - scheduled
+            self.worst_loop_lateness = max(self.worst_loop_lateness, lateness)
+
+            reason = None
+            if lateness > self.deadline:
+                reason = f"watchdog woke up {lateness:.2f} s late (system stalled)"
+                start, ticks = now, 0  # resume the schedule from here
+            if self._last_feed is not None:
+                gap = now - self._last_feed
+                self.worst_feed_gap = max(self.worst_feed_gap, gap)
+                if gap > self.deadline and reason is None:
+                    reason = f"control loop not responding for {gap:.2f} s"
+            heartbeat_reason = self._check_heartbeat(now)
+            reason = reason or heartbeat_reason
+
+            if self._stopping:
+                self._check_stop(now)
+            if reason and not self.tripped and not self._stopping:
+                self._safe_stop(reason, now)
+            elif not reason and self.tripped:
+                self.tripped = None
+                if self.on_recover:
+                    self.on_recover()
+
+    def report(self):
+        return {
+            "trips": self.trips,
+            "tripped": self.tripped,
+            "heartbeats": self.heartbeats,
+            "worst_heartbeat_latency": self.worst_heartbeat_latency,
+            "worst_command_latency": max(self.worst_command_latency, self.worst_heartbeat_latency),
+            "worst_stop_latency": self.worst_stop_latency,
+            "worst_loop_lateness": self.worst_loop_lateness,
+            "worst_feed_gap": self.worst_feed_gap,
+        }
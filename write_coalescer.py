@@ -0,0 +1,98 @@
+#
+# Write coalescing for registers driven from continuous controls (sliders).
+#
+# Only the latest pending value per (slave, register) is kept and writes are
+# sent through the bus worker at no more than max_rate_hz. A value that is
+# superseded before it is sent is simply dropped; the last value written is
+# always sent, also when stopping.
+#
+
+import collections
+import threading
+import time
+
+from bus_worker import PRIORITY_COMMAND
+
+MAX_RETRIES = 3
+
+
+class CoalescingWriter(threading.Thread):
+    def __init__(self, worker, max_rate_hz=5.0, on_written=None, priority=PRIORITY_COMMAND, on_retry=None):
+        super().__init__(name="write-coalescer", daemon=True)
+        self.worker = worker
+        self.max_rate_hz = max_rate_hz
+        self.on_written = on_written  # callback(slave_address, address, value, error), called on this thread
+        self.on_retry = on_retry  # callback(slave_address, address, attempt) when a failed write is queued again
+        self.priority = priority
+        self._pending = collections.OrderedDict()  # (slave_address, address) -> (value, attempts)
+        self._condition = threading.Condition()
+        self._stopping = False
+        self._next_allowed = 0.0
+        self.writes = 0
+        self.coalesced = 0  # values replaced before they were sent
+
+    def write(self, slave_address, address, value):
+        with self._condition:
+            key = (slave_address, address)
+            if key in self._pending:
+                self.coalesced += 1
+            self._pending[key] = (value, 0)
+            self._condition.notify()
+
+    def pending(self):
+        with self._condition:
+            return len(self._pending)
+
+    def flush(self, timeout=None):
+        # Block until every pending value has been sent
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._condition:
+            while self._pending:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._condition.wait(remaining)
+        return True
+
+    def run(self):
+        while True:
+            with self._condition:
+                while not self._pending and not self._stopping:
+                    self._condition.wait()
+                if not self._pending:
+                    break
+                # Rate limit; values keep being replaced while we wait
+                delay = self._next_allowed - time.monotonic()
+                while delay > 0 and not self._stopping:
+                    self._condition.wait(delay)
+                    delay = self._next_allowed - time.monotonic()
+                (slave_address, address), (value, attempts) = self._pending.popitem(last=False)
+
+            self._next_allowed = time.monotonic() + 1.0 / self.max_rate_hz
+            future = self.worker.submit(lambda link: link.write_register(slave_address, address, value), priority=self.priority)
+            try:
+                future.result()
+                error = None
+                self.writes += 1
+            except Exception as e:
+                error = e
+
+            with self._condition:
+                # Retry a failed write unless a newer value superseded it
+                key = (slave_address, address)
+                if error and attempts + 1 < MAX_RETRIES and key not in self._pending and self.worker.is_alive():
+                    self._pending[key] = (value, attempts + 1)
+                    if self.on_retry:
+                        self.on_retry(slave_address, address, attempts + 1)
+                self._condition.notify_all()
+
+            if self.on_written:
+                self.on_written(slave_address, address, value, error)
+
+    def stop(self, timeout=None):
+        # Pending values are still written before the thread ends
+        with self._condition:
+            self._stopping = True
+            self._condition.notify_all()
+        if self.is_alive() and threading.current_thread() is not self:
+            self.join(timeout)